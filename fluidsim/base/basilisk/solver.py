@@ -52,10 +52,10 @@ class SimulBasilisk(SimulBase):
 
     InfoSolver = InfoSolverBasilisk
 
-    def __init__(self, params):
+    def __init__(self, params, **kwargs):
         """Initialize parameters, state fields, and event loop."""
         bas = self.basilisk = basilisk
-        super().__init__(params)
+        super().__init__(params, **kwargs)
 
         def init(i, t):
             bas.omega.f = bas.noise
@@ -15,6 +15,7 @@ Provides:
    phys_fields3d
    movies
    spatial_means
+   ensemble_stats
    time_signals_fft
    increments
    print_stdout
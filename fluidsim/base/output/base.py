@@ -528,9 +528,7 @@ class OutputBasePseudoSpectral(OutputBase):
         """Compute energy(k)"""
         energy_fft = 0.0
         for k in self.sim.state.keys_state_spect:
-            energy_fft += (
-                np.abs(self.sim.state.state_spect.get_var(k)) ** 2
-            ) / 2.0
+            energy_fft += (np.abs(self.sim.state.get_var(k)) ** 2) / 2.0
 
         return energy_fft
 
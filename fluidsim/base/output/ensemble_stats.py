@@ -0,0 +1,85 @@
+"""Ensemble statistics (:mod:`fluidsim.base.output.ensemble_stats`)
+===================================================================
+
+Provides:
+
+.. autoclass:: EnsembleStats
+   :members:
+   :private-members:
+
+"""
+
+import h5py
+import numpy as np
+
+from fluidsim.base.output.base import SpecificOutput
+
+
+class EnsembleStats(SpecificOutput):
+    """Handle the saving of statistics over the members of an ensemble.
+
+    For each variable of `state_phys`, the mean, the variance and a histogram
+    over the members of the ensemble (see `params.oper.nb_members` for the 0D
+    solvers) are saved.
+
+    """
+
+    _tag = "ensemble_stats"
+    _name_file = _tag + ".h5"
+
+    @staticmethod
+    def _complete_params_with_default(params):
+        tag = "ensemble_stats"
+
+        params.output.periods_save._set_attrib(tag, 0)
+        params.output._set_child(tag, attribs={"nb_bins": 50})
+
+    def __init__(self, output):
+        params = output.sim.params
+        self.nb_bins = params.output.ensemble_stats.nb_bins
+
+        super().__init__(
+            output, period_save=params.output.periods_save.ensemble_stats
+        )
+
+    def compute(self):
+        """Compute the statistics over the members at one time."""
+        state_phys = self.sim.state.state_phys
+        dict_results = {}
+        for key in state_phys.keys:
+            var = np.asarray(state_phys.get_var(key))
+            mean = var.mean()
+            hist, bin_edges = np.histogram(var, bins=self.nb_bins)
+            dict_results["mean_" + key] = mean
+            dict_results["var_" + key] = ((var - mean) ** 2).mean()
+            dict_results["hist_" + key] = hist
+            dict_results["bin_edges_" + key] = bin_edges
+        return dict_results
+
+    def load(self):
+        """Load the saved statistics and return a dictionary."""
+        with h5py.File(self.path_file, "r") as file:
+            dict_results = {
+                key: dset[...]
+                for key, dset in file.items()
+                if isinstance(dset, h5py.Dataset)
+            }
+        return dict_results
+
+    def plot(self):
+        """Plot the means (and the standard deviations) as functions of time."""
+        dict_results = self.load()
+        times = dict_results["times"]
+
+        fig, ax = self.output.figure_axe()
+        ax.set_xlabel("$t$")
+        ax.set_title("ensemble means, solver " + self.output.name_solver)
+
+        for key in self.sim.state.state_phys.keys:
+            mean = dict_results["mean_" + key]
+            std = np.sqrt(dict_results["var_" + key])
+            (line,) = ax.plot(times, mean, label=key)
+            ax.fill_between(
+                times, mean - std, mean + std, color=line.get_color(), alpha=0.3
+            )
+        ax.legend()
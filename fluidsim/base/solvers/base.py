@@ -48,6 +48,16 @@ class SimulBase:
     info_solver : :class:`fluidsim.base.solvers.info_base.InfoSolverBase`
         Information about the particular solver.
 
+    oper : optional
+
+        Operator used instead of creating a new one (for example shared by the
+        members of an ensemble, see :mod:`fluidsim.base.solvers.ensemble`).
+
+    TimeStepping : class, optional
+
+        Class of the time stepping object (by default, the class given by the
+        solver information).
+
     """
 
     InfoSolver = InfoSolverBase
@@ -109,7 +119,7 @@ nu_2: float (default = 0.)
             self.output.end_of_simul(total_time_simul)
             self._end_of_simul = True
 
-    def __init__(self, params):
+    def __init__(self, params, oper=None, TimeStepping=None):
         # np.seterr(invalid='raise')
         # np.seterr(over='raise')
         np.seterr(all="warn")
@@ -138,8 +148,10 @@ nu_2: float (default = 0.)
         self.info = create_info_simul(self.info_solver, params)
 
         # initialization operators and grid
-        Operators = dict_classes["Operators"]
-        self.oper = Operators(params=params)
+        if oper is None:
+            Operators = dict_classes["Operators"]
+            oper = Operators(params=params)
+        self.oper = oper
 
         # initialization output
         Output = dict_classes["Output"]
@@ -157,7 +169,8 @@ nu_2: float (default = 0.)
         self.state = State(self)
 
         # initialisation time stepping
-        TimeStepping = dict_classes["TimeStepping"]
+        if TimeStepping is None:
+            TimeStepping = dict_classes["TimeStepping"]
         self.time_stepping = TimeStepping(self)
 
         # initialisation fields (and time if needed)
@@ -0,0 +1,344 @@
+"""Ensembles of simulations (:mod:`fluidsim.base.solvers.ensemble`)
+===================================================================
+
+Provides:
+
+.. autoclass:: SimulEnsemble
+   :members:
+   :private-members:
+
+.. autoclass:: StateEnsemble
+   :members:
+   :private-members:
+
+.. autoclass:: OutputEnsemble
+   :members:
+   :private-members:
+
+.. autoclass:: TimeSteppingPseudoSpectralEnsemble
+   :members:
+   :private-members:
+
+.. autoclass:: TimeSteppingMember
+   :members:
+
+.. note::
+
+  The members of a :class:`SimulEnsemble` are simulation objects of the
+  solver (with their own initial state, forcing, outputs and result
+  directory) sharing one operator object. They do not have their own time
+  stepping object: their states are views of arrays containing the states of
+  all members, which are advanced together by the time stepping object of the
+  ensemble (also used by the members for the time, the iteration and the time
+  step). The exact linear coefficients, the time step (computed with the CFL
+  condition over all members) and the arithmetic of the time schemes are
+  shared and vectorized over the members.
+
+  The nonlinear tendencies are computed member by member (the solvers compute
+  them for arrays of one member). When the solver uses the default
+  computation of the physical state (inverse transforms of the spectral
+  variables), the physical states of all members are computed with one call
+  to `ifft_setofvar` over the member and variable axes (one multi-field plan
+  with the sequential FFT classes using pyfftw).
+
+"""
+
+from copy import deepcopy
+from time import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.base.state import StatePseudoSpectral
+from fluidsim.base.time_stepping.pseudo_spect import TimeSteppingPseudoSpectral
+
+
+class StateEnsemble:
+    """State of an ensemble of simulations.
+
+    `state_spect` is an array of shape `(nb_members, nb_keys_spect, ...)` and
+    `state_phys` a :class:`SetOfVariables` of shape
+    `(nb_keys_phys, nb_members, ...)` (so that the statistics used for the CFL
+    condition and the checks are computed per variable over all members).
+
+    """
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+        members = ensemble.members
+        state0 = members[0].state
+        self.keys_state_spect = state0.state_spect.keys
+        self.keys_state_phys = state0.state_phys.keys
+
+        nb_members = len(members)
+        self.state_spect = np.empty(
+            (nb_members,) + state0.state_spect.shape, state0.state_spect.dtype
+        )
+        shape_phys = state0.state_phys.shape
+        self.state_phys = SetOfVariables(
+            input_array=np.empty(
+                (shape_phys[0], nb_members) + shape_phys[1:],
+                state0.state_phys.dtype,
+            ),
+            keys=self.keys_state_phys,
+            info="state_phys",
+        )
+
+        # the states of the members become views of the ensemble arrays
+        for index, member in enumerate(members):
+            state = member.state
+            self.state_spect[index] = state.state_spect
+            self.state_phys[:, index] = state.state_phys
+            state.state_spect = self.get_member_spect(self.state_spect, index)
+            state.state_phys = SetOfVariables(
+                input_array=self.state_phys[:, index],
+                keys=self.keys_state_phys,
+                info="state_phys",
+            )
+
+    def get_member_spect(self, arr, index):
+        """Return a view of the spectral array of one member."""
+        return SetOfVariables(
+            input_array=arr[index], keys=self.keys_state_spect, info="state_spect"
+        )
+
+    def statephys_from_statespect(self):
+        """Compute the states in physical space."""
+        members = self.ensemble.members
+        # the method can be overridden by a class or by a state (for example
+        # with a storage, see fluidsim.solvers.ns3d.state)
+        method = members[0].state.statephys_from_statespect
+        if (
+            getattr(method, "__func__", None)
+            is StatePseudoSpectral.statephys_from_statespect
+        ):
+            # inverse transforms of the spectral variables of all members
+            nb_keys_spect = self.state_spect.shape[1]
+            self.ensemble.oper.ifft_setofvar(
+                self.state_spect.swapaxes(0, 1), self.state_phys[:nb_keys_spect]
+            )
+            return
+        for member in members:
+            member.state.statephys_from_statespect()
+
+    def has_vars(self, *keys):
+        """Checks if the variables are available for the members."""
+        return self.ensemble.members[0].state.has_vars(*keys)
+
+    def get_var(self, key):
+        """Get a physical variable for all members (first axis)."""
+        if key in self.keys_state_phys:
+            return self.state_phys.get_var(key)
+        return np.array(
+            [member.state.get_var(key) for member in self.ensemble.members]
+        )
+
+
+class OutputEnsemble:
+    """Output of an ensemble of simulations (outputs of the members)."""
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+        self.outputs = [member.output for member in ensemble.members]
+        self.print_stdout = self.outputs[0].print_stdout
+        self._has_to_save = self.outputs[0]._has_to_save
+        self.phys_fields = SimpleNamespace(save=self._save_phys_fields)
+
+    def _save_phys_fields(self):
+        for output in self.outputs:
+            output.phys_fields.save()
+
+    def init_with_initialized_state(self):
+        """Initialize the outputs of the members."""
+        for output in self.outputs:
+            output.init_with_initialized_state()
+        self._has_been_initialized_with_state = True
+
+    def one_time_step(self):
+        """Call the outputs of the members."""
+        for output in self.outputs:
+            output.one_time_step()
+
+    def end_of_simul(self, total_time):
+        """End the outputs of the members."""
+        for output in self.outputs:
+            output.end_of_simul(total_time)
+
+
+class TimeSteppingPseudoSpectralEnsemble(TimeSteppingPseudoSpectral):
+    """Time stepping of an ensemble of pseudo-spectral simulations.
+
+    The linear frequencies are the ones of the members (with one axis per
+    variable) and are broadcast over the first axis of `state_spect`.
+
+    """
+
+    def _init_compact_storage(self):
+        raise NotImplementedError(
+            "params.time_stepping.compact_storage is not implemented for "
+            "ensembles"
+        )
+
+    def _init_freq_lin(self):
+        member = self.sim.members[0]
+        f_d, f_d_hypo = member.compute_freq_diss()
+        freq_dissip = f_d + f_d_hypo
+        shape_member = member.state.state_spect.shape
+
+        if hasattr(member, "compute_freq_complex"):
+            freq_complex = self._compute_freq_complex()
+            self.freq_lin = freq_dissip + freq_complex
+            freq_max = freq_complex.imag.max()
+            self.deltat_max = 0.78 * np.pi / freq_max
+        else:
+            self.freq_lin = np.ascontiguousarray(
+                np.broadcast_to(freq_dissip, shape_member)
+            )
+        self._set_precision_freq_lin()
+
+    def _compute_freq_complex(self):
+        member = self.sim.members[0]
+        state_spect = member.state.state_spect
+        freq_complex = np.empty_like(state_spect)
+        for ik, key in enumerate(state_spect.keys):
+            freq_complex[ik] = member.compute_freq_complex(key)
+        return freq_complex
+
+
+class TimeSteppingMember:
+    """Time of a member of an ensemble during its initialization.
+
+    The members do not allocate the arrays of a time stepping object. This
+    object is replaced by the time stepping object of the ensemble.
+
+    """
+
+    def __init__(self, sim):
+        self.params = sim.params
+        self.sim = sim
+        self.it = 0
+        self.t = 0
+        self.deltat = sim.params.time_stepping.deltat0
+
+
+class SimulEnsemble:
+    """Ensemble of simulations advanced together.
+
+    Parameters
+    ----------
+
+    Simul : class
+
+      Class of a pseudo-spectral solver (for example
+      :class:`fluidsim.solvers.ns2d.solver.Simul`).
+
+    params : :class:`fluidsim.base.params.Parameters`
+
+      Parameters of the members. Each member uses a copy with
+      `short_name_type_run` suffixed by the index of the member.
+
+    nb_members : int
+
+    seeds : sequence of int, optional
+
+      Seeds of the random number generators of the members (used for the
+      initialization and the forcing). By default `range(nb_members)`.
+
+    """
+
+    def __init__(self, Simul, params, nb_members, seeds=None):
+        if seeds is None:
+            seeds = range(nb_members)
+        seeds = list(seeds)
+        if len(seeds) != nb_members:
+            raise ValueError("len(seeds) != nb_members")
+
+        self.nb_members = nb_members
+        self.seeds = seeds
+        self.members = []
+        self._random_states = []
+        random_state = np.random.get_state()
+        oper = None
+        for index, seed in enumerate(seeds):
+            params_member = deepcopy(params)
+            params_member.short_name_type_run = "_".join(
+                name
+                for name in (params.short_name_type_run, f"mem{index:03d}")
+                if name
+            )
+            np.random.seed(seed)
+            # all members share the operator of the first member
+            member = Simul(
+                params_member, oper=oper, TimeStepping=TimeSteppingMember
+            )
+            oper = member.oper
+            self.members.append(member)
+            self._random_states.append(np.random.get_state())
+        np.random.set_state(random_state)
+
+        member = self.members[0]
+        self.oper = oper
+        self.params = member.params
+        self.info = member.info
+        self.is_forcing_enabled = member.is_forcing_enabled
+        if self.is_forcing_enabled:
+            self.forcing = SimpleNamespace(
+                compute=self._compute_forcing, get_forcing=self._get_forcing
+            )
+
+        self.state = StateEnsemble(self)
+        self.output = OutputEnsemble(self)
+        self.time_stepping = TimeSteppingPseudoSpectralEnsemble(self)
+        self.time_stepping.t = member.time_stepping.t
+        self.time_stepping.it = member.time_stepping.it
+        for member in self.members:
+            member.time_stepping = self.time_stepping
+
+    def __enter__(self):
+        if not hasattr(self, "_end_of_simul") or self._end_of_simul:
+            self.time_stepping._time_beginning_simul = time()
+            self._end_of_simul = False
+        return self
+
+    def __exit__(self, *args):
+        if not self._end_of_simul:
+            total_time_simul = time() - self.time_stepping._time_beginning_simul
+            self.time_stepping.time_simul_in_sec = total_time_simul
+            self.output.end_of_simul(total_time_simul)
+            self._end_of_simul = True
+
+    def _compute_forcing(self):
+        """Compute the forcing of the members with their own random streams."""
+        random_state = np.random.get_state()
+        for index, member in enumerate(self.members):
+            np.random.set_state(self._random_states[index])
+            member.forcing.compute()
+            self._random_states[index] = np.random.get_state()
+        np.random.set_state(random_state)
+
+    def _get_forcing(self):
+        """Get the forcing of the members (copied in one array)."""
+        try:
+            forcing = self._forcing_fft
+        except AttributeError:
+            forcing = self._forcing_fft = np.empty_like(self.state.state_spect)
+        for index, member in enumerate(self.members):
+            forcing[index] = member.forcing.get_forcing()
+        return forcing
+
+    def tendencies_nonlin(self, state_spect=None, old=None):
+        """Compute the nonlinear tendencies of all members."""
+        if old is None:
+            old = np.empty_like(self.state.state_spect)
+
+        get_member_spect = self.state.get_member_spect
+        for index, member in enumerate(self.members):
+            if state_spect is None:
+                state_member = None
+            else:
+                state_member = get_member_spect(state_spect, index)
+            member.tendencies_nonlin(
+                state_member, old=get_member_spect(old, index)
+            )
+        return old
@@ -108,7 +108,12 @@ class SimulBasePseudoSpectral(SimulBase):
         """Complete the `params` container (static method)."""
         SimulBase._complete_params_with_default(params)
 
-        attribs = {"nu_8": 0.0, "nu_4": 0.0, "nu_m4": 0.0}
+        attribs = {
+            "nu_8": 0.0,
+            "nu_4": 0.0,
+            "nu_m4": 0.0,
+            "precision": "double",
+        }
         params._set_attribs(attribs)
 
         params._set_doc(
@@ -128,6 +133,20 @@ nu_m4: float
     Hypo-viscous coefficient of order -4. Hypo-viscosity affect more the large
     scales.
 
+precision: str (default "double")
+
+    Floating point precision of the arrays of the simulation ("double" or
+    "single"). With "single", the state, the temporary arrays of the time
+    stepping and the fields computed by the operators are float32/complex64
+    arrays, which halves the memory used by the fields. With the sequential
+    FFT classes using pyfftw, the FFTs are computed with single precision
+    plans. The main operators of the solvers (curl, divergence, gradient,
+    projections) are computed with float32 copies of the wavenumber arrays
+    (about two more real arrays). For the other FFT classes (in particular
+    with MPI) and the other methods of fluidfft, single precision is only a
+    storage mode: the arrays are converted in double precision at each call.
+    The global sums and the spectra are computed in double precision.
+
 """
         )
 
@@ -162,9 +181,25 @@ nu_m4: float
         f_d_hypo : `numpy.array`
             The dissipation frequency at large scale (hypo-viscosity)
 
+        The arrays are pinned in the cache `oper.cache_arrays` for the current
+        values of the viscosities (they are computed again if the viscosities
+        change) so they should not be modified in place.
+
         .. FIXME: Shouldn't fourth order viscosity be negative?
 
         """
+        params = self.params
+        try:
+            cache_arrays = self.oper.cache_arrays
+        except AttributeError:
+            return self._compute_freq_diss()
+        viscosities = (params.nu_2, params.nu_4, params.nu_8, params.nu_m4)
+        return cache_arrays.get_or_compute_pinned(
+            "freq_diss", self._compute_freq_diss, version=viscosities
+        )
+
+    def _compute_freq_diss(self):
+        """Compute the dissipation frequencies (without cache)."""
         if self.params.nu_2 > 0:
             f_d = self.params.nu_2 * self.oper.K2
         else:
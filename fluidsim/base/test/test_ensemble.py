@@ -0,0 +1,140 @@
+import unittest
+import shutil
+
+import numpy as np
+
+from fluiddyn.io import stdout_redirected
+import fluiddyn.util.mpi as mpi
+
+from fluidsim.solvers.ns2d.solver import Simul
+from fluidsim.solvers.ns3d.solver import Simul as Simul3d
+from fluidsim.base.solvers.ensemble import SimulEnsemble
+from fluidsim.util.testing import TestCase
+
+
+def make_params(short_name, forcing=False, Simul=Simul):
+    params = Simul.create_default_params()
+
+    params.short_name_type_run = short_name
+    params.output.sub_directory = "unittests"
+    params.output.HAS_TO_SAVE = False
+
+    if Simul is Simul3d:
+        params.oper.nx = params.oper.ny = params.oper.nz = 8
+    else:
+        params.oper.nx = params.oper.ny = 16
+    params.nu_2 = 0.1
+
+    params.init_fields.type = "noise"
+    params.init_fields.noise.velo_max = 20.0
+
+    params.time_stepping.USE_CFL = False
+    params.time_stepping.USE_T_END = False
+    params.time_stepping.deltat0 = 0.02
+    params.time_stepping.it_end = 10
+    params.time_stepping.type_time_scheme = "RK4"
+
+    if forcing:
+        params.forcing.enable = True
+        params.forcing.type = "tcrandom"
+        params.forcing.nkmin_forcing = 2
+        params.forcing.nkmax_forcing = 5
+
+    return params
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "Random forcing depends on nb_proc")
+class TestEnsemble(TestCase):
+    def _test_member(self, forcing, Simul=Simul):
+        tag = "_forced" if forcing else ""
+        seeds = [4, 5, 6]
+        paths = []
+        try:
+            with stdout_redirected(self.has_to_redirect_stdout):
+                ensemble = SimulEnsemble(
+                    Simul,
+                    make_params("test_ensemble" + tag, forcing, Simul),
+                    3,
+                    seeds,
+                )
+                paths.extend(m.output.path_run for m in ensemble.members)
+                # different initial states
+                for index, member in enumerate(ensemble.members):
+                    member.state.state_spect *= 1 + index
+                    member.state.statephys_from_statespect()
+                ensemble.time_stepping.start()
+
+                np.random.seed(seeds[1])
+                sim = Simul(make_params("test_ensemble_ref" + tag, forcing, Simul))
+                paths.append(sim.output.path_run)
+                sim.state.state_spect *= 2
+                sim.state.statephys_from_statespect()
+                sim.time_stepping.start()
+        finally:
+            if mpi.rank == 0:
+                for path in paths:
+                    shutil.rmtree(path, ignore_errors=True)
+
+        member = ensemble.members[1]
+        # shared operator and time stepping
+        self.assertIs(member.oper, ensemble.oper)
+        self.assertIs(member.time_stepping, ensemble.time_stepping)
+        self.assertEqual(ensemble.time_stepping.it, 10)
+        self.assertAlmostEqual(member.time_stepping.t, sim.time_stepping.t)
+        self.assertTrue(
+            np.shares_memory(member.state.state_phys, ensemble.state.state_phys)
+        )
+        self.assertTrue(
+            np.allclose(member.state.state_spect, sim.state.state_spect)
+        )
+        self.assertFalse(
+            np.allclose(
+                ensemble.members[0].state.state_spect, sim.state.state_spect
+            )
+        )
+
+    def test_ensemble(self):
+        self._test_member(forcing=False)
+
+    def test_ensemble_forcing(self):
+        self._test_member(forcing=True)
+
+    def test_ensemble_ns3d(self):
+        self._test_member(forcing=False, Simul=Simul3d)
+
+    def test_statephys_batched(self):
+        with stdout_redirected(self.has_to_redirect_stdout):
+            ensemble = SimulEnsemble(
+                Simul3d, make_params("test_ensemble_phys", Simul=Simul3d), 2
+            )
+        if mpi.rank == 0:
+            for member in ensemble.members:
+                self.addCleanup(
+                    shutil.rmtree, member.output.path_run, ignore_errors=True
+                )
+
+        oper = ensemble.oper
+        state_spect = ensemble.state.state_spect
+        state_spect[1] *= 2
+        states_phys = [
+            np.array([oper.ifft(var_fft) for var_fft in member_spect])
+            for member_spect in state_spect
+        ]
+
+        def fail(*args):
+            raise AssertionError("transforms not batched over the members")
+
+        oper.ifft_as_arg = fail
+        try:
+            ensemble.state.statephys_from_statespect()
+        finally:
+            del oper.ifft_as_arg
+
+        for member, state_phys in zip(ensemble.members, states_phys):
+            np.testing.assert_allclose(
+                member.state.state_phys, state_phys, atol=1e-14
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,570 @@
+import unittest
+import shutil
+
+import numpy as np
+
+from fluiddyn.io import stdout_redirected
+import fluiddyn.util.mpi as mpi
+
+from fluidsim.solvers.ns2d.solver import Simul
+from fluidsim.base.time_stepping.base import (
+    compute_max_abs,
+    compute_max_abs_and_sum_squares,
+    _compute_max_abs_and_sum_squares_loops,
+)
+from fluidsim.base.time_stepping.pseudo_spect import (
+    compute_coefs_adams_bashforth,
+    CacheCoefs,
+)
+from fluidsim.base.time_stepping.parareal import Parareal, _simuls
+from fluidsim.util.testing import TestCase
+
+
+def init_simul(
+    type_time_scheme,
+    deltat=0.02,
+    it_end=10,
+    precision="double",
+    type_fft=None,
+    **kwargs_params,
+):
+    """Initialize a small ns2d simulation."""
+    params = Simul.create_default_params()
+
+    params.short_name_type_run = "test_" + type_time_scheme
+    params.precision = precision
+    params.output.sub_directory = "unittests"
+    params.output.HAS_TO_SAVE = False
+
+    nh = 16
+    params.oper.nx = nh
+    params.oper.ny = nh
+    params.oper.Lx = params.oper.Ly = 2 * np.pi
+    if type_fft is not None:
+        params.oper.type_fft = type_fft
+    params.nu_2 = 0.1
+
+    params.init_fields.type = "noise"
+    params.init_fields.noise.velo_max = 20.0
+
+    params.time_stepping.USE_CFL = False
+    params.time_stepping.USE_T_END = False
+    params.time_stepping.deltat0 = deltat
+    params.time_stepping.it_end = it_end
+    params.time_stepping.type_time_scheme = type_time_scheme
+
+    for key, value in kwargs_params.items():
+        params.time_stepping[key] = value
+
+    # same initial state for all simulations
+    np.random.seed(0)
+    with stdout_redirected(TestCase.has_to_redirect_stdout):
+        sim = Simul(params)
+
+    return sim
+
+
+def start_simul(sim):
+    """Run a simulation and remove its directory."""
+    try:
+        with stdout_redirected(TestCase.has_to_redirect_stdout):
+            sim.time_stepping.start()
+    finally:
+        if mpi.rank == 0:
+            shutil.rmtree(sim.output.path_run, ignore_errors=True)
+
+
+def run_simul(
+    type_time_scheme, deltat=0.02, it_end=10, precision="double", **kwargs_params
+):
+    """Run a small ns2d simulation and return the simulation object."""
+    sim = init_simul(type_time_scheme, deltat, it_end, precision, **kwargs_params)
+    start_simul(sim)
+    return sim
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "Random initial state depends on nb_proc")
+class TestTimeSchemes(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.state_ref = run_simul("RK4").state.state_spect
+
+    def assert_close_to_ref(self, sim, rtol):
+        state_spect = sim.state.state_spect
+        error = abs(state_spect - self.state_ref).max()
+        self.assertLess(error, rtol * abs(self.state_ref).max())
+
+    def test_rk3_2n(self):
+        self.assert_close_to_ref(run_simul("RK3_2N"), rtol=1e-10)
+
+    def test_rk4_2n(self):
+        self.assert_close_to_ref(run_simul("RK4_2N"), rtol=1e-12)
+
+    def test_rk2_phaseshift(self):
+        self.assert_close_to_ref(run_simul("RK2_phaseshift"), rtol=1e-8)
+
+    def test_ab2_phaseshift(self):
+        self.assert_close_to_ref(run_simul("AB2_phaseshift"), rtol=1e-7)
+
+    def test_phaseshift_random_seed(self):
+        states = [
+            run_simul(
+                "AB2_phaseshift", phaseshift_random_seed=seed
+            ).state.state_spect
+            for seed in (1, 1, 2)
+        ]
+        np.testing.assert_equal(states[0], states[1])
+        self.assertGreater(abs(states[0] - states[2]).max(), 0)
+
+    def test_ab2(self):
+        self.assert_close_to_ref(run_simul("AB2"), rtol=1e-7)
+
+    def test_ab3(self):
+        self.assert_close_to_ref(run_simul("AB3"), rtol=1e-9)
+
+    def test_bs32(self):
+        sim = run_simul(
+            "BS32", deltat=0.2, USE_T_END=True, t_end=0.2, tol_adaptive=1e-9
+        )
+        self.assert_close_to_ref(sim, rtol=1e-8)
+
+    def test_bs32_fsal(self):
+        sim = init_simul("BS32", it_end=4, tol_adaptive=1e-9)
+        time_stepping = sim.time_stepping
+        tendencies_nonlin = sim.tendencies_nonlin
+        calls = []
+
+        def tendencies_nonlin_spy(state_spect=None, old=None):
+            calls.append(time_stepping.it)
+            return tendencies_nonlin(state_spect, old=old)
+
+        sim.tendencies_nonlin = tendencies_nonlin_spy
+        start_simul(sim)
+        # N_3 of an accepted step is reused as N_0 of the next step
+        nb_steps = 4 + time_stepping.nb_steps_rejected
+        self.assertEqual(len(calls), 1 + 3 * nb_steps)
+
+        # but not after an outside change of the state
+        del calls[:]
+        nb_steps_rejected = time_stepping.nb_steps_rejected
+        sim.state.state_spect *= 0.5
+        time_stepping.one_time_step_computation()
+        nb_steps = 1 + time_stepping.nb_steps_rejected - nb_steps_rejected
+        self.assertEqual(len(calls), 1 + 3 * nb_steps)
+
+    def test_single_precision(self):
+        for type_time_scheme in ("RK4", "ETDRK4"):
+            sim = run_simul(type_time_scheme, precision="single")
+            state_spect = sim.state.state_spect
+            self.assertEqual(state_spect.dtype, np.complex64)
+            self.assertEqual(sim.state.state_phys.dtype, np.float32)
+            self.assertEqual(sim.time_stepping.freq_lin.dtype, np.float32)
+            self.assert_close_to_ref(sim, rtol=1e-5)
+
+    def test_etdrk4(self):
+        self.assert_close_to_ref(run_simul("ETDRK4"), rtol=1e-12)
+
+    def test_compact_storage(self):
+        for type_time_scheme in ("RK4", "AB3"):
+            sim = run_simul(type_time_scheme, compact_storage=True)
+            storage = sim.time_stepping.storage_compact
+            self.assertLess(storage.nb_modes, sim.oper.where_dealiased.size)
+            self.assertEqual(
+                sim.state.state_spect.shape, tuple(self.state_ref.shape)
+            )
+            if type_time_scheme == "RK4":
+                self.assert_close_to_ref(sim, rtol=1e-12)
+
+    def test_compact_storage_memory(self):
+        def compute_memory(sim, min_size):
+            """Memory (in full states) of the spectral arrays of the time
+            stepping (the full state of the simulation excluded)."""
+            time_stepping = sim.time_stepping
+            objects = [time_stepping, time_stepping.exact_linear_coefs]
+            if time_stepping.storage_compact is not None:
+                objects.extend([time_stepping.sim, time_stepping.sim.state])
+            arrays = {}
+            for obj in objects:
+                for value in vars(obj).values():
+                    if isinstance(value, (list, tuple)):
+                        values = value
+                    else:
+                        values = [value]
+                    for arr in values:
+                        if isinstance(arr, np.ndarray) and arr.size >= min_size:
+                            arrays[id(arr)] = arr
+            nbytes = sum(arr.nbytes for arr in arrays.values())
+            return nbytes / sim.state.state_spect.nbytes
+
+        sim = run_simul("AB3", compact_storage=True)
+        storage = sim.time_stepping.storage_compact
+        memory = compute_memory(sim, storage.nb_modes)
+        memory_ref = compute_memory(run_simul("AB3"), storage.nb_modes)
+        # the arrays of the scheme and the compact state are compact and one
+        # full array is used for the tendencies
+        self.assertAlmostEqual(
+            memory, 1 + storage.ratio_modes * (1 + memory_ref), places=10
+        )
+        self.assertLess(memory, memory_ref)
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "Random initial state depends on nb_proc")
+class TestOrders(TestCase):
+    """Check the order of convergence of the time schemes."""
+
+    t_end = 0.8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.state_ref = run_simul(
+            "RK4", deltat=cls.t_end / 320, it_end=320
+        ).state.state_spect
+
+    def compute_error(self, type_time_scheme, nb_steps):
+        sim = run_simul(
+            type_time_scheme, deltat=self.t_end / nb_steps, it_end=nb_steps
+        )
+        error = abs(sim.state.state_spect - self.state_ref).max()
+        return error / abs(self.state_ref).max()
+
+    def assert_order(self, type_time_scheme, order, nb_steps=10):
+        error = self.compute_error(type_time_scheme, nb_steps)
+        error_half = self.compute_error(type_time_scheme, 2 * nb_steps)
+        # halving the time step divides the error by about 2**order
+        order_measured = np.log2(error / error_half)
+        self.assertGreater(order_measured, order - 0.3)
+        self.assertLess(order_measured, order + 0.7)
+
+    def test_rk3_2n(self):
+        self.assert_order("RK3_2N", 3)
+
+    def test_rk4_2n(self):
+        self.assert_order("RK4_2N", 4, nb_steps=2)
+
+    def test_ab2(self):
+        self.assert_order("AB2", 2)
+
+    def test_ab3(self):
+        self.assert_order("AB3", 3)
+
+    def test_etdrk4(self):
+        self.assert_order("ETDRK4", 4, nb_steps=2)
+
+
+class TestAdamsBashforth(unittest.TestCase):
+    def test_coefs(self):
+        np.testing.assert_allclose(
+            compute_coefs_adams_bashforth(0.1, [0.1]), [3 / 2, -1 / 2]
+        )
+        np.testing.assert_allclose(
+            compute_coefs_adams_bashforth(0.1, [0.1, 0.1]),
+            [23 / 12, -16 / 12, 5 / 12],
+        )
+        # variable time step
+        omega = 0.5
+        np.testing.assert_allclose(
+            compute_coefs_adams_bashforth(0.1, [0.1 / omega]),
+            [1 + omega / 2, -omega / 2],
+        )
+
+
+class TestCacheCoefs(unittest.TestCase):
+    def test_lru(self):
+        arrays = [np.zeros(10)]
+        nbytes = arrays[0].nbytes
+        cache = CacheCoefs(max_memory=2 * nbytes)
+        cache.add(0.1, arrays)
+        cache.add(0.2, [np.zeros(10)])
+        self.assertIs(cache.get(0.1), arrays)
+        self.assertIsNone(cache.get(0.3))
+        # 0.2 is the least recently used time step
+        cache.add(0.3, [np.zeros(10)])
+        self.assertIsNone(cache.get(0.2))
+        self.assertIs(cache.get(0.1), arrays)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.memory, 2 * nbytes)
+        self.assertEqual(cache.nb_hits, 2)
+        self.assertEqual(cache.nb_misses, 2)
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "Random initial state depends on nb_proc")
+class TestDeltatLadder(TestCase):
+    def test_ladder(self):
+        sim = run_simul(
+            "RK4_2N", it_end=20, USE_CFL=True, ratio_deltat_ladder=1.1
+        )
+        time_stepping = sim.time_stepping
+        deltat_max = time_stepping.deltat_max
+        ladder = [deltat_max / 1.1 ** index for index in range(3)]
+
+        index = np.log(deltat_max / time_stepping.deltat) / np.log(1.1)
+        self.assertAlmostEqual(index, round(index))
+        for index, deltat in enumerate(ladder[1:]):
+            round_deltat = time_stepping._round_deltat_on_ladder
+            self.assertEqual(round_deltat(deltat), deltat)
+            self.assertEqual(round_deltat(0.999 * ladder[index]), deltat)
+
+        cache = time_stepping._cache_exact_coefs
+        self.assertGreater(len(cache), 0)
+        self.assertIs(
+            cache.get(time_stepping.deltat)[0],
+            time_stepping.exact_linear_coefs.exacts[0],
+        )
+
+    def test_ladder_bs32(self):
+        sim = run_simul(
+            "BS32",
+            USE_CFL=True,
+            USE_T_END=True,
+            t_end=1.0,
+            cfl_period=3,
+            ratio_deltat_ladder=1.1,
+            deltat_max=1.0,
+            tol_adaptive=1e-8,
+        )
+        time_stepping = sim.time_stepping
+        self.assertAlmostEqual(time_stepping.t, 1.0)
+        # the adaptive time steps are rounded down on the ladder
+        cache = time_stepping._cache_exact_coefs
+        self.assertGreater(len(cache), 1)
+        for deltat in cache._arrays:
+            index = np.log(time_stepping.deltat_max / deltat) / np.log(1.1)
+            self.assertAlmostEqual(index, round(index))
+        # the limit given by the CFL condition is used between the iterations
+        # for which it is computed
+        self.assertLessEqual(time_stepping.deltat, time_stepping._deltat_CFL)
+
+
+class TestCFL(TestCase):
+    def test_compute_max_abs(self):
+        arr = np.array([[1.0, -3.0], [2.0, 0.5]])
+        self.assertEqual(compute_max_abs(arr), 3.0)
+        self.assertEqual(compute_max_abs(-arr), 3.0)
+
+    def test_cfl_period_nonblocking(self):
+        sim = run_simul(
+            "RK4",
+            it_end=7,
+            USE_CFL=True,
+            cfl_period=3,
+            cfl_nonblocking=True,
+            cfl_safety_factor=0.5,
+        )
+        time_stepping = sim.time_stepping
+        self.assertEqual(time_stepping.CFL, 0.5)
+        self.assertIsNone(time_stepping._request_CFL)
+        self.assertEqual(time_stepping.it, 7)
+
+    def test_cfl_period_health(self):
+        sim = init_simul("RK4", it_end=7, USE_CFL=True, cfl_period=3)
+        time_stepping = sim.time_stepping
+        compute_time_increment_CLF = time_stepping.compute_time_increment_CLF
+        calls = []
+
+        def compute_time_increment_CLF_spy():
+            # maxima already reduced by _check_health?
+            calls.append(
+                (time_stepping.it, time_stepping._it_health == time_stepping.it)
+            )
+            compute_time_increment_CLF()
+
+        time_stepping.compute_time_increment_CLF = compute_time_increment_CLF_spy
+        start_simul(sim)
+        self.assertEqual(calls, [(0, False), (3, True), (6, True)])
+
+        # with MPI, the quantities of _check_health are only reduced before
+        # the computations of the CFL condition
+        reduce = []
+        for it in range(6):
+            time_stepping.it = it
+            reduce.append(time_stepping._has_to_reduce_health())
+        self.assertEqual(reduce, [False, False, True, False, False, True])
+
+    @unittest.skipIf(mpi.nb_proc == 1, "Non-blocking reduction only with MPI")
+    def test_cfl_nonblocking_request(self):
+        sim = init_simul(
+            "RK4", it_end=7, USE_CFL=True, cfl_period=3, cfl_nonblocking=True
+        )
+        time_stepping = sim.time_stepping
+        one_time_step_computation = time_stepping.one_time_step_computation
+        requests = []
+
+        def one_time_step_computation_spy():
+            requests.append(time_stepping._request_CFL is not None)
+            one_time_step_computation()
+
+        time_stepping.one_time_step_computation = one_time_step_computation_spy
+        start_simul(sim)
+        # the first reduction is blocking
+        self.assertEqual(
+            requests, [False, False, False, True, False, False, True]
+        )
+        # the quantities of _check_health are reduced with the CFL condition
+        self.assertEqual(time_stepping._it_health, 6)
+
+
+class TestHealth(TestCase):
+    def test_compute_max_abs_and_sum_squares(self):
+        arr = np.array([[[1.0, -3.0], [2.0, 0.5]], [[0.0, 1.0], [-1.0, 2.0]]])
+        expected = [[3.0, 2.0], [14.25, 6.0]]
+        np.testing.assert_allclose(compute_max_abs_and_sum_squares(arr), expected)
+        result = np.empty((2, 2))
+        _compute_max_abs_and_sum_squares_loops(arr.reshape(2, -1), result)
+        np.testing.assert_allclose(result, expected)
+        arr[1, 0, 0] = np.nan
+        result = compute_max_abs_and_sum_squares(arr)
+        self.assertTrue(np.isfinite(result[1, 0]))
+        self.assertFalse(np.isfinite(result[1, 1]))
+
+    @unittest.skipIf(mpi.nb_proc > 1, "Random initial state depends on nb_proc")
+    def test_check_health(self):
+        sim = run_simul("RK4", it_end=2, USE_CFL=True)
+        time_stepping = sim.time_stepping
+        self.assertEqual(time_stepping._it_health, time_stepping.it)
+        state_phys = sim.state.state_phys
+        for key in state_phys.keys:
+            var = state_phys.get_var(key)
+            self.assertEqual(time_stepping._max_abs_phys[key], abs(var).max())
+        # maxima already reduced used for the CFL condition
+        _, is_global = time_stepping._get_max_abs_phys("ux", "uy")
+        self.assertTrue(is_global)
+
+        state_phys[0, 0, 0] = np.nan
+        with self.assertRaises(ValueError):
+            time_stepping._check_health()
+
+
+class TestMaxElapsed(TestCase):
+    def test_deadline(self):
+        # the deadline is reached immediately because of the margin
+        sim = run_simul(
+            "RK4", it_end=10000, max_elapsed=10, max_elapsed_margin=10
+        )
+        time_stepping = sim.time_stepping
+        self.assertTrue(time_stepping._has_to_stop)
+        self.assertLess(time_stepping.it, 10000)
+        if mpi.rank == 0:
+            self.assertTrue(time_stepping._deadline_reached)
+
+    def test_check_period(self):
+        sim = init_simul(
+            "RK4", max_elapsed=1000, max_elapsed_check_period=3, USE_CFL=False
+        )
+        if mpi.rank == 0:
+            self.addCleanup(
+                shutil.rmtree, sim.output.path_run, ignore_errors=True
+            )
+        time_stepping = sim.time_stepping
+        time_stepping._deadline_reached = True
+        stops = []
+        for it in range(1, 5):
+            time_stepping.it = it
+            time_stepping._check_deadline()
+            stops.append(bool(time_stepping._has_to_stop))
+        if mpi.nb_proc == 1:
+            self.assertEqual(stops, [True] * 4)
+        else:
+            # the flag is only communicated every 3 time steps
+            self.assertEqual(stops, [False, False, True, True])
+            self.assertEqual(time_stepping._it_stop_flag, 3)
+
+
+class TestRollback(TestCase):
+    def test_rollback(self):
+        sim = init_simul(
+            "RK4",
+            it_end=30,
+            rollback_nb_snapshots=2,
+            rollback_period=5,
+            rollback_coef_nu=2.0,
+        )
+        sim.params.nu_8 = 1e-10
+        time_stepping = sim.time_stepping
+        time_step_RK = time_stepping._time_step_RK
+
+        def time_step_nan():
+            time_step_RK()
+            if time_stepping.it == 12:
+                sim.state.state_spect[0, 0, 0] = np.nan
+
+        # replaced by the true method during the rollback
+        time_stepping._time_step_RK = time_step_nan
+        start_simul(sim)
+
+        self.assertEqual(time_stepping.nb_rollbacks, 1)
+        self.assertEqual(time_stepping.it, 30)
+        self.assertAlmostEqual(time_stepping.t, 10 * 0.02 + 20 * 0.01)
+        self.assertEqual(time_stepping.deltat_max, 0.1)
+        self.assertEqual(sim.params.nu_8, 2e-10)
+        self.assertTrue(np.isfinite(sim.state.state_spect).all())
+
+    def test_max_nb_rollbacks(self):
+        sim = init_simul(
+            "RK4", rollback_nb_snapshots=1, rollback_period=5, rollback_max_nb=2
+        )
+        tendencies_nonlin = sim.tendencies_nonlin
+
+        def tendencies_nan(state_spect=None, old=None):
+            tendencies = tendencies_nonlin(state_spect, old)
+            if sim.time_stepping.it >= 7:
+                tendencies[0, 0, 0] = np.nan
+            return tendencies
+
+        sim.tendencies_nonlin = tendencies_nan
+        with self.assertRaises(ValueError):
+            start_simul(sim)
+
+        self.assertEqual(sim.time_stepping.nb_rollbacks, 2)
+        self.assertEqual(sim.time_stepping.it, 5)
+        self.assertTrue(np.isfinite(sim.state.state_spect).all())
+
+
+class TestParareal(TestCase):
+    # with MPI, the time slices are distributed over the processes
+    type_fft = None if mpi.nb_proc == 1 else "fft2d.with_pyfftw"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.state_ref = run_simul(
+            "RK4", deltat=0.01, it_end=20, type_fft=cls.type_fft
+        ).state.state_spect
+        if mpi.nb_proc > 1:
+            # the initial state of the process 0 is used by Parareal.run
+            mpi.comm.Bcast(cls.state_ref, root=0)
+
+    def run_parareal(self, nb_iterations_max=None, **kwargs):
+        sim = init_simul(
+            "RK4", USE_T_END=True, t_end=0.2, type_fft=self.type_fft
+        )
+        parareal = Parareal(sim, nb_slices=4, nb_steps_fine=5, **kwargs)
+        try:
+            with stdout_redirected(TestCase.has_to_redirect_stdout):
+                parareal.run(nb_iterations_max=nb_iterations_max, tol=0)
+        finally:
+            shutil.rmtree(sim.output.path_run, ignore_errors=True)
+        return parareal
+
+    def test_parareal(self):
+        parareal = self.run_parareal()
+        sim = parareal.sim
+        # after nb_slices iterations, equal to the serial fine computation
+        self.assertEqual(parareal.nb_iterations, 4)
+        np.testing.assert_allclose(sim.state.state_spect, self.state_ref)
+        self.assertAlmostEqual(sim.time_stepping.t, 0.2)
+        self.assertEqual(sim.time_stepping.it, 20)
+        # the fine simulation is removed at the end of the computation
+        self.assertEqual(len(_simuls), 0)
+
+        parareal = self.run_parareal(nb_iterations_max=2)
+        errors = parareal.errors
+        self.assertEqual(len(errors), 2)
+        self.assertLess(errors[1], errors[0])
+
+    def test_parareal_coarse_oper(self):
+        parareal = self.run_parareal(coef_coarsening=2)
+        self.assertEqual(parareal.sim_coarse.params.oper.nx, 8)
+        np.testing.assert_allclose(parareal.sim.state.state_spect, self.state_ref)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,13 +10,83 @@ Provides:
 """
 
 from signal import signal
+from threading import Timer
 from warnings import warn
 from math import pi
 from datetime import datetime, timedelta
 from time import time
 
+import numpy as np
+
+from transonic import boost, Array, NDim, Transonic, Type
+
 from fluiddyn.util import mpi
 
+ts = Transonic()
+
+T = Type(np.float64, np.float32)
+A = Array[T, NDim(1, 2, 3)]
+A2 = Array[T, "2d"]
+A2f = Array[np.float64, "2d"]
+
+
+@boost
+def compute_max_abs(arr: A):
+    """Compute the maximum of the absolute value of a real array.
+
+    Contrary to ``abs(arr).max()``, no temporary array is allocated.
+
+    """
+    return max(arr.max(), -arr.min())
+
+
+@boost
+def _compute_max_abs_and_sum_squares_loops(arr: A2, result: A2f):
+    """Single pass computation of the maxima of |arr| and the sums of arr**2."""
+    nk, n = arr.shape
+    for ik in range(nk):
+        max_abs = 0.0
+        sum_squares = 0.0
+        for index in range(n):
+            value = arr[ik, index]
+            if abs(value) > max_abs:
+                max_abs = abs(value)
+            sum_squares += value * value
+        result[0, ik] = max_abs
+        result[1, ik] = sum_squares
+
+
+def compute_max_abs_and_sum_squares(arr):
+    """Compute the maxima of |arr[ik]| and the sums of arr[ik]**2.
+
+    With the compiled extension, the data is read only once. If the array
+    contains a NaN or an infinite value, the corresponding sum is not finite.
+
+    Returns
+    -------
+
+    result : np.ndarray
+
+      Array of shape (2, nk): the maxima and the sums.
+
+    """
+    nk = arr.shape[0]
+    arr = np.asarray(arr).reshape(nk, -1)
+    result = np.zeros((2, nk))
+    if arr.shape[1] == 0:
+        return result
+    if ts.is_compiled:
+        _compute_max_abs_and_sum_squares_loops(arr, result)
+    else:
+        result[0] = np.maximum(arr.max(axis=1), -arr.min(axis=1))
+        # accumulation in double precision (for single precision arrays)
+        result[1] = np.einsum("ij,ij->i", arr, arr, dtype=np.float64)
+    return result
+
+
+class NaNError(ValueError):
+    """Raised when the state contains NaN or infinite values."""
+
 
 class TimeSteppingBase0:
     """Universal time stepping class used for all solvers.
@@ -37,7 +107,12 @@ class TimeSteppingBase0:
             "deltat0": 0.2,
             "deltat_max": 0.2,
             "cfl_coef": None,
+            "cfl_period": 1,
+            "cfl_nonblocking": False,
+            "cfl_safety_factor": 0.9,
             "max_elapsed": None,
+            "max_elapsed_margin": 0.0,
+            "max_elapsed_check_period": 20,
         }
         params._set_child("time_stepping", attribs=attribs)
 
@@ -65,7 +140,12 @@ USE_CFL: bool (default False)
 
 type_time_scheme: str (default "RK4")
 
-    Type of time scheme. Can be in ("RK2", "RK4").
+    Type of time scheme. Can be in ("RK2", "RK4"). The pseudo-spectral solvers
+    also support the low-storage schemes "RK3_2N" and "RK4_2N", the
+    phase-shifting schemes "RK2_phaseshift" and "AB2_phaseshift", the
+    Adams-Bashforth schemes "AB2" and "AB3", the adaptive scheme "BS32" and
+    the exponential time differencing scheme "ETDRK4" (see
+    :mod:`fluidsim.base.time_stepping.pseudo_spect`).
 
 deltat0: float (default 0.2)
 
@@ -80,12 +160,49 @@ cfl_coef: float (default None)
     If not None, clf_coef used in the CFL condition. If None, the value is choosen
     taking into account the time scheme.
 
+cfl_period: int (default 1)
+
+    Number of time steps between two computations of the time step with the
+    CFL condition.
+
+cfl_nonblocking: bool (default False)
+
+    If True (and with MPI), the global reduction of the CFL condition is
+    overlapped with the computation of the time step (non-blocking
+    allreduce). The time step is then computed from the state of the
+    previous time step. The quantities computed to check the state (see
+    `_check_health`) are reduced with the same non-blocking allreduce.
+
+cfl_safety_factor: float (default 0.9)
+
+    Factor applied to the CFL coefficient if cfl_period > 1 or if
+    cfl_nonblocking is True, to take into account that the time step is
+    computed from an older state.
+
 max_elapsed: number or str (default None)
 
     If not None, the computation stops when the elapsed time becomes larger
     than `max_elapsed`. Can be a number (in seconds) or a string (formated as
     "%H:%M:%S").
 
+    The deadline is watched by a timer thread on the process 0. The
+    corresponding flag is communicated to the other processes with the global
+    reductions used for the CFL condition (pseudo-spectral solvers) or, if
+    there is no such reduction during `max_elapsed_check_period` time steps,
+    with a broadcast. When the deadline is reached, the time loop stops and
+    the simulation ends normally (in particular, the state is saved if
+    `params.output.HAS_TO_SAVE` is True).
+
+max_elapsed_margin: float (default 0.)
+
+    Safety margin (in seconds) before `max_elapsed`, to keep time for the last
+    time steps and for saving the state.
+
+max_elapsed_check_period: int (default 20)
+
+    Maximum number of time steps between two communications of the flag
+    indicating that the deadline has been reached (with MPI).
+
 """
         )
 
@@ -97,6 +214,26 @@ max_elapsed: number or str (default None)
         self.t = 0
 
         self._has_to_stop = False
+        self._deadline_reached = False
+        self._timer_deadline = None
+
+        # False for sequential operators used with MPI (for example by the
+        # propagators of the parareal algorithm)
+        self._is_distributed = mpi.nb_proc > 1 and not getattr(
+            getattr(sim, "oper", None), "is_sequential", False
+        )
+
+        params_ts = self.params.time_stepping
+        self._cfl_period = params_ts.cfl_period
+        self._cfl_nonblocking = params_ts.cfl_nonblocking and self._is_distributed
+        self._request_CFL = None
+        self._is_deltat_CFL_initialized = False
+        # last upper bound of the time step given by the CFL condition
+        self._deltat_CFL = None
+        self._it_health = None
+        self._it_health_local = None
+        # last iteration for which the stop flag has been communicated
+        self._it_stop_flag = 0
 
         def handler_signals(signal_number, stack):
             print(f"signal {signal_number} received.")
@@ -123,10 +260,36 @@ max_elapsed: number or str (default None)
                 t_start = time()
             if mpi.nb_proc > 1:
                 t_start = mpi.comm.bcast(t_start, root=0)
-            self._time_should_stop = t_start + self.max_elapsed
+            self._time_should_stop = (
+                t_start + self.max_elapsed - params_ts.max_elapsed_margin
+            )
+            if mpi.rank == 0:
+                self._timer_deadline = Timer(
+                    max(self._time_should_stop - time(), 0.0),
+                    self._set_deadline_reached,
+                )
+                self._timer_deadline.daemon = True
+                self._timer_deadline.start()
         else:
             self.max_elapsed = None
 
+    def _set_deadline_reached(self):
+        """Called by the timer thread when the deadline is reached."""
+        self._deadline_reached = True
+
+    def _get_local_stop_flag(self):
+        """Local flag (float) to be reduced over the processes."""
+        return float(self._deadline_reached or self._has_to_stop)
+
+    def _set_global_stop_flag(self, flag):
+        """Stop the time loop if the flag (reduced over the processes) is set."""
+        if not flag or self._has_to_stop:
+            return
+        self.sim.output.print_stdout(
+            "Maximum elapsed time reached. Should stop soon."
+        )
+        self._has_to_stop = True
+
     def start(self):
         """Loop to run the function :func:`one_time_step`.
 
@@ -175,26 +338,42 @@ max_elapsed: number or str (default None)
 
     def one_time_step(self):
         """Main time stepping function."""
-        if self.params.time_stepping.USE_CFL:
+        if (
+            self.params.time_stepping.USE_CFL
+            and self.it % self._cfl_period == 0
+        ):
             self.compute_time_increment_CLF()
         if self.sim.is_forcing_enabled:
             self.sim.forcing.compute()
         if self.max_elapsed is not None:
-            if mpi.rank == 0:
-                now = time()
-            else:
-                now = None
-            if mpi.nb_proc > 1:
-                now = mpi.comm.bcast(now, root=0)
-            if now > self._time_should_stop:
-                self.sim.output.print_stdout(
-                    "Maximum elapsed time reached. Should stop soon."
-                )
-                self._has_to_stop = True
+            self._check_deadline()
         self.sim.output.one_time_step()
         self.one_time_step_computation()
         self.t += self.deltat
         self.it += 1
+        if self._request_CFL is not None:
+            self._finish_compute_time_increment_CLF()
+
+    def _check_deadline(self):
+        """Check if the deadline (max_elapsed) has been reached.
+
+        With MPI, the flag is reduced over the processes together with the
+        quantities computed by :func:`_check_health`. If it has not been
+        communicated during `max_elapsed_check_period` time steps, it is
+        broadcasted from the process 0.
+
+        """
+        if mpi.nb_proc == 1:
+            self._set_global_stop_flag(self._deadline_reached)
+        elif (
+            self.it - self._it_stop_flag
+            >= self.params.time_stepping.max_elapsed_check_period
+        ):
+            flag = None
+            if mpi.rank == 0:
+                flag = self._deadline_reached
+            self._set_global_stop_flag(mpi.comm.bcast(flag, root=0))
+            self._it_stop_flag = self.it
 
 
 class TimeSteppingBase(TimeSteppingBase0):
@@ -209,9 +388,28 @@ class TimeSteppingBase(TimeSteppingBase0):
                 self.CFL = 0.4
             elif params_ts.type_time_scheme == "RK4":
                 self.CFL = 1.0
+            elif params_ts.type_time_scheme == "RK3_2N":
+                self.CFL = 0.6
+            elif params_ts.type_time_scheme == "RK4_2N":
+                self.CFL = 1.0
+            elif params_ts.type_time_scheme == "RK2_phaseshift":
+                self.CFL = 0.4
+            elif params_ts.type_time_scheme == "AB2_phaseshift":
+                self.CFL = 0.3
+            elif params_ts.type_time_scheme == "AB2":
+                self.CFL = 0.2
+            elif params_ts.type_time_scheme == "AB3":
+                self.CFL = 0.25
+            elif params_ts.type_time_scheme == "BS32":
+                self.CFL = 0.6
+            elif params_ts.type_time_scheme == "ETDRK4":
+                self.CFL = 1.0
             else:
                 raise ValueError("Problem name time_scheme")
 
+            if params_ts.cfl_period > 1 or params_ts.cfl_nonblocking:
+                self.CFL *= params_ts.cfl_safety_factor
+
         else:
             self.deltat = params_ts.deltat0
 
@@ -271,36 +469,179 @@ class TimeSteppingBase(TimeSteppingBase0):
 
     def _compute_time_increment_CLF_uxuyuz(self):
         """Compute the time increment deltat with a CLF condition."""
+        (max_ux, max_uy, max_uz), is_global = self._get_max_abs_phys(
+            "vx", "vy", "vz"
+        )
+        tmp = (
+            max_ux / self.sim.oper.deltax
+            + max_uy / self.sim.oper.deltay
+            + max_uz / self.sim.oper.deltaz
+        )
+        self._compute_time_increment_CLF_from_tmp(tmp, is_global=is_global)
+
+    def _check_health(self):
+        """Check the physical state and compute per-step global quantities.
+
+        The maxima of the absolute values of the physical variables are
+        computed together with a flag indicating NaN or infinite values in one
+        pass over the data (see :func:`compute_max_abs_and_sum_squares`). The
+        maxima are then used for the CFL condition of the next time step.
+
+        With MPI, these quantities and the flag to stop the time loop are
+        reduced over the processes (with one allreduce) only when they are
+        needed (see :func:`_has_to_reduce_health`) or, with
+        `cfl_nonblocking`, together with the CFL condition (see
+        :func:`_start_compute_time_increment_CLF`). Otherwise, the flag for
+        NaN values is only checked locally.
+
+        """
+        state_phys = self.sim.state.state_phys
+        nk = state_phys.shape[0]
+        maxima, sums_squares = compute_max_abs_and_sum_squares(state_phys)
+        results = np.empty(nk + 2)
+        results[:nk] = maxima
+        results[nk] = self._get_local_stop_flag()
+        results[nk + 1] = not np.isfinite(sums_squares.sum())
+
+        # the time step has not yet been incremented
+        self._it_health_local = self.it + 1
+        self._results_health_local = results
+        self._max_abs_phys_local = dict(zip(state_phys.keys, maxima))
+
+        if not self._is_distributed:
+            self._set_results_health(results, self.it + 1)
+        elif self._has_to_reduce_health():
+            mpi.comm.Allreduce(mpi.MPI.IN_PLACE, results, op=mpi.MPI.MAX)
+            self._set_results_health(results, self.it + 1)
+        elif results[nk + 1]:
+            raise NaNError(f"nan at it = {self.it}, t = {self.t:.4f}")
+
+    def _has_to_reduce_health(self):
+        """Check if the quantities computed by :func:`_check_health` have to be
+        reduced at the end of the time step (with MPI).
+
+        They are reduced before the iterations for which the CFL condition is
+        computed (except with `cfl_nonblocking`).
+
+        """
+        it_next = self.it + 1
+        if self.params.time_stepping.USE_CFL and it_next % self._cfl_period == 0:
+            # with cfl_nonblocking, reduced together with the CFL condition
+            return not (self._cfl_nonblocking and self._is_deltat_CFL_initialized)
+        return False
+
+    def _set_results_health(self, results, it_health):
+        """Set the global quantities computed by :func:`_check_health`."""
+        state_phys = self.sim.state.state_phys
+        nk = state_phys.shape[0]
+        self._max_abs_phys = dict(zip(state_phys.keys, results[:nk]))
+        self._it_health = it_health
+
+        if self._is_distributed:
+            self._set_global_stop_flag(results[nk])
+            self._it_stop_flag = self.it
+
+        if results[nk + 1]:
+            raise NaNError(f"nan at it = {self.it}, t = {self.t:.4f}")
+
+    def _get_max_abs_phys(self, *keys):
+        """Get the maxima of the absolute values of physical variables.
+
+        Returns
+        -------
+
+        maxima : list
+
+        is_global : bool
+
+          True if the maxima have already been reduced over the processes
+          (computed by :func:`_check_health` at the end of the previous time
+          step).
+
+        """
+        if self._it_health == self.it and all(
+            key in self._max_abs_phys for key in keys
+        ):
+            return [self._max_abs_phys[key] for key in keys], True
+
+        if self._it_health_local == self.it and all(
+            key in self._max_abs_phys_local for key in keys
+        ):
+            return [self._max_abs_phys_local[key] for key in keys], False
+
         get_var = self.sim.state.get_var
-        ux = get_var("vx")
-        uy = get_var("vy")
-        uz = get_var("vz")
-
-        if ux.size > 0:
-            max_ux = abs(ux).max()
-            max_uy = abs(uy).max()
-            max_uz = abs(uz).max()
-            tmp = (
-                max_ux / self.sim.oper.deltax
-                + max_uy / self.sim.oper.deltay
-                + max_uz / self.sim.oper.deltaz
-            )
-        else:
-            tmp = 0.0
+        maxima = []
+        for key in keys:
+            var = get_var(key)
+            maxima.append(compute_max_abs(var) if var.size > 0 else 0.0)
+        return maxima, False
 
-        self._compute_time_increment_CLF_from_tmp(tmp)
+    def _compute_time_increment_CLF_from_tmp(
+        self, tmp, deltat_other=None, is_global=False
+    ):
+        """Reduce tmp over the processes and compute the time increment.
+
+        ``tmp`` is the local maximum of the CFL frequency (or the global one
+        if ``is_global``) and ``deltat_other`` an optional other upper bound
+        of the time step.
+
+        """
+        if is_global:
+            self._set_deltat_from_freq_CFL(tmp, deltat_other)
+            return
 
-    def _compute_time_increment_CLF_from_tmp(self, tmp):
+        if self._cfl_nonblocking and self._is_deltat_CFL_initialized:
+            self._start_compute_time_increment_CLF(tmp, deltat_other)
+            return
 
-        if mpi.nb_proc > 1:
+        if self._is_distributed:
             tmp = mpi.comm.allreduce(tmp, op=mpi.MPI.MAX)
 
-        if tmp > 0:
-            deltat_CFL = self.CFL / tmp
+        self._set_deltat_from_freq_CFL(tmp, deltat_other)
+
+    def _start_compute_time_increment_CLF(self, tmp, deltat_other):
+        """Start the non-blocking reduction for the CFL condition.
+
+        The local quantities computed by :func:`_check_health` at the end of
+        the previous time step are reduced with the same allreduce.
+
+        """
+        if self._request_CFL is not None:
+            self._finish_compute_time_increment_CLF()
+        if self._it_health_local == self.it:
+            sendbuf = np.concatenate(([tmp], self._results_health_local))
+            self._it_health_CFL = self.it
+        else:
+            sendbuf = np.array([tmp])
+            self._it_health_CFL = None
+        self._buffers_CFL = sendbuf, np.empty_like(sendbuf)
+        self._deltat_other_CFL = deltat_other
+        self._request_CFL = mpi.comm.Iallreduce(
+            self._buffers_CFL[0], self._buffers_CFL[1], op=mpi.MPI.MAX
+        )
+
+    def _finish_compute_time_increment_CLF(self):
+        """Finish the non-blocking reduction and set the time increment."""
+        self._request_CFL.Wait()
+        self._request_CFL = None
+        recvbuf = self._buffers_CFL[1]
+        if self._it_health_CFL is not None:
+            self._set_results_health(recvbuf[1:], self._it_health_CFL)
+        self._set_deltat_from_freq_CFL(recvbuf[0], self._deltat_other_CFL)
+
+    def _set_deltat_from_freq_CFL(self, freq_CFL, deltat_other=None):
+        """Set the time increment from the (global) CFL frequency."""
+        self._is_deltat_CFL_initialized = True
+
+        if freq_CFL > 0:
+            deltat_CFL = self.CFL / freq_CFL
         else:
             deltat_CFL = self.deltat_max
 
         maybe_new_dt = min(deltat_CFL, self.deltat_max)
+        if deltat_other is not None:
+            maybe_new_dt = min(maybe_new_dt, deltat_other)
+        self._deltat_CFL = maybe_new_dt
         normalize_diff = abs(self.deltat - maybe_new_dt) / maybe_new_dt
 
         if normalize_diff > 0.02:
@@ -309,20 +650,15 @@ class TimeSteppingBase(TimeSteppingBase0):
     def _compute_time_increment_CLF_uxuy(self):
         """Compute the time increment deltat with a CLF condition."""
 
-        ux = self.sim.state.get_var("ux")
-        uy = self.sim.state.get_var("uy")
-
-        max_ux = abs(ux).max()
-        max_uy = abs(uy).max()
+        (max_ux, max_uy), is_global = self._get_max_abs_phys("ux", "uy")
         tmp = max_ux / self.sim.oper.deltax + max_uy / self.sim.oper.deltay
 
-        self._compute_time_increment_CLF_from_tmp(tmp)
+        self._compute_time_increment_CLF_from_tmp(tmp, is_global=is_global)
 
     def _compute_time_increment_CLF_uxuyeta(self):
         """Compute the time increment deltat with a CLF condition."""
 
-        ux = self.sim.state.get_var("ux")
-        uy = self.sim.state.get_var("uy")
+        (max_ux, max_uy), is_global = self._get_max_abs_phys("ux", "uy")
 
         params = self.sim.params
         try:
@@ -343,33 +679,20 @@ class TimeSteppingBase(TimeSteppingBase0):
 
             cph = (f ** 2 / k_min ** 2 + params.c2) ** 0.5
 
-        max_ux = abs(ux).max()
-        max_uy = abs(uy).max()
         tmp = max_ux / self.sim.oper.deltax + max_uy / self.sim.oper.deltay
 
-        if mpi.nb_proc > 1:
-            tmp = mpi.comm.allreduce(tmp, op=mpi.MPI.MAX)
-
-        if tmp > 0:
-            deltat_CFL = self.CFL / tmp
-        else:
-            deltat_CFL = self.deltat_max
-
         deltat_wave = (
             self.CFL * min(self.sim.oper.deltax, self.sim.oper.deltay) / cph
         )
-        maybe_new_dt = min(deltat_CFL, deltat_wave, self.deltat_max)
-        normalize_diff = abs(self.deltat - maybe_new_dt) / maybe_new_dt
-
-        if normalize_diff > 0.02:
-            self.deltat = maybe_new_dt
+        self._compute_time_increment_CLF_from_tmp(
+            tmp, deltat_wave, is_global=is_global
+        )
 
     def _compute_time_increment_CLF_ux(self):
         """Compute the time increment deltat with a CLF condition."""
-        ux = self.sim.state.get_var("ux")
-        max_ux = abs(ux).max()
+        (max_ux,), is_global = self._get_max_abs_phys("ux")
         tmp = max_ux / self.sim.oper.deltax
-        self._compute_time_increment_CLF_from_tmp(tmp)
+        self._compute_time_increment_CLF_from_tmp(tmp, is_global=is_global)
 
     def _compute_time_increment_CLF_U(self):
         """Compute the time increment deltat with a CLF condition."""
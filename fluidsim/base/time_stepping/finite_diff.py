@@ -7,15 +7,23 @@ Provides:
    :members:
    :private-members:
 
-"""
+.. note::
+
+  The matrices of the linear systems solved at each time step depend only on
+  the time step. Their sparse LU factorizations (and the matrices used for
+  the right-hand sides) are kept in a small LRU cache (see
+  `params.time_stepping.max_nb_factorizations`) so that each time step only
+  requires triangular solves, also when the time step computed with the CFL
+  condition comes back to a previous value.
 
-from copy import deepcopy
+"""
 
 import numpy as np
 import scipy.sparse as sparse
-from scipy.sparse.linalg import spsolve
+from scipy.sparse.linalg import spsolve, factorized
 
 from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.operators.cache import CacheArrays
 
 from .base import TimeSteppingBase
 
@@ -30,6 +38,16 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         """
         TimeSteppingBase._complete_params_with_default(params)
         params.time_stepping.type_time_scheme = "RK2"
+        params.time_stepping._set_attrib("max_nb_factorizations", 4)
+        params.time_stepping._set_doc(
+            params.time_stepping._doc
+            + """
+max_nb_factorizations: int (default 4)
+
+    Maximum number of sparse LU factorizations (one per time step value) kept
+    in memory.
+"""
+        )
 
     def __init__(self, sim):
         super().__init__(sim)
@@ -38,6 +56,36 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         self._init_time_scheme()
 
         self.L = sim.linear_operator()
+        self._identity = sparse.identity(
+            sim.state.state_phys.size, format=self.L.format
+        )
+        # factorized solvers and right-hand side operators (keys: deltat)
+        self._cache_factorizations = CacheArrays(
+            None,
+            max_nb_entries=self.params.time_stepping.max_nb_factorizations,
+        )
+
+    def _get_factorization(self, dt):
+        """Get the solver and the right-hand side operator for a time step.
+
+        The solver computes :math:`(1 - dt/2 L)^{-1} b` and the operator is
+        :math:`1 + dt/2 L`.
+
+        """
+        return self._cache_factorizations.get_or_compute(
+            dt, lambda: self._compute_factorization(dt)
+        )
+
+    def _compute_factorization(self, dt):
+        half_dtL = dt / 2 * self.L
+        solve = factorized((self._identity - half_dtL).tocsc())
+        operator_rhs = (self._identity + half_dtL).tocsr()
+        return solve, operator_rhs
+
+    @property
+    def nb_factorizations(self):
+        """Number of factorizations computed since the initialization."""
+        return self._cache_factorizations.nb_misses
 
     def one_time_step_computation(self):
         """One time step"""
@@ -97,7 +145,6 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         """
         dt = self.deltat
         sim = self.sim
-        identity = sparse.identity(sim.state.state_phys.size)
 
         # it seems that there is a bug with the proper RK2 method
         # (it "goes too fast")
@@ -107,6 +154,7 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         # rhs_A1dt2 = self.right_hand_side(sim.state.state_phys,
         #                                  tendenciesNL_0, dt/2)
 
+        # identity = sparse.identity(sim.state.state_phys.size)
         # A_A1dt2 = identity - dt/4*self.L
         # S_A1dt2 = self.invert_to_get_solution(A_A1dt2, rhs_A1dt2)
         # del(rhs_A1dt2, A_A1dt2)
@@ -120,10 +168,15 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
 
         # it seems to work with the basic Newton time stepping:
         tendenciesNL_0 = sim.tendencies_nonlin()
-        rhs_A1dt = self.right_hand_side(sim.state.state_phys, tendenciesNL_0, dt)
-        A_A1dt = identity - dt / 2 * self.L
-        sim.state.state_phys = deepcopy(
-            self.invert_to_get_solution(A_A1dt, rhs_A1dt)
+        state_phys = sim.state.state_phys
+        solve, operator_rhs = self._get_factorization(dt)
+        rhs_A1dt = (
+            operator_rhs.dot(state_phys.ravel()) + dt * tendenciesNL_0.ravel()
+        )
+        sim.state.state_phys = SetOfVariables(
+            input_array=solve(rhs_A1dt).reshape(state_phys.shape),
+            keys=state_phys.keys,
+            info=state_phys.info,
         )
 
     def right_hand_side(self, S, N, dt):
@@ -0,0 +1,332 @@
+"""Parareal (:mod:`fluidsim.base.time_stepping.parareal`)
+======================================================
+
+Provides:
+
+.. autoclass:: Parareal
+   :members:
+   :private-members:
+
+.. autofunction:: propagate
+
+.. note::
+
+  The parareal algorithm (Lions, Maday & Turinici, 2001) splits the time
+  interval in slices. A cheap coarse propagator :math:`G` (few time steps of
+  a low order scheme, possibly on a coarser grid) is used sequentially to
+  predict the states at the beginnings of the slices, whereas the expensive
+  fine propagator :math:`F` (the time scheme of the simulation) can be
+  computed for all slices in parallel. The states are corrected at each
+  iteration with
+
+  .. math::
+
+    U_{n+1}^{k+1} = G(U_n^{k+1}) + F(U_n^k) - G(U_n^k).
+
+  After :math:`k` iterations, the states of the first :math:`k` slices are
+  equal to the states of the serial fine computation. This is mostly useful
+  for small grids for which the spatial parallelization with MPI does not
+  scale.
+
+.. note::
+
+  Without MPI, the fine propagations are computed with the function
+  `map_function` (for example the method `map` of a
+  :class:`concurrent.futures.ProcessPoolExecutor`). Each process builds its
+  own sequential simulation objects from the parameters.
+
+  With MPI, the time slices are distributed over the processes (the fields
+  are not distributed so the simulation has to use a sequential FFT class,
+  see `params.oper.type_fft`). All processes compute the same (cheap) coarse
+  propagations and the states computed by the fine propagations are
+  broadcasted by the processes which computed them.
+
+  The fine propagations have to be deterministic (no random forcing).
+
+"""
+
+from copy import deepcopy
+from uuid import uuid4
+
+import numpy as np
+
+from fluiddyn.util import mpi
+
+# simulation used for the fine propagations (at most one per process)
+_simuls = {}
+
+
+def _get_simul(key, Simul, params):
+    """Get (and create if needed) a simulation used as a propagator.
+
+    The simulations of the previous parareal computations are removed so that
+    the worker processes (for which the simulations cannot be removed by the
+    driver) keep at most one simulation.
+
+    """
+    try:
+        return _simuls[key]
+    except KeyError:
+        pass
+    _simuls.clear()
+    sim = _simuls[key] = Simul(params)
+    return sim
+
+
+def _propagate_simul(sim, state_spect, t_start):
+    """Advance a state over `params.time_stepping.it_end` time steps."""
+    time_stepping = sim.time_stepping
+    state = sim.state
+    state.state_spect[:] = state_spect
+    state.statephys_from_statespect()
+    time_stepping.t = t_start
+    time_stepping.it = 0
+    time_stepping._reset_time_scheme()
+    for _ in range(sim.params.time_stepping.it_end):
+        if sim.is_forcing_enabled:
+            sim.forcing.compute()
+        time_stepping.one_time_step_computation()
+        time_stepping.t += time_stepping.deltat
+        time_stepping.it += 1
+    return np.array(state.state_spect)
+
+
+def propagate(task):
+    """Fine propagation over one time slice (can be run in another process).
+
+    `task` is a tuple `(key, Simul, params, state_spect, t_start)`.
+
+    """
+    key, Simul, params, state_spect, t_start = task
+    return _propagate_simul(_get_simul(key, Simul, params), state_spect, t_start)
+
+
+class Parareal:
+    """Parareal driver for the pseudo-spectral solvers.
+
+    Parameters
+    ----------
+
+    sim : Simul
+
+      Initialized simulation. The computation goes from the current time to
+      `params.time_stepping.t_end` with `params.time_stepping.type_time_scheme`
+      as fine time scheme.
+
+    nb_slices : int
+
+      Number of time slices.
+
+    nb_steps_fine : int
+
+      Number of time steps per slice for the fine propagator.
+
+    nb_steps_coarse : int
+
+      Number of time steps per slice for the coarse propagator.
+
+    type_time_scheme_coarse : str
+
+      Time scheme of the coarse propagator.
+
+    coef_coarsening : int
+
+      Ratio between the resolutions of the fine and coarse propagators.
+
+    map_function : callable
+
+      Function used to compute the fine propagations (builtin :func:`map` by
+      default). Not used with MPI.
+
+    """
+
+    def __init__(
+        self,
+        sim,
+        nb_slices,
+        nb_steps_fine,
+        nb_steps_coarse=1,
+        type_time_scheme_coarse="RK2",
+        coef_coarsening=1,
+        map_function=map,
+    ):
+        if mpi.nb_proc > 1 and not sim.oper.is_sequential:
+            raise ValueError(
+                "With MPI, the time slices are distributed over the processes "
+                "and the simulation has to use a sequential FFT class "
+                "(params.oper.type_fft)"
+            )
+
+        self.sim = sim
+        self.nb_slices = nb_slices
+        self.nb_steps_fine = nb_steps_fine
+        self.coef_coarsening = coef_coarsening
+        self.map_function = map_function
+
+        t_start = sim.time_stepping.t
+        t_end = sim.params.time_stepping.t_end
+        if t_end <= t_start:
+            raise ValueError("params.time_stepping.t_end <= t")
+        self.times_slices = np.linspace(t_start, t_end, nb_slices + 1)
+        self.duration_slice = (t_end - t_start) / nb_slices
+
+        self._Simul = sim.__class__
+        self._key_fine = uuid4().hex
+        self._params_fine = self._make_params_propagator(
+            nb_steps_fine, sim.params.time_stepping.type_time_scheme
+        )
+        params_coarse = self._make_params_propagator(
+            nb_steps_coarse, type_time_scheme_coarse, coef_coarsening
+        )
+        self.sim_coarse = self._Simul(params_coarse)
+        self._shapeK_loc_coarse = self.sim_coarse.oper.shapeK_loc
+        if mpi.nb_proc > 1:
+            # created by all processes at the same time (collective calls)
+            _get_simul(self._key_fine, self._Simul, self._params_fine)
+
+        self.nb_iterations = 0
+        self.errors = []
+
+    def _make_params_propagator(
+        self, nb_steps, type_time_scheme, coef_coarsening=1
+    ):
+        """Make the parameters of a propagator (no output, fixed time step)."""
+        params = deepcopy(self.sim.params)
+        params.NEW_DIR_RESULTS = False
+        params._set_attrib("path_run", self.sim.output.path_run)
+        params.output.HAS_TO_SAVE = False
+        params.init_fields.type = "constant"
+
+        params_ts = params.time_stepping
+        params_ts.USE_CFL = False
+        params_ts.USE_T_END = False
+        params_ts.it_end = nb_steps
+        params_ts.deltat0 = self.duration_slice / nb_steps
+        params_ts.type_time_scheme = type_time_scheme
+        params_ts.max_elapsed = None
+        params_ts.rollback_nb_snapshots = 0
+
+        if coef_coarsening != 1:
+            for letter in "xyz":
+                try:
+                    nb_points = getattr(params.oper, "n" + letter)
+                except AttributeError:
+                    continue
+                setattr(params.oper, "n" + letter, nb_points // coef_coarsening)
+        return params
+
+    def _propagate_coarse(self, state_spect, t_start):
+        """Coarse propagation over one time slice."""
+        if self.coef_coarsening == 1:
+            return _propagate_simul(self.sim_coarse, state_spect, t_start)
+
+        oper = self.sim.oper
+        shapeK_loc_coarse = self._shapeK_loc_coarse
+        state_coarse = np.empty_like(self.sim_coarse.state.state_spect)
+        for ikey in range(state_spect.shape[0]):
+            state_coarse[ikey] = oper.coarse_seq_from_fft_loc(
+                state_spect[ikey], shapeK_loc_coarse
+            )
+        state_coarse = _propagate_simul(self.sim_coarse, state_coarse, t_start)
+        result = np.zeros_like(state_spect)
+        oper.put_coarse_array_in_array_fft(
+            state_coarse, result, self.sim_coarse.oper, shapeK_loc_coarse
+        )
+        return result
+
+    def _make_task_fine(self, states, index):
+        return (
+            self._key_fine,
+            self._Simul,
+            self._params_fine,
+            states[index],
+            self.times_slices[index],
+        )
+
+    def _propagate_fine_slices(self, states, index_start):
+        """Fine propagations of the slices starting from `index_start`."""
+        indices = range(index_start, self.nb_slices)
+        if mpi.nb_proc == 1:
+            tasks = [self._make_task_fine(states, index) for index in indices]
+            return list(self.map_function(propagate, tasks))
+
+        # the slices are distributed over the processes
+        ranks = [(index - index_start) % mpi.nb_proc for index in indices]
+        states_fine = []
+        for index, rank in zip(indices, ranks):
+            if rank == mpi.rank:
+                state_fine = propagate(self._make_task_fine(states, index))
+            else:
+                state_fine = np.empty_like(states[index])
+            states_fine.append(state_fine)
+
+        for state_fine, rank in zip(states_fine, ranks):
+            mpi.comm.Bcast(state_fine, root=rank)
+        return states_fine
+
+    def run(self, nb_iterations_max=None, tol=1e-8):
+        """Run the parareal iterations and set the final state in the simulation.
+
+        The iterations stop when the maximum relative correction of the states
+        is smaller than `tol` or after `nb_iterations_max` iterations (by
+        default `nb_slices`, for which the result is equal to the result of
+        the serial fine computation).
+
+        """
+        if nb_iterations_max is None:
+            nb_iterations_max = self.nb_slices
+
+        sim = self.sim
+        print_stdout = sim.output.print_stdout
+        times = self.times_slices
+        nb_slices = self.nb_slices
+
+        # initial prediction with the coarse propagator
+        states = [np.array(sim.state.state_spect)]
+        if mpi.nb_proc > 1:
+            mpi.comm.Bcast(states[0], root=0)
+        states_coarse = []
+        for index in range(nb_slices):
+            state_coarse = self._propagate_coarse(states[index], times[index])
+            states_coarse.append(state_coarse)
+            states.append(state_coarse)
+
+        try:
+            for iteration in range(nb_iterations_max):
+                # the states at the beginnings of the slices before
+                # `iteration` have converged
+                states_fine = self._propagate_fine_slices(states, iteration)
+                error = 0.0
+                for index in range(iteration, nb_slices):
+                    state_fine = states_fine[index - iteration]
+                    if index == iteration:
+                        state = state_fine
+                    else:
+                        state_coarse = self._propagate_coarse(
+                            states[index], times[index]
+                        )
+                        state = state_coarse + state_fine - states_coarse[index]
+                        states_coarse[index] = state_coarse
+                    error = max(error, abs(state - states[index + 1]).max())
+                    states[index + 1] = state
+
+                norm = abs(states[-1]).max()
+                if norm > 0:
+                    error /= norm
+                self.errors.append(error)
+                self.nb_iterations += 1
+                print_stdout(
+                    f"parareal iteration {self.nb_iterations}: "
+                    f"relative correction = {error:.3e}"
+                )
+                if error < tol:
+                    break
+        finally:
+            _simuls.pop(self._key_fine, None)
+
+        self.states_slices = states
+        sim.state.state_spect[:] = states[-1]
+        sim.state.statephys_from_statespect()
+        time_stepping = sim.time_stepping
+        time_stepping.t = times[-1]
+        time_stepping.it += nb_slices * self.nb_steps_fine
@@ -1,4 +1,4 @@
-"""Time stepping (:mod:`fluidsim.base.time_stepping.pseudo_spect`)
+r"""Time stepping (:mod:`fluidsim.base.time_stepping.pseudo_spect`)
 ========================================================================
 
 Provides:
@@ -7,16 +7,61 @@ Provides:
    :members:
    :private-members:
 
-.. todo::
-
-  It would be interesting to implement phase-shifting timestepping schemes as:
-
-  - RK2 + phase-shifting
-
-  - Adams-Bashforth (leapfrog) + phase-shifting
-
-  For a theoretical presentation of phase-shifting see
-  https://ntrs.nasa.gov/archive/nasa/casi.ntrs.nasa.gov/19810022965.pdf.
+.. note::
+
+  Besides the Runge-Kutta schemes, the following time schemes are
+  implemented. As the Runge-Kutta schemes, they integrate exactly the linear
+  terms.
+
+  - "AB2" and "AB3" (Adams-Bashforth with integrating factor) need only one
+    evaluation of the nonlinear terms per time step (instead of 4 for
+    "RK4"). They are less stable, so they are interesting when the time step
+    is limited by the dissipation or by the required time resolution rather
+    than by the CFL condition.
+
+  - "RK2_phaseshift" and "AB2_phaseshift" compute the nonlinear terms on
+    physical grids shifted such that part of the aliasing errors cancel (see
+    https://ntrs.nasa.gov/archive/nasa/casi.ntrs.nasa.gov/19810022965.pdf),
+    so that they can be used with `params.oper.coef_dealiasing` close to 1.
+
+  - "BS32" (Bogacki-Shampine 3(2) embedded pair) adapts the time step from
+    an estimate of the local error (see `params.time_stepping.tol_adaptive`)
+    within the limits given by `deltat_max` and the CFL condition. Steps for
+    which the error is too large are rejected and recomputed with a smaller
+    time step.
+
+  - "ETDRK4" (exponential time differencing, Cox & Matthews, 2002) also
+    integrates exactly the linear terms in the formula for the nonlinear
+    terms, so that the time step is not limited by stiff linear terms
+    (hyper-viscosity, fast linear waves). Its coefficients (functions
+    :math:`\varphi` of :math:`\sigma dt`) are computed with contour integrals
+    (Kassam & Trefethen, 2005).
+
+  The coefficients for the exact linear terms are recomputed only when the
+  time step changes and are cached for the time steps of the ladder given by
+  `params.time_stepping.ratio_deltat_ladder`.
+
+  Two options concern the memory. If
+  `params.time_stepping.rollback_nb_snapshots` is larger than 0, copies of
+  `state_spect` are kept every `rollback_period` time steps and, when NaN
+  values appear, the simulation is restarted from the last copy with a
+  smaller time step (and possibly a larger hyper-viscosity). After
+  `rollback_max_nb` rollbacks, the last valid state is saved and the error
+  is raised. If `params.time_stepping.compact_storage` is True, the time
+  schemes work on packed arrays containing only the modes not removed by
+  the dealiasing (see
+  :class:`fluidsim.operators.compact.CompactSpectralStorage`), so that their
+  temporary arrays, the exact linear coefficients and the copies for the
+  rollbacks are smaller (about 30% of the full arrays in 3d with the 2/3
+  rule and 44% in 2d). The full arrays are only used to compute the
+  nonlinear terms: the full state of the simulation (also used as buffer for
+  the states of the stages) and one full array for the tendencies. In units
+  of the size of the full state, the spectral arrays of the time stepping
+  use `1 + n` without and `2 + r (1 + n)` with the compact storage, where `n`
+  is the number of arrays of the time scheme (including the exact linear
+  coefficients) and `r` the ratio of retained modes, so that the compact
+  storage saves memory when `n > (1 + r) / (1 - r)` (1.9 in 3d and 2.6 in
+  2d).
 
 """
 
@@ -24,26 +69,51 @@ import numpy as np
 
 from transonic import Transonic, Type, NDim, Array
 
-from .base import TimeSteppingBase
+from fluiddyn.util import mpi
+
+from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.operators.cache import CacheArrays
+from fluidsim.operators.compact import CompactSpectralStorage
+
+from .base import TimeSteppingBase, NaNError
 
 ts = Transonic()
 
-N = NDim(3, 4)
-A = Array[np.complex128, N]
+# 2: compact storage, 3: 2d solvers, 4: 3d solvers and 2d ensembles
+N = NDim(2, 3, 4)
+A = Array[Type(np.complex128, np.complex64), N]
 
-T = Type(np.float64, np.complex128)
+T = Type(np.float64, np.complex128, np.float32, np.complex64)
 A1 = Array[T, N]
 A2 = Array[T, N - 1]
 
 
+class CacheCoefs(CacheArrays):
+    """Bounded LRU cache of arrays of coefficients keyed by the time step.
+
+    Parameters
+    ----------
+
+    max_memory : float
+
+      Maximum memory (in bytes) used by the cached arrays. The least recently
+      used entries are removed when this limit is exceeded (the last added
+      entry is never removed).
+
+    """
+
+
 class ExactLinearCoefs:
     """Handle the computation of the exact coefficient for the RK4."""
 
+    _names_arrays = ("exact", "exact2")
+
     def __init__(self, time_stepping):
         self.time_stepping = time_stepping
         sim = time_stepping.sim
         self.shapeK_loc = sim.oper.shapeK_loc
         self.freq_lin = time_stepping.freq_lin
+        self.cache = getattr(time_stepping, "_cache_exact_coefs", None)
 
         self.exact = np.empty_like(self.freq_lin)
         self.exact2 = np.empty_like(self.freq_lin)
@@ -76,11 +146,50 @@ class ExactLinearCoefs:
             exact2[:] = np.exp(-dt / 2 * f_lin)
         self.dt_old = dt
 
+    def _get_arrays(self):
+        return [getattr(self, name) for name in self._names_arrays]
+
+    def _set_arrays(self, arrays):
+        for name, array in zip(self._names_arrays, arrays):
+            setattr(self, name, array)
+
+    def update(self, dt, use_cache=True):
+        """Update the coefficients for the time step dt.
+
+        If a cache is used, the coefficients are taken from the cache or
+        computed in new arrays added to the cache. With `use_cache=False`
+        (time step not on the ladder), the cache is not modified.
+
+        """
+        cache = self.cache
+        if cache is None:
+            self.compute(dt)
+            return
+
+        if not use_cache:
+            # the current arrays can be in the cache
+            self._set_arrays(
+                [np.empty_like(array) for array in self._get_arrays()]
+            )
+            self.compute(dt)
+            return
+
+        arrays = cache.get(dt)
+        if arrays is not None:
+            self._set_arrays(arrays)
+            self.dt_old = dt
+            return
+
+        # the current arrays can be in the cache so we need new arrays
+        self._set_arrays([np.empty_like(array) for array in self._get_arrays()])
+        self.compute(dt)
+        cache.add(dt, self._get_arrays())
+
     def get_updated_coefs_CLF(self):
         """Get the exact coefficient updated if needed."""
         dt = self.time_stepping.deltat
         if self.dt_old != dt:
-            self.compute(dt)
+            self.update(dt)
         return self.exact, self.exact2
 
     def get_coefs(self):
@@ -88,6 +197,320 @@ class ExactLinearCoefs:
         return self.exact, self.exact2
 
 
+class ExactLinearCoefsStages(ExactLinearCoefs):
+    r"""Handle the computation of the exact coefficients for low-storage schemes.
+
+    One coefficient :math:`e^{\sigma \delta_i dt}` is stored for each stage,
+    where :math:`\delta_i` is the difference between the times of the stages
+    :math:`i+1` and :math:`i` (in units of :math:`dt`).
+
+    """
+
+    def __init__(self, time_stepping, time_increments):
+        self.time_stepping = time_stepping
+        sim = time_stepping.sim
+        self.freq_lin = time_stepping.freq_lin
+        self.cache = getattr(time_stepping, "_cache_exact_coefs", None)
+        self.time_increments = time_increments
+
+        self.exacts = [np.empty_like(self.freq_lin) for _ in time_increments]
+
+        if sim.params.time_stepping.USE_CFL:
+            self.get_updated_coefs = self.get_updated_coefs_CLF
+            self.dt_old = 0.0
+        else:
+            self.compute(time_stepping.deltat)
+            self.get_updated_coefs = self.get_coefs
+
+    def compute(self, dt):
+        """Compute the exact coefficients."""
+        f_lin = self.freq_lin
+        for exact, time_increment in zip(self.exacts, self.time_increments):
+            exact[:] = np.exp(-dt * time_increment * f_lin)
+        self.dt_old = dt
+
+    def _get_arrays(self):
+        return list(self.exacts)
+
+    def _set_arrays(self, arrays):
+        self.exacts = list(arrays)
+
+    def get_updated_coefs_CLF(self):
+        """Get the exact coefficients updated if needed."""
+        dt = self.time_stepping.deltat
+        if self.dt_old != dt:
+            self.update(dt)
+        return self.exacts
+
+    def get_coefs(self):
+        """Get the exact coefficients as stored."""
+        return self.exacts
+
+
+class ExactLinearCoefsETDRK4(ExactLinearCoefs):
+    r"""Handle the computation of the coefficients for the ETDRK4 scheme.
+
+    With :math:`z = \sigma dt`, the coefficients are
+
+    .. math::
+       Q = dt \frac{e^{z/2} - 1}{z}, \quad
+       f_1 = dt \frac{-4 - z + e^z (4 - 3z + z^2)}{z^3},
+
+    .. math::
+       f_2 = dt \frac{2 + z + e^z (-2 + z)}{z^3}, \quad
+       f_3 = dt \frac{-4 - 3z - z^2 + e^z (4 - z)}{z^3}.
+
+    To avoid cancellation errors for small :math:`|z|`, they are computed
+    as means over points on a circle of radius 1 centered on :math:`z` in
+    the complex plane (Kassam & Trefethen, SIAM J. Sci. Comput., 2005).
+
+    """
+
+    nb_points_contour = 32
+    _names_arrays = ("exact", "exact2", "Q", "f1", "f2", "f3")
+
+    def __init__(self, time_stepping):
+        freq_lin = time_stepping.freq_lin
+        self.Q = np.empty_like(freq_lin)
+        self.f1 = np.empty_like(freq_lin)
+        self.f2 = np.empty_like(freq_lin)
+        self.f3 = np.empty_like(freq_lin)
+        nb_points = self.nb_points_contour
+        self.points_contour = np.exp(
+            2j * np.pi * (np.arange(1, nb_points + 1) - 0.5) / nb_points
+        )
+        super().__init__(time_stepping)
+
+    def compute(self, dt):
+        """Compute the coefficients."""
+        super().compute(dt)
+
+        z = -dt * self.freq_lin.astype(np.complex128)
+        Q = np.zeros_like(z)
+        f1 = np.zeros_like(z)
+        f2 = np.zeros_like(z)
+        f3 = np.zeros_like(z)
+        for point in self.points_contour:
+            z_contour = z + point
+            exp_z = np.exp(z_contour)
+            inv_z3 = z_contour ** -3
+            Q += (np.exp(z_contour / 2) - 1) / z_contour
+            f1 += (
+                -4 - z_contour + exp_z * (4 - 3 * z_contour + z_contour ** 2)
+            ) * inv_z3
+            f2 += (2 + z_contour + exp_z * (z_contour - 2)) * inv_z3
+            f3 += (
+                -4 - 3 * z_contour - z_contour ** 2 + exp_z * (4 - z_contour)
+            ) * inv_z3
+
+        coef = dt / self.nb_points_contour
+        is_real = np.isrealobj(self.freq_lin)
+        for result, mean in (
+            (self.Q, Q),
+            (self.f1, f1),
+            (self.f2, f2),
+            (self.f3, f3),
+        ):
+            result[:] = coef * (mean.real if is_real else mean)
+
+    def get_updated_coefs_CLF(self):
+        """Get the coefficients updated if needed."""
+        super().get_updated_coefs_CLF()
+        return self.get_coefs()
+
+    def get_coefs(self):
+        """Get the coefficients as stored."""
+        return self.exact, self.exact2, self.Q, self.f1, self.f2, self.f3
+
+
+# Coefficients (A, B, C) of the 2N-storage Runge-Kutta schemes
+
+# 3 stages, 3rd order (Williamson, J. Comput. Phys., 1980)
+COEFS_RK3_2N = (
+    (0.0, -5.0 / 9, -153.0 / 128),
+    (1.0 / 3, 15.0 / 16, 8.0 / 15),
+    (0.0, 1.0 / 3, 3.0 / 4),
+)
+
+# 5 stages, 4th order (Carpenter & Kennedy, NASA TM-109112, 1994)
+COEFS_RK4_2N = (
+    (
+        0.0,
+        -567301805773 / 1357537059087,
+        -2404267990393 / 2016746695238,
+        -3550918686646 / 2091501179385,
+        -1275806237668 / 842570457699,
+    ),
+    (
+        1432997174477 / 9575080441755,
+        5161836677717 / 13612068292357,
+        1720146321549 / 2090206949498,
+        3134564353537 / 4481467310338,
+        2277821191437 / 14882151754819,
+    ),
+    (
+        0.0,
+        1432997174477 / 9575080441755,
+        2526269341429 / 6820363183537,
+        2006345519317 / 3224310063776,
+        2802321613138 / 2924317926251,
+    ),
+)
+
+
+class _StateCompact:
+    """State seen by the time stepping with the compact storage."""
+
+    def __init__(self, state, storage):
+        self._state = state
+        self._storage = storage
+        state_spect = state.state_spect
+        # the storage can use other variables (see CrayaHerringStorage)
+        keys = getattr(storage, "keys_state_spect", state_spect.keys)
+        self.state_spect = SetOfVariables(
+            input_array=storage.create_array(len(keys), state_spect.dtype),
+            keys=keys,
+            info="state_spect_compact",
+        )
+        # False when the full state is used as buffer for other states
+        self.is_full_state_current = True
+
+    def __getattr__(self, name):
+        return getattr(self._state, name)
+
+    def gather_state_spect(self):
+        """Gather the retained modes of the full state.
+
+        The full state is also dealiased since its dealiased modes are not
+        updated by the time schemes (the initial state can contain them).
+
+        """
+        state_spect = self._state.state_spect
+        self._storage.gather(state_spect, out=self.state_spect)
+        self._state.oper.dealiasing(state_spect)
+        self.is_full_state_current = True
+
+    def statephys_from_statespect(self):
+        """Update the full state and compute the physical state."""
+        self._storage.scatter(self.state_spect, self._state.state_spect)
+        self._state.statephys_from_statespect()
+        self.is_full_state_current = True
+
+
+class _OperCompact:
+    """Operator seen by the time stepping with the compact storage."""
+
+    def __init__(self, oper, storage):
+        self._oper = oper
+        self._storage = storage
+
+    def __getattr__(self, name):
+        return getattr(self._oper, name)
+
+    def dealiasing(self, *args):
+        """Nothing to do: the dealiased modes are not stored."""
+
+    def project_perpk3d(self, vx_fft, vy_fft, vz_fft):
+        """Project (inplace) a compact vector perpendicular to the wavevector."""
+        try:
+            Kx, Ky, Kz, inv_K_square_nozero = self._arrays_project_perpk3d
+        except AttributeError:
+            oper = self._oper
+            Kx, Ky, Kz, inv_K_square_nozero = self._arrays_project_perpk3d = [
+                np.asarray(self._storage.gather(arr), dtype=oper.dtype_real)
+                for arr in (oper.Kx, oper.Ky, oper.Kz, oper.inv_K_square_nozero)
+            ]
+        tmp = (Kx * vx_fft + Ky * vy_fft + Kz * vz_fft) * inv_K_square_nozero
+        vx_fft -= Kx * tmp
+        vy_fft -= Ky * tmp
+        vz_fft -= Kz * tmp
+
+    def project_perpk3d_dealiasing(self, vx_fft, vy_fft, vz_fft):
+        """Project (inplace) a compact vector (nothing to dealiase)."""
+        self.project_perpk3d(vx_fft, vy_fft, vz_fft)
+
+
+class _SimulCompact:
+    """Simulation seen by the time stepping with the compact storage.
+
+    The nonlinear tendencies are computed with full arrays. The full state of
+    the simulation is used as buffer for the states of the stages of the time
+    schemes (it is updated at the end of each time step), so that only one
+    other full array (for the tendencies) is allocated.
+
+    """
+
+    def __init__(self, sim, storage):
+        self._sim = sim
+        self._storage = storage
+        self.state = _StateCompact(sim.state, storage)
+        self.oper = _OperCompact(sim.oper, storage)
+        self._tendencies_full = SetOfVariables(like=sim.state.state_spect)
+        if hasattr(sim, "compute_freq_complex"):
+            self.compute_freq_complex = self._compute_freq_complex
+
+    def __getattr__(self, name):
+        return getattr(self._sim, name)
+
+    def compute_freq_diss(self):
+        return tuple(
+            self._storage.gather(freq) for freq in self._sim.compute_freq_diss()
+        )
+
+    def _compute_freq_complex(self, key):
+        return self._storage.gather(self._sim.compute_freq_complex(key))
+
+    def tendencies_nonlin(self, state_spect=None, old=None):
+        """Compute the compact nonlinear tendencies."""
+        state = self.state
+        if state_spect is None and not state.is_full_state_current:
+            # for example after a rejected time step
+            state_spect = state.state_spect
+        if state_spect is not None:
+            state_spect_full = self._sim.state.state_spect
+            self._storage.scatter(state_spect, state_spect_full)
+            state.is_full_state_current = False
+            state_spect = state_spect_full
+        tendencies = self._sim.tendencies_nonlin(
+            state_spect, old=self._tendencies_full
+        )
+        if old is None:
+            old = np.empty_like(self.state.state_spect)
+        return self._storage.gather(tendencies, out=old)
+
+
+def compute_coefs_adams_bashforth(dt, deltats_old):
+    """Compute the coefficients of a variable step Adams-Bashforth method.
+
+    Parameters
+    ----------
+
+    dt : float
+
+      Current time step.
+
+    deltats_old : sequence of floats
+
+      Previous time steps (the most recent first). The order of the method is
+      ``len(deltats_old) + 1``.
+
+    Returns
+    -------
+
+    coefs : np.ndarray
+
+      Coefficients of the tendencies (the most recent first).
+
+    """
+    # times of the tendencies in unit of dt (t_n = 0)
+    times = -np.cumsum((0.0,) + tuple(deltats_old)) / dt
+    order = len(times)
+    powers = np.arange(order)
+    # exact integration of the polynomials of degree < order over [0, 1]
+    matrix = times[np.newaxis, :] ** powers[:, np.newaxis]
+    return np.linalg.solve(matrix, 1.0 / (powers + 1))
+
+
 class TimeSteppingPseudoSpectral(TimeSteppingBase):
     """Time stepping class for pseudo-spectral solvers.
 
@@ -99,14 +522,91 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         """
         TimeSteppingBase._complete_params_with_default(params)
         params.time_stepping.USE_CFL = True
+        params.time_stepping._set_attrib("tol_adaptive", 1e-4)
+        params.time_stepping._set_attrib("ratio_deltat_ladder", None)
+        params.time_stepping._set_attrib("max_mem_cache_coefs", 100.0)
+        params.time_stepping._set_attrib("rollback_nb_snapshots", 0)
+        params.time_stepping._set_attrib("rollback_period", 20)
+        params.time_stepping._set_attrib("rollback_coef_deltat", 0.5)
+        params.time_stepping._set_attrib("rollback_coef_nu", 1.0)
+        params.time_stepping._set_attrib("rollback_max_nb", 5)
+        params.time_stepping._set_attrib("compact_storage", False)
+        params.time_stepping._set_attrib("phaseshift_random_seed", None)
+        params.time_stepping._set_doc(
+            params.time_stepping._doc
+            + """
+tol_adaptive: float (default 1e-4)
+
+    Tolerance on the estimate of the local error (relative to the maximum of
+    the state) used by the adaptive time scheme "BS32".
+
+ratio_deltat_ladder: float (default None)
+
+    If not None and if USE_CFL is True, the time step computed with the CFL
+    condition is rounded down to a value of the geometric ladder
+    `deltat_max / ratio_deltat_ladder**n` (n being a natural number) and the
+    exact linear coefficients are kept in a LRU cache, so that they are not
+    recomputed when the time step comes back to a previous value. A typical
+    value is 1.05.
+
+max_mem_cache_coefs: float (default 100.)
+
+    Maximum memory (in MB, per process) used by the cache of exact linear
+    coefficients (see `ratio_deltat_ladder`).
+
+rollback_nb_snapshots: int (default 0)
+
+    Number of copies of the spectral state kept in memory to restart the
+    simulation when NaN values appear. 0 disables the rollbacks. With MPI, the
+    flag indicating NaN values is then reduced over the processes at each time
+    step.
+
+rollback_period: int (default 20)
+
+    Number of time steps between two copies of the state.
+
+rollback_coef_deltat: float (default 0.5)
+
+    Factor applied to the CFL coefficient, `deltat_max` and the time step at
+    each rollback.
+
+rollback_coef_nu: float (default 1.)
+
+    Factor applied to the hyper-viscosity coefficients (`nu_4` and `nu_8`) at
+    each rollback.
+
+rollback_max_nb: int (default 5)
+
+    Maximum number of rollbacks. When it is reached, the last valid state is
+    saved (if `params.output.HAS_TO_SAVE` is True) and the error is raised.
+
+compact_storage: bool (default False)
+
+    If True, the time schemes work on packed arrays containing only the modes
+    not removed by the dealiasing (see
+    :class:`fluidsim.operators.compact.CompactSpectralStorage`). One full
+    array is allocated for the nonlinear tendencies, so that this option
+    saves memory only for time schemes using several arrays (see the module
+    documentation).
+
+phaseshift_random_seed: int (default None)
+
+    Seed of the random shifts of the grid used by the phase-shifting time
+    schemes. If None, the seed is drawn by the process 0 (the same shifts are
+    used by all processes).
+"""
+        )
 
     def __init__(self, sim):
         super().__init__(sim)
 
+        self._init_storage()
         self._init_freq_lin()
         self._init_compute_time_step()
+        self._init_deltat_ladder()
         self._init_exact_linear_coef()
         self._init_time_scheme()
+        self._init_rollback()
 
     def _init_freq_lin(self):
         f_d, f_d_hypo = self.sim.compute_freq_diss()
@@ -119,25 +619,371 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
             self.deltat_max = 0.78 * np.pi / freq_max
         else:
             self.freq_lin = freq_dissip
+        self._set_precision_freq_lin()
+
+    def _set_precision_freq_lin(self):
+        """Use for `freq_lin` the precision of the state (see
+        `params.precision`)."""
+        dtype = self.sim.state.state_spect.dtype
+        if not np.iscomplexobj(self.freq_lin):
+            dtype = np.finfo(dtype).dtype
+        self.freq_lin = self.freq_lin.astype(dtype, copy=False)
+
+    def _init_storage(self):
+        """Initialize the storage of the arrays used by the time schemes."""
+        self.storage_compact = None
+        if self.params.time_stepping.compact_storage:
+            self._init_compact_storage()
+
+    def _init_compact_storage(self):
+        """Use packed arrays of the retained modes for the time schemes."""
+        self.storage_compact = CompactSpectralStorage(self.sim.oper)
+        self.sim = _SimulCompact(self.sim, self.storage_compact)
+
+    def _gather_state_spect(self):
+        """Gather the full state in the compact state (if it is used)."""
+        if self.storage_compact is not None:
+            # the full state can have been modified since the last time step
+            self.sim.state.gather_state_spect()
+
+    def _init_deltat_ladder(self):
+        """Initialize the geometric ladder of time steps and the cache."""
+        params_ts = self.params.time_stepping
+        ratio = params_ts.ratio_deltat_ladder
+        if ratio is None or not params_ts.USE_CFL:
+            self._cache_exact_coefs = None
+            return
+
+        if ratio <= 1:
+            raise ValueError("params.time_stepping.ratio_deltat_ladder <= 1")
+
+        self._log_ratio_deltat_ladder = np.log(ratio)
+        self._cache_exact_coefs = CacheCoefs(
+            params_ts.max_mem_cache_coefs * 1e6
+        )
+        self._compute_time_increment_CLF_no_ladder = (
+            self.compute_time_increment_CLF
+        )
+        self.compute_time_increment_CLF = self._compute_time_increment_CLF_ladder
+
+    def _compute_time_increment_CLF_ladder(self):
+        """Compute the time increment and round it down on the ladder."""
+        self._compute_time_increment_CLF_no_ladder()
+        self.deltat = self._round_deltat_on_ladder(self.deltat)
+
+    def _finish_compute_time_increment_CLF(self):
+        super()._finish_compute_time_increment_CLF()
+        if self._cache_exact_coefs is not None:
+            self.deltat = self._round_deltat_on_ladder(self.deltat)
+
+    def _limit_deltat_adaptive(self, deltat, deltat_end):
+        """Round down an adaptive time step on the ladder (if used) and limit
+        it to reach t_end."""
+        if self._cache_exact_coefs is not None:
+            deltat = self._round_deltat_on_ladder(deltat)
+        return min(deltat, deltat_end)
+
+    def _round_deltat_on_ladder(self, deltat):
+        """Round down a time step to a value of the geometric ladder."""
+        ratio = self.params.time_stepping.ratio_deltat_ladder
+        # small tolerance so that the values of the ladder are not modified
+        index = np.ceil(
+            np.log(self.deltat_max / deltat) / self._log_ratio_deltat_ladder
+            - 1e-9
+        )
+        index = max(int(index), 0)
+        return self.deltat_max / ratio ** index
 
     def _init_time_scheme(self):
 
         params_ts = self.params.time_stepping
 
-        if params_ts.type_time_scheme not in ["RK2", "RK4"]:
+        if params_ts.type_time_scheme not in [
+            "RK2",
+            "RK4",
+            "RK3_2N",
+            "RK4_2N",
+            "RK2_phaseshift",
+            "AB2_phaseshift",
+            "AB2",
+            "AB3",
+            "BS32",
+            "ETDRK4",
+        ]:
             raise ValueError("Problem name time_scheme")
 
-        self._state_spect_tmp = np.empty_like(self.sim.state.state_spect)
+        if params_ts.type_time_scheme.endswith("_2N"):
+            # the register has to be initialized because the first coefficient
+            # A is equal to 0 (and 0 * nan = nan)
+            self._state_spect_tmp = np.zeros_like(self.sim.state.state_spect)
+        else:
+            self._state_spect_tmp = np.empty_like(self.sim.state.state_spect)
+
+        if params_ts.type_time_scheme in ("RK4", "AB2", "AB3"):
+            self._state_spect_tmp1 = np.empty_like(self.sim.state.state_spect)
+
+        if params_ts.type_time_scheme.endswith("_phaseshift"):
+            self._init_phase_shift()
+
+        if params_ts.type_time_scheme in ("AB2", "AB3"):
+            self._init_adams_bashforth()
 
-        if params_ts.type_time_scheme == "RK4":
+        if params_ts.type_time_scheme == "BS32":
+            self._init_adaptive()
+
+        if params_ts.type_time_scheme == "ETDRK4":
             self._state_spect_tmp1 = np.empty_like(self.sim.state.state_spect)
+            self._tendencies_stages = [
+                np.empty_like(self.sim.state.state_spect) for _ in range(4)
+            ]
 
         if params_ts.type_time_scheme == "RK2":
             time_step_RK = self._time_step_RK2
-        else:
+        elif params_ts.type_time_scheme == "RK4":
             time_step_RK = self._time_step_RK4
+        elif params_ts.type_time_scheme == "RK2_phaseshift":
+            time_step_RK = self._time_step_RK2_phaseshift
+        elif params_ts.type_time_scheme == "AB2_phaseshift":
+            time_step_RK = self._time_step_AB2_phaseshift
+        elif params_ts.type_time_scheme in ("AB2", "AB3"):
+            time_step_RK = self._time_step_AB
+        elif params_ts.type_time_scheme == "BS32":
+            time_step_RK = self._time_step_BS32
+        elif params_ts.type_time_scheme == "ETDRK4":
+            time_step_RK = self._time_step_ETDRK4
+        else:
+            time_step_RK = self._time_step_RK_2N
         self._time_step_RK = time_step_RK
 
+    def _reset_time_scheme(self):
+        """Forget the previous time steps (multistep and adaptive schemes).
+
+        Contrary to :func:`_init_time_scheme`, no array is allocated.
+
+        """
+        type_time_scheme = self.params.time_stepping.type_time_scheme
+        if type_time_scheme in ("AB2", "AB3"):
+            self._deltats_history = []
+        elif type_time_scheme == "AB2_phaseshift":
+            self._deltat_old = None
+        elif type_time_scheme == "BS32":
+            self._deltat_adaptive = None
+            self._has_tendencies_fsal = False
+        if type_time_scheme.endswith("_phaseshift"):
+            self._phase_shift = None
+
+    def _init_rollback(self):
+        """Initialize the in-memory snapshots used for the rollbacks."""
+        self._snapshots_rollback = []
+        self.nb_rollbacks = 0
+        self._it_last_rollback = None
+
+    def _save_snapshot_rollback(self):
+        """Save a copy of the spectral state in memory."""
+        snapshots = self._snapshots_rollback
+        state_spect = self.sim.state.state_spect
+        if len(snapshots) < self.params.time_stepping.rollback_nb_snapshots:
+            array = np.empty_like(state_spect)
+        else:
+            # reuse the array of the oldest snapshot
+            array = snapshots.pop(0)["state_spect"]
+        array[:] = state_spect
+        snapshots.append(
+            {
+                "state_spect": array,
+                "it": self.it,
+                "t": self.t,
+                "deltat": self.deltat,
+            }
+        )
+
+    def one_time_step(self):
+        """Main time stepping function (with rollbacks if NaN values appear)."""
+        params_ts = self.params.time_stepping
+        if params_ts.rollback_nb_snapshots == 0:
+            super().one_time_step()
+            return
+
+        if self.it % params_ts.rollback_period == 0 and (
+            not self._snapshots_rollback
+            or self._snapshots_rollback[-1]["it"] != self.it
+        ):
+            self._save_snapshot_rollback()
+
+        try:
+            super().one_time_step()
+        except NaNError as error:
+            self._rollback(error)
+
+    def _has_to_reduce_health(self):
+        if self.params.time_stepping.rollback_nb_snapshots > 0:
+            # all processes have to detect the NaN values to roll back together
+            return True
+        return super()._has_to_reduce_health()
+
+    def _restore_snapshot_rollback(self, snapshot):
+        """Restore a state saved in memory."""
+        if self._request_CFL is not None:
+            self._request_CFL.Wait()
+            self._request_CFL = None
+        state = self.sim.state
+        state.state_spect[:] = snapshot["state_spect"]
+        state.statephys_from_statespect()
+        self.it = snapshot["it"]
+        self.t = snapshot["t"]
+        self.deltat = snapshot["deltat"]
+        self._it_health = None
+        self._has_tendencies_fsal = False
+
+    def _rollback(self, error):
+        """Restart from the last snapshot with more conservative parameters."""
+        params_ts = self.params.time_stepping
+        print_stdout = self.sim.output.print_stdout
+        snapshots = self._snapshots_rollback
+        if snapshots[-1]["it"] == self._it_last_rollback and len(snapshots) > 1:
+            # failure after a rollback to the same snapshot: use an older one
+            snapshots.pop()
+        snapshot = snapshots[-1]
+
+        if self.nb_rollbacks >= params_ts.rollback_max_nb:
+            print_stdout(
+                f"{error}: maximum number of rollbacks reached, "
+                f"saving the state at it = {snapshot['it']}"
+            )
+            self._restore_snapshot_rollback(snapshot)
+            if self.sim.output._has_to_save:
+                self.sim.output.phys_fields.save()
+            raise error
+
+        self.nb_rollbacks += 1
+        self._restore_snapshot_rollback(snapshot)
+        self._it_last_rollback = self.it
+
+        coef_deltat = params_ts.rollback_coef_deltat
+        deltat_max = self.deltat_max * coef_deltat
+        self.deltat *= coef_deltat
+        if params_ts.USE_CFL:
+            self.CFL *= coef_deltat
+
+        coef_nu = params_ts.rollback_coef_nu
+        if coef_nu != 1:
+            params = self.sim.params
+            for name in ("nu_4", "nu_8"):
+                if getattr(params, name, 0):
+                    setattr(params, name, getattr(params, name) * coef_nu)
+            self._init_freq_lin()
+            if self._cache_exact_coefs is not None:
+                self._cache_exact_coefs = CacheCoefs(
+                    self._cache_exact_coefs.max_memory
+                )
+        self.deltat_max = deltat_max
+
+        # reset the coefficients and the multistep schemes
+        self._init_exact_linear_coef()
+        self._init_time_scheme()
+
+        print_stdout(
+            f"{error}: rollback {self.nb_rollbacks} to it = {self.it}, "
+            f"t = {self.t:.4f} (deltat = {self.deltat:.4g}, "
+            f"deltat_max = {self.deltat_max:.4g})"
+        )
+
+    def _init_phase_shift(self):
+        """Initialize the phase-shifting time schemes."""
+        if self.storage_compact is not None:
+            raise ValueError(
+                "The phase-shifting time schemes cannot be used with "
+                "params.time_stepping.compact_storage"
+            )
+        oper = self.sim.oper
+        self._deltas_phase_shift = np.array(
+            [getattr(oper, "delta" + axis) for axis in oper.axes]
+        )
+        # shift of half a grid step over all axes
+        self._phase_shift_half = oper.get_phase_shift(
+            self._deltas_phase_shift / 2
+        )
+        self._phase_shift_conj = np.empty_like(self._phase_shift_half)
+        self._state_spect_shifted = SetOfVariables(
+            like=self.sim.state.state_spect, info="state_spect_shifted"
+        )
+        # same sequence of random shifts for all processes
+        seed = self.params.time_stepping.phaseshift_random_seed
+        if seed is None:
+            if mpi.rank == 0:
+                seed = np.random.randint(2 ** 31)
+            if mpi.nb_proc > 1:
+                seed = mpi.comm.bcast(seed, root=0)
+        self._random_state_phase_shift = np.random.RandomState(seed)
+        self._phase_shift = None
+        # for the Adams-Bashforth scheme
+        self._tendencies_old = None
+        self._deltat_old = None
+
+    def _init_adams_bashforth(self):
+        """Initialize the Adams-Bashforth time schemes."""
+        order = int(self.params.time_stepping.type_time_scheme[2:])
+        # previous tendencies multiplied by the exact linear coefficients
+        # (the most recent first)
+        self._tendencies_history = [
+            np.empty_like(self.sim.state.state_spect) for _ in range(order - 1)
+        ]
+        # previous time steps (the most recent first)
+        self._deltats_history = []
+
+    def _init_adaptive(self):
+        """Initialize the adaptive time scheme."""
+        self._state_spect_tmp1 = np.empty_like(self.sim.state.state_spect)
+        self._tendencies_stages = [
+            np.empty_like(self.sim.state.state_spect) for _ in range(4)
+        ]
+        self.tol_adaptive = self.params.time_stepping.tol_adaptive
+        # time step proposed by the error controller for the next time step
+        self._deltat_adaptive = None
+        self.nb_steps_rejected = 0
+        # True if the first tendencies of the next step are already computed
+        self._has_tendencies_fsal = False
+
+    def _get_phase_shift_random(self):
+        """Compute a phase shift factor for a random shift of the grid.
+
+        Computed once per time step (and multiplied inplace by the factor of
+        the half grid step shift).
+
+        """
+        shift = (
+            self._random_state_phase_shift.random_sample(
+                len(self._deltas_phase_shift)
+            )
+            * self._deltas_phase_shift
+        )
+        return self.sim.oper.get_phase_shift(shift)
+
+    def _compute_tendencies_phase_shifted(self, phase_shift, state_spect, old):
+        r"""Compute the nonlinear tendencies on a shifted grid.
+
+        The nonlinear terms are invariant by translation, except for the
+        aliasing errors, so that the tendencies computed on a grid shifted by
+        :math:`\mathbf{\delta}` are :math:`e^{-i \mathbf{k} \cdot
+        \mathbf{\delta}} N(e^{i \mathbf{k} \cdot \mathbf{\delta}} S)`. The
+        forcing is not shifted.
+
+        """
+        sim = self.sim
+        state_spect_shifted = self._state_spect_shifted
+        phase_shift_conj = self._phase_shift_conj
+        np.multiply(state_spect, phase_shift, out=state_spect_shifted)
+        np.conjugate(phase_shift, out=phase_shift_conj)
+        tendencies = sim.tendencies_nonlin(state_spect_shifted, old=old)
+        if sim.is_forcing_enabled:
+            forcing = sim.forcing.get_forcing()
+            tendencies -= forcing
+            tendencies *= phase_shift_conj
+            tendencies += forcing
+        else:
+            tendencies *= phase_shift_conj
+        return tendencies
+
     def _compute_freq_complex(self):
         state_spect = self.sim.state.state_spect
         freq_complex = np.empty_like(state_spect)
@@ -146,19 +992,42 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         return freq_complex
 
     def _init_exact_linear_coef(self):
-        self.exact_linear_coefs = ExactLinearCoefs(self)
+        type_time_scheme = self.params.time_stepping.type_time_scheme
+        if type_time_scheme == "BS32":
+            # the coefficients are updated in _time_step_BS32 since the time
+            # step is modified by the error controller
+            self.exact_linear_coefs = ExactLinearCoefsStages(
+                self, (0.25, 0.5, 0.75, 1.0)
+            )
+            return
+        elif type_time_scheme == "ETDRK4":
+            self.exact_linear_coefs = ExactLinearCoefsETDRK4(self)
+            return
+        elif type_time_scheme == "RK3_2N":
+            self._coefs_2N = COEFS_RK3_2N
+        elif type_time_scheme == "RK4_2N":
+            self._coefs_2N = COEFS_RK4_2N
+        else:
+            self.exact_linear_coefs = ExactLinearCoefs(self)
+            return
+
+        times_stages = self._coefs_2N[2] + (1.0,)
+        time_increments = [
+            times_stages[i + 1] - times_stages[i]
+            for i in range(len(times_stages) - 1)
+        ]
+        self.exact_linear_coefs = ExactLinearCoefsStages(self, time_increments)
 
     def one_time_step_computation(self):
         """One time step"""
         # WARNING: if the function _time_step_RK comes from an extension, its
         # execution time seems to be attributed to the function
         # one_time_step_computation by cProfile
+        self._gather_state_spect()
         self._time_step_RK()
         self.sim.oper.dealiasing(self.sim.state.state_spect)
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(self.sim.state.state_spect[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_health()
 
     def _time_step_RK2(self):
         r"""Advance in time with the Runge-Kutta 2 method.
@@ -248,7 +1117,7 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
 
             state_spect[:] = state_spect * diss + dt * diss2 * tendencies_n12
 
-    def _time_step_RK4(self):
+    def _time_step_RK4(self, tendencies_0=None):
         r"""Advance in time with the Runge-Kutta 4 method.
 
         .. _rk4timescheme:
@@ -347,7 +1216,8 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        if tendencies_0 is None:
+            tendencies_0 = compute_tendencies()
         state_spect_tmp = self._state_spect_tmp
         state_spect_tmp1 = self._state_spect_tmp1
         state_spect_np12_approx1 = state_spect_tmp1
@@ -449,3 +1319,672 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
             #     float dt
             # )
             state_spect[:] = state_spect_tmp + dt / 6 * tendencies_3
+
+    def _time_step_RK_2N(self):
+        r"""Advance in time with a low-storage (2N) Runge-Kutta method.
+
+        .. _rk2Ntimescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S),
+
+        which we rewrite with the integrating factor :math:`e^{-\sigma t}`
+        as :math:`\p_t (e^{-\sigma t} S) = e^{-\sigma t} N(S)`. An explicit
+        Runge-Kutta method of Williamson's 2N-storage form is used for this
+        modified equation. With :math:`s` stages, coefficients :math:`A_i`,
+        :math:`B_i` and stage times :math:`c_i`, each stage writes
+
+        .. math::
+
+           Q_i = A_i Q_{i-1} + dt N(S_{i-1}),
+
+        .. math::
+
+           S_i = (S_{i-1} + B_i Q_i) e^{\sigma (c_{i+1} - c_i) dt},
+
+        .. math::
+
+           Q_i \leftarrow Q_i e^{\sigma (c_{i+1} - c_i) dt},
+
+        with :math:`c_{s+1} = 1`. The register :math:`Q` and the state are
+        always expressed at the time of the next stage, so that only one
+        temporary array of the size of the state (plus the tendencies) is
+        needed, instead of two for the classical RK4 method.
+
+        Two sets of coefficients are available: "RK3_2N" (3 stages, 3rd order,
+        Williamson, 1980) and "RK4_2N" (5 stages, 4th order, Carpenter &
+        Kennedy, 1994).
+
+        """
+        dt = self.deltat
+        exacts = self.exact_linear_coefs.get_updated_coefs()
+        coefs_A, coefs_B, _ = self._coefs_2N
+
+        compute_tendencies = self.sim.tendencies_nonlin
+        state_spect = self.sim.state.state_spect
+        state_spect_tmp = self._state_spect_tmp
+
+        tendencies = compute_tendencies()
+
+        for istage, exact in enumerate(exacts):
+            if istage > 0:
+                tendencies = compute_tendencies(state_spect, old=tendencies)
+
+            coef_a = coefs_A[istage]
+            coef_b = coefs_B[istage]
+
+            if ts.is_transpiled:
+                ts.use_block("rk_2n_stage")
+            else:
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies;
+                #     A1 exact;
+                #     float coef_a, coef_b, dt
+                # )
+
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies;
+                #     A2 exact;
+                #     float coef_a, coef_b, dt
+                # )
+                state_spect_tmp[:] = coef_a * state_spect_tmp + dt * tendencies
+                state_spect[:] = (state_spect + coef_b * state_spect_tmp) * exact
+                state_spect_tmp[:] *= exact
+
+    def _time_step_RK2_phaseshift(self):
+        r"""Advance in time with the RK2 method with phase-shifting.
+
+        .. _rk2phaseshifttimescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S).
+
+        We use the Heun (trapezoidal) version of the RK2 method (with
+        integrating factor), for which the two estimations of the nonlinear
+        term have the same weight:
+
+        .. math:: S_{A1dt} = (S_0 + N_{\delta}(S_0) dt) e^{\sigma dt},
+
+        .. math::
+           S_{dt} = S_0 e^{\sigma dt} + \frac{dt}{2} \left[
+           N_{\delta}(S_0) e^{\sigma dt}
+           + N_{\delta + h/2}(S_{A1dt}) \right],
+
+        where :math:`N_{\delta}` denotes the nonlinear term computed on a
+        physical grid shifted by a random vector :math:`\delta` and
+        :math:`N_{\delta + h/2}` on a grid shifted by an additional half
+        grid step over all axes. With this additional shift, an aliasing
+        error is multiplied by :math:`(-1)^m`, :math:`m` being the number of
+        axes over which it is aliased. The errors aliased over one axis (and,
+        in 3d, over the three axes) have opposite signs in the two estimations
+        and cancel. The errors aliased over two axes keep their sign and
+        remain (in 2d and in 3d); the random shifts decorrelate them in time.
+
+        """
+        dt = self.deltat
+        diss, _ = self.exact_linear_coefs.get_updated_coefs()
+
+        compute_tendencies = self._compute_tendencies_phase_shifted
+        state_spect = self.sim.state.state_spect
+
+        phase_shift = self._get_phase_shift_random()
+        tendencies_0 = compute_tendencies(phase_shift, state_spect, old=None)
+
+        state_spect_n1_approx = self._state_spect_tmp
+
+        if ts.is_transpiled:
+            ts.use_block("rk2_phaseshift_step0")
+        else:
+            # transonic block (
+            #     A state_spect, state_spect_n1_approx, tendencies_0;
+            #     A1 diss;
+            #     float dt
+            # )
+
+            # transonic block (
+            #     A state_spect, state_spect_n1_approx, tendencies_0;
+            #     A2 diss;
+            #     float dt
+            # )
+            state_spect_n1_approx[:] = (state_spect + dt * tendencies_0) * diss
+            state_spect[:] = (state_spect + dt / 2 * tendencies_0) * diss
+
+        phase_shift *= self._phase_shift_half
+        tendencies_1 = compute_tendencies(
+            phase_shift, state_spect_n1_approx, old=tendencies_0
+        )
+
+        if ts.is_transpiled:
+            ts.use_block("rk2_phaseshift_step1")
+        else:
+            # transonic block (
+            #     A state_spect, tendencies_1;
+            #     float dt
+            # )
+            state_spect[:] += dt / 2 * tendencies_1
+
+    def _time_step_AB2_phaseshift(self):
+        r"""Advance in time with the Adams-Bashforth 2 method with phase-shifting.
+
+        .. _ab2phaseshifttimescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S).
+
+        With an integrating factor and a variable time step, the
+        Adams-Bashforth 2 method gives
+
+        .. math::
+           S_{n+1} = \left[ S_n + dt_n \left(
+           \beta_0 N_n + \beta_1 N_{n-1} e^{\sigma dt_{n-1}}
+           \right) \right] e^{\sigma dt_n},
+
+        with :math:`\beta_0 = 1 + \omega/2`, :math:`\beta_1 = -\omega/2`
+        and :math:`\omega = dt_n / dt_{n-1}`. Only one evaluation of the
+        nonlinear term is needed per time step. The grid is shifted by a
+        random vector :math:`\delta` for the even time steps and by
+        :math:`\delta + h/2` for the odd time steps, so that the errors
+        aliased over an odd number of axes of two consecutive time steps have
+        opposite signs (see :func:`_time_step_RK2_phaseshift`).
+
+        The first time step is computed with the forward Euler method (with
+        integrating factor), which does not modify the global order of the
+        scheme.
+
+        """
+        dt = self.deltat
+        diss, _ = self.exact_linear_coefs.get_updated_coefs()
+
+        state_spect = self.sim.state.state_spect
+        tendencies_old = self._tendencies_old
+
+        if self.it % 2 == 0 or self._phase_shift is None:
+            self._phase_shift = self._get_phase_shift_random()
+        else:
+            self._phase_shift *= self._phase_shift_half
+
+        tendencies = self._compute_tendencies_phase_shifted(
+            self._phase_shift, state_spect, old=self._state_spect_tmp
+        )
+
+        if self._deltat_old is None:
+            # bootstrap with the forward Euler method
+            coef_0 = 1.0
+            coef_1 = 0.0
+            if tendencies_old is None:
+                tendencies_old = self._tendencies_old = np.zeros_like(
+                    tendencies
+                )
+        else:
+            omega = dt / self._deltat_old
+            coef_0 = 1.0 + omega / 2
+            coef_1 = -omega / 2
+
+        if ts.is_transpiled:
+            ts.use_block("ab2_phaseshift_step")
+        else:
+            # transonic block (
+            #     A state_spect, tendencies, tendencies_old;
+            #     A1 diss;
+            #     float coef_0, coef_1, dt
+            # )
+
+            # transonic block (
+            #     A state_spect, tendencies, tendencies_old;
+            #     A2 diss;
+            #     float coef_0, coef_1, dt
+            # )
+            state_spect[:] = (
+                state_spect + dt * (coef_0 * tendencies + coef_1 * tendencies_old)
+            ) * diss
+            tendencies_old[:] = tendencies * diss
+
+        self._deltat_old = dt
+
+    def _time_step_AB(self):
+        r"""Advance in time with an Adams-Bashforth method (order 2 or 3).
+
+        .. _abtimescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S).
+
+        With an integrating factor and a variable time step, the
+        Adams-Bashforth method of order :math:`q` gives
+
+        .. math::
+           S_{n+1} = \left[ S_n + dt_n \sum_{j=0}^{q-1}
+           \beta_j N_{n-j} e^{\sigma (t_n - t_{n-j})} \right] e^{\sigma dt_n},
+
+        where the coefficients :math:`\beta_j` are obtained by integrating
+        over :math:`[t_n, t_n + dt_n]` the polynomial interpolating the
+        previous tendencies (see :func:`compute_coefs_adams_bashforth`).
+        Only one evaluation of the nonlinear term is needed per time step.
+
+        The previous tendencies are stored multiplied by the factors
+        :math:`e^{\sigma (t_{n+1} - t_{n-j})}` so that a change of the time
+        step (for example with the CFL condition) is taken into account
+        exactly. The first :math:`q - 1` time steps are computed with the
+        Runge-Kutta 4 method.
+
+        """
+        dt = self.deltat
+        diss, _ = self.exact_linear_coefs.get_updated_coefs()
+
+        state_spect = self.sim.state.state_spect
+        history = self._tendencies_history
+        deltats = self._deltats_history
+
+        if len(deltats) < len(history):
+            # bootstrap with the Runge-Kutta 4 method (the buffers
+            # _state_spect_tmp* are used by _time_step_RK4)
+            tendencies = self.sim.tendencies_nonlin(state_spect)
+            for index in range(len(deltats), 0, -1):
+                history[index][:] = history[index - 1] * diss
+            history[0][:] = tendencies * diss
+            # note: tendencies is overwritten by _time_step_RK4
+            self._time_step_RK4(tendencies_0=tendencies)
+            deltats.insert(0, dt)
+            return
+
+        tendencies = self.sim.tendencies_nonlin(
+            state_spect, old=self._state_spect_tmp
+        )
+        coefs = compute_coefs_adams_bashforth(dt, deltats)
+
+        if len(history) == 1:
+            tendencies_1 = history[0]
+            coef_0, coef_1 = coefs
+            if ts.is_transpiled:
+                ts.use_block("ab2_step")
+            else:
+                # transonic block (
+                #     A state_spect, tendencies, tendencies_1;
+                #     A1 diss;
+                #     float coef_0, coef_1, dt
+                # )
+
+                # transonic block (
+                #     A state_spect, tendencies, tendencies_1;
+                #     A2 diss;
+                #     float coef_0, coef_1, dt
+                # )
+                state_spect[:] = (
+                    state_spect
+                    + dt * (coef_0 * tendencies + coef_1 * tendencies_1)
+                ) * diss
+                tendencies_1[:] = tendencies * diss
+        else:
+            tendencies_1, tendencies_2 = history
+            coef_0, coef_1, coef_2 = coefs
+            if ts.is_transpiled:
+                ts.use_block("ab3_step")
+            else:
+                # transonic block (
+                #     A state_spect, tendencies, tendencies_1, tendencies_2;
+                #     A1 diss;
+                #     float coef_0, coef_1, coef_2, dt
+                # )
+
+                # transonic block (
+                #     A state_spect, tendencies, tendencies_1, tendencies_2;
+                #     A2 diss;
+                #     float coef_0, coef_1, coef_2, dt
+                # )
+                state_spect[:] = (
+                    state_spect
+                    + dt
+                    * (
+                        coef_0 * tendencies
+                        + coef_1 * tendencies_1
+                        + coef_2 * tendencies_2
+                    )
+                ) * diss
+                tendencies_2[:] = tendencies_1 * diss
+                tendencies_1[:] = tendencies * diss
+
+        deltats.insert(0, dt)
+        del deltats[len(history) :]
+
+    def _time_step_BS32(self):
+        r"""Advance in time with the adaptive Bogacki-Shampine 3(2) method.
+
+        .. _bs32timescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S).
+
+        The Bogacki-Shampine method (with integrating factor) uses the
+        stages (:math:`S_0` being the initial state):
+
+        .. math::
+           S_1 = (S_0 + \frac{dt}{2} N_0) e^{\sigma \frac{dt}{2}},
+
+        .. math::
+           S_2 = S_0 e^{\sigma \frac{3 dt}{4}}
+           + \frac{3 dt}{4} N_1 e^{\sigma \frac{dt}{4}},
+
+        .. math::
+           S_3 = S_0 e^{\sigma dt} + dt \left[
+           \frac{2}{9} N_0 e^{\sigma dt}
+           + \frac{1}{3} N_1 e^{\sigma \frac{dt}{2}}
+           + \frac{4}{9} N_2 e^{\sigma \frac{dt}{4}}
+           \right],
+
+        where :math:`N_i = N(S_i)`. :math:`S_3` is the approximation of
+        order 3 of the solution. The difference with the approximation of
+        order 2 is
+
+        .. math::
+           E = dt \left[
+           - \frac{5}{72} N_0 e^{\sigma dt}
+           + \frac{1}{12} N_1 e^{\sigma \frac{dt}{2}}
+           + \frac{1}{9} N_2 e^{\sigma \frac{dt}{4}}
+           - \frac{1}{8} N_3
+           \right].
+
+        The ratio :math:`r = \max|E| / (tol \max|S_3|)` is used to accept
+        (:math:`r \leq 1`) or reject the step. A rejected step is recomputed
+        with the time step :math:`dt \max(0.2, 0.9 r^{-1/3})`. After an
+        accepted step, the next time step is :math:`dt \min(5, 0.9 r^{-1/3})`
+        (limited by `deltat_max`, the CFL condition and, if `USE_T_END` is
+        True, by `t_end - t`). With `ratio_deltat_ladder`, the time steps are
+        rounded down on the ladder so that the cached coefficients are reused.
+
+        The method is "first same as last": :math:`S_3` is the new state, so
+        :math:`N_3` of an accepted step is :math:`N_0` of the next step, which
+        needs only 3 evaluations of the nonlinear terms. :math:`N_3` is not
+        reused with forcing, after a rollback or if the state is no longer
+        equal to :math:`S_3` (kept in a temporary array), i.e. if it has been
+        modified outside the time stepping.
+
+        """
+        params_ts = self.params.time_stepping
+        if params_ts.USE_CFL and self._deltat_CFL is not None:
+            # computed with the CFL condition (possibly at a previous time
+            # step if cfl_period > 1)
+            deltat_limit = min(self._deltat_CFL, self.deltat_max)
+        else:
+            deltat_limit = self.deltat_max
+
+        if params_ts.USE_T_END:
+            # reach exactly t_end
+            deltat_end = params_ts.t_end - self.t
+        else:
+            deltat_end = np.inf
+
+        if self._deltat_adaptive is None:
+            dt = min(self.deltat, deltat_limit)
+        else:
+            dt = min(self._deltat_adaptive, deltat_limit)
+        dt = self._limit_deltat_adaptive(dt, deltat_end)
+
+        compute_tendencies = self.sim.tendencies_nonlin
+        state_spect = self.sim.state.state_spect
+        state_spect_tmp = self._state_spect_tmp
+        state_spect_3 = self._state_spect_tmp1
+        tendencies_stages = self._tendencies_stages
+        tendencies_0, tendencies_1, tendencies_2, tendencies_3 = tendencies_stages
+
+        if self._has_tendencies_fsal and not self.sim.is_forcing_enabled:
+            is_state_unchanged = np.array_equal(state_spect, state_spect_3)
+            if self._is_distributed:
+                is_state_unchanged = mpi.comm.allreduce(
+                    is_state_unchanged, op=mpi.MPI.LAND
+                )
+        else:
+            is_state_unchanged = False
+        if not is_state_unchanged:
+            tendencies_0 = compute_tendencies(old=tendencies_0)
+
+        exact_linear_coefs = self.exact_linear_coefs
+        while True:
+            self.deltat = dt
+            if exact_linear_coefs.dt_old != dt:
+                # the last time step (to reach t_end) is not on the ladder
+                exact_linear_coefs.update(dt, use_cache=dt != deltat_end)
+            diss4, diss2, diss34, diss = exact_linear_coefs.get_coefs()
+
+            if ts.is_transpiled:
+                ts.use_block("bs32_step0")
+            else:
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies_0;
+                #     A1 diss2;
+                #     float dt
+                # )
+
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies_0;
+                #     A2 diss2;
+                #     float dt
+                # )
+                state_spect_tmp[:] = (state_spect + dt / 2 * tendencies_0) * diss2
+
+            tendencies_1 = compute_tendencies(state_spect_tmp, old=tendencies_1)
+
+            if ts.is_transpiled:
+                ts.use_block("bs32_step1")
+            else:
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies_1;
+                #     A1 diss4, diss34;
+                #     float dt
+                # )
+
+                # transonic block (
+                #     A state_spect, state_spect_tmp, tendencies_1;
+                #     A2 diss4, diss34;
+                #     float dt
+                # )
+                state_spect_tmp[:] = (
+                    state_spect * diss34 + 3 * dt / 4 * tendencies_1 * diss4
+                )
+
+            tendencies_2 = compute_tendencies(state_spect_tmp, old=tendencies_2)
+
+            if ts.is_transpiled:
+                ts.use_block("bs32_step2")
+            else:
+                # transonic block (
+                #     A state_spect, state_spect_3,
+                #       tendencies_0, tendencies_1, tendencies_2;
+                #     A1 diss4, diss2, diss;
+                #     float dt
+                # )
+
+                # transonic block (
+                #     A state_spect, state_spect_3,
+                #       tendencies_0, tendencies_1, tendencies_2;
+                #     A2 diss4, diss2, diss;
+                #     float dt
+                # )
+                state_spect_3[:] = state_spect * diss + dt * (
+                    2 / 9 * tendencies_0 * diss
+                    + 1 / 3 * tendencies_1 * diss2
+                    + 4 / 9 * tendencies_2 * diss4
+                )
+
+            tendencies_3 = compute_tendencies(state_spect_3, old=tendencies_3)
+
+            if ts.is_transpiled:
+                ts.use_block("bs32_error")
+            else:
+                # transonic block (
+                #     A state_spect_tmp,
+                #       tendencies_0, tendencies_1, tendencies_2, tendencies_3;
+                #     A1 diss4, diss2, diss;
+                #     float dt
+                # )
+
+                # transonic block (
+                #     A state_spect_tmp,
+                #       tendencies_0, tendencies_1, tendencies_2, tendencies_3;
+                #     A2 diss4, diss2, diss;
+                #     float dt
+                # )
+                state_spect_tmp[:] = dt * (
+                    -5 / 72 * tendencies_0 * diss
+                    + 1 / 12 * tendencies_1 * diss2
+                    + 1 / 9 * tendencies_2 * diss4
+                    - 1 / 8 * tendencies_3
+                )
+
+            if state_spect.size > 0:
+                maxs = np.array(
+                    [abs(state_spect_tmp).max(), abs(state_spect_3).max()]
+                )
+            else:
+                maxs = np.zeros(2)
+
+            if self._is_distributed:
+                maxs = mpi.comm.allreduce(maxs, op=mpi.MPI.MAX)
+
+            error, norm = maxs
+            if norm > 0:
+                ratio = error / (self.tol_adaptive * norm)
+            else:
+                ratio = 0.0
+
+            if ratio <= 1.0:
+                break
+
+            # the step is rejected
+            self.nb_steps_rejected += 1
+            dt = self._limit_deltat_adaptive(
+                dt * max(0.2, 0.9 * ratio ** (-1.0 / 3)), deltat_end
+            )
+
+        state_spect[:] = state_spect_3
+        # first same as last: N_3 is N_0 of the next time step
+        tendencies_stages[0], tendencies_stages[3] = tendencies_3, tendencies_0
+        self._has_tendencies_fsal = True
+
+        if ratio > 0:
+            factor = min(5.0, 0.9 * ratio ** (-1.0 / 3))
+        else:
+            factor = 5.0
+        self._deltat_adaptive = dt * factor
+
+    def _time_step_ETDRK4(self):
+        r"""Advance in time with the ETDRK4 method.
+
+        .. _etdrk4timescheme:
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S).
+
+        The exponential time differencing Runge-Kutta 4 method (Cox &
+        Matthews, J. Comput. Phys., 2002) uses 4 evaluations of the nonlinear
+        term:
+
+        .. math::
+           S_a = S_0 e^{\sigma \frac{dt}{2}} + Q N(S_0),
+
+        .. math::
+           S_b = S_0 e^{\sigma \frac{dt}{2}} + Q N(S_a),
+
+        .. math::
+           S_c = S_a e^{\sigma \frac{dt}{2}} + Q (2 N(S_b) - N(S_0)),
+
+        .. math::
+           S_{dt} = S_0 e^{\sigma dt} + f_1 N(S_0)
+           + 2 f_2 (N(S_a) + N(S_b)) + f_3 N(S_c),
+
+        where the coefficients :math:`Q, f_1, f_2, f_3` are functions of
+        :math:`\sigma dt` (see :class:`ExactLinearCoefsETDRK4`).
+
+        """
+        diss, diss2, Q, f1, f2, f3 = self.exact_linear_coefs.get_updated_coefs()
+
+        compute_tendencies = self.sim.tendencies_nonlin
+        state_spect = self.sim.state.state_spect
+        state_spect_tmp = self._state_spect_tmp
+        state_spect_tmp1 = self._state_spect_tmp1
+        tendencies_0, tendencies_a, tendencies_b, tendencies_c = (
+            self._tendencies_stages
+        )
+
+        tendencies_0 = compute_tendencies(old=tendencies_0)
+        state_spect_a = state_spect_tmp
+
+        if ts.is_transpiled:
+            ts.use_block("etdrk4_step0")
+        else:
+            # transonic block (
+            #     A state_spect, state_spect_a, tendencies_0;
+            #     A1 diss2, Q
+            # )
+
+            # transonic block (
+            #     A state_spect, state_spect_a, tendencies_0;
+            #     A2 diss2, Q
+            # )
+            state_spect_a[:] = state_spect * diss2 + Q * tendencies_0
+
+        tendencies_a = compute_tendencies(state_spect_a, old=tendencies_a)
+        state_spect_b = state_spect_tmp1
+
+        if ts.is_transpiled:
+            ts.use_block("etdrk4_step1")
+        else:
+            # transonic block (
+            #     A state_spect, state_spect_b, tendencies_a;
+            #     A1 diss2, Q
+            # )
+
+            # transonic block (
+            #     A state_spect, state_spect_b, tendencies_a;
+            #     A2 diss2, Q
+            # )
+            state_spect_b[:] = state_spect * diss2 + Q * tendencies_a
+
+        tendencies_b = compute_tendencies(state_spect_b, old=tendencies_b)
+        del state_spect_b
+        # S_c overwrites S_a
+        state_spect_c = state_spect_a
+
+        if ts.is_transpiled:
+            ts.use_block("etdrk4_step2")
+        else:
+            # transonic block (
+            #     A state_spect_c, tendencies_0, tendencies_b;
+            #     A1 diss2, Q
+            # )
+
+            # transonic block (
+            #     A state_spect_c, tendencies_0, tendencies_b;
+            #     A2 diss2, Q
+            # )
+            state_spect_c[:] = state_spect_c * diss2 + Q * (
+                2 * tendencies_b - tendencies_0
+            )
+
+        tendencies_c = compute_tendencies(state_spect_c, old=tendencies_c)
+
+        if ts.is_transpiled:
+            ts.use_block("etdrk4_step3")
+        else:
+            # transonic block (
+            #     A state_spect,
+            #       tendencies_0, tendencies_a, tendencies_b, tendencies_c;
+            #     A1 diss, f1, f2, f3
+            # )
+
+            # transonic block (
+            #     A state_spect,
+            #       tendencies_0, tendencies_a, tendencies_b, tendencies_c;
+            #     A2 diss, f1, f2, f3
+            # )
+            state_spect[:] = (
+                state_spect * diss
+                + f1 * tendencies_0
+                + 2 * f2 * (tendencies_a + tendencies_b)
+                + f3 * tendencies_c
+            )
@@ -9,6 +9,9 @@ Provides
    operators0d
    operators2d
    operators3d
+   compact
+   craya_herring
+   cache
    sphericalharmo
    op_finitediff1d
    op_finitediff2d
@@ -0,0 +1,227 @@
+"""Cache of arrays (:mod:`fluidsim.operators.cache`)
+====================================================
+
+Provides
+
+.. autoclass:: CacheArrays
+   :members:
+   :private-members:
+
+.. autoclass:: cached_array
+   :members:
+   :private-members:
+
+.. autofunction:: init_cache_arrays
+
+.. note::
+
+  The derived spectral arrays of the operators (for example
+  :math:`1/k_h^2`) are declared with the decorator :class:`cached_array`.
+  They are computed at their first use and stored in the cache
+  `oper.cache_arrays`, whose memory is bounded by
+  `params.oper.max_memory_cache` (in MB): the least recently used arrays
+  are removed when this limit is exceeded (and computed again when needed).
+  With `params.oper.float32_cache`, the arrays declared with
+  `single_precision=True` are stored in single precision.
+
+  The arrays used at each time step (declared with `pinned=True`, for
+  example `Kappa2_not0` and `Kappa_over_ic` of the sw1l operators) and the
+  dissipation frequencies (see the method `compute_freq_diss` of the
+  solvers) are pinned: they are not counted in this budget and they are
+  never removed, so that they are not computed again at each time step.
+
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sum(_nbytes(elem) for elem in value)
+
+
+def _as_single(value):
+    if isinstance(value, tuple):
+        return tuple(_as_single(elem) for elem in value)
+    if value.dtype == np.float64:
+        return value.astype(np.float32)
+    if value.dtype == np.complex128:
+        return value.astype(np.complex64)
+    return value
+
+
+class CacheArrays:
+    """Bounded LRU cache of arrays (or of tuples of arrays).
+
+    Parameters
+    ----------
+
+    max_memory : float
+
+      Maximum memory (in bytes) used by the cached arrays. The least recently
+      used entries are removed when this limit is exceeded (the last added
+      entry is never removed). If None, the memory is not computed and the
+      cached values can be any objects.
+
+    single_precision : bool
+
+      If True, the arrays added with `single_precision=True` are stored in
+      single precision.
+
+    max_nb_entries : int
+
+      Maximum number of entries (no limit if None).
+
+    """
+
+    def __init__(self, max_memory, single_precision=False, max_nb_entries=None):
+        self.max_memory = max_memory
+        self.single_precision = single_precision
+        self.max_nb_entries = max_nb_entries
+        self.memory = 0
+        self.nb_hits = 0
+        self.nb_misses = 0
+        self._arrays = OrderedDict()
+        # name -> (version, arrays), not removed by the LRU policy
+        self._pinned = {}
+        self.memory_pinned = 0
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def __contains__(self, key):
+        return key in self._arrays
+
+    def get(self, key):
+        """Get the cached arrays for a key (or None)."""
+        try:
+            arrays = self._arrays[key]
+        except KeyError:
+            self.nb_misses += 1
+            return None
+        self._arrays.move_to_end(key)
+        self.nb_hits += 1
+        return arrays
+
+    def add(self, key, arrays, single_precision=False):
+        """Add arrays to the cache and return the stored arrays."""
+        if single_precision and self.single_precision:
+            arrays = _as_single(arrays)
+        self._arrays[key] = arrays
+        if self.max_memory is not None:
+            self.memory += _nbytes(arrays)
+        while self._is_too_large() and len(self._arrays) > 1:
+            _, arrays_removed = self._arrays.popitem(last=False)
+            if self.max_memory is not None:
+                self.memory -= _nbytes(arrays_removed)
+        return arrays
+
+    def _is_too_large(self):
+        if self.max_memory is not None and self.memory > self.max_memory:
+            return True
+        return (
+            self.max_nb_entries is not None
+            and len(self._arrays) > self.max_nb_entries
+        )
+
+    def get_or_compute(self, key, compute, single_precision=False):
+        """Get the cached arrays or compute (and add) them."""
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = self.add(key, compute(), single_precision)
+        return arrays
+
+    def get_pinned(self, name, version=None):
+        """Get pinned arrays (or None if absent or of another version)."""
+        try:
+            version_pinned, arrays = self._pinned[name]
+        except KeyError:
+            return None
+        if version_pinned != version:
+            return None
+        return arrays
+
+    def add_pinned(self, name, arrays, version=None, single_precision=False):
+        """Pin arrays (replacing the arrays pinned with the same name).
+
+        The pinned arrays are not counted in `max_memory` and are not removed
+        when other arrays are added.
+
+        """
+        if single_precision and self.single_precision:
+            arrays = _as_single(arrays)
+        try:
+            _, arrays_old = self._pinned.pop(name)
+        except KeyError:
+            pass
+        else:
+            self.memory_pinned -= _nbytes(arrays_old)
+        self._pinned[name] = version, arrays
+        self.memory_pinned += _nbytes(arrays)
+        return arrays
+
+    def get_or_compute_pinned(
+        self, name, compute, version=None, single_precision=False
+    ):
+        """Get the pinned arrays or compute (and pin) them."""
+        arrays = self.get_pinned(name, version)
+        if arrays is None:
+            arrays = self.add_pinned(name, compute(), version, single_precision)
+        return arrays
+
+    def clear(self):
+        """Remove all cached arrays (including the pinned arrays)."""
+        self._arrays.clear()
+        self.memory = 0
+        self._pinned.clear()
+        self.memory_pinned = 0
+
+
+class cached_array:
+    """Declare a derived array of an operator computed lazily.
+
+    Used as :func:`property` (possibly with the keyword arguments
+    `single_precision` and `pinned`). The arrays are stored in the cache
+    `oper.cache_arrays` (see :func:`init_cache_arrays`). The arrays used at
+    each time step should be declared with `pinned=True` so that they are
+    not removed from the cache.
+
+    """
+
+    def __init__(self, func=None, *, single_precision=False, pinned=False):
+        self.single_precision = single_precision
+        self.pinned = pinned
+        self.func = func
+        if func is not None:
+            self.__doc__ = func.__doc__
+
+    def __call__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, oper, owner=None):
+        if oper is None:
+            return self
+        if self.pinned:
+            return oper.cache_arrays.get_or_compute_pinned(
+                self.name,
+                lambda: self.func(oper),
+                single_precision=self.single_precision,
+            )
+        return oper.cache_arrays.get_or_compute(
+            self.name, lambda: self.func(oper), self.single_precision
+        )
+
+
+def init_cache_arrays(oper, params):
+    """Create the cache `oper.cache_arrays` (from `params.oper`)."""
+    max_memory = getattr(params.oper, "max_memory_cache", 100.0)
+    single_precision = getattr(params.oper, "float32_cache", False)
+    oper.cache_arrays = CacheArrays(max_memory * 1e6, single_precision)
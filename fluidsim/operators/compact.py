@@ -0,0 +1,65 @@
+"""Compact spectral storage (:mod:`fluidsim.operators.compact`)
+===============================================================
+
+Provides
+
+.. autoclass:: CompactSpectralStorage
+   :members:
+   :private-members:
+
+"""
+
+import numpy as np
+
+
+class CompactSpectralStorage:
+    """Packed storage of the spectral modes not removed by the dealiasing.
+
+    A spectral array of shape `(..., *oper.shapeK_loc)` is stored as a packed
+    array of shape `(..., nb_modes)` containing only the retained modes (for
+    which `oper.where_dealiased` is 0). The flat indices of these modes are
+    used to gather them from the arrays used by the FFTs and to scatter them
+    back (the dealiased modes of these arrays are not modified, so they stay
+    equal to zero).
+
+    Parameters
+    ----------
+
+    oper : :class:`fluidsim.operators.operators2d.OperatorsPseudoSpectral2D` or
+      :class:`fluidsim.operators.operators3d.OperatorsPseudoSpectral3D`
+
+    """
+
+    def __init__(self, oper):
+        self.shapeK_loc = tuple(oper.shapeK_loc)
+        where_dealiased = np.asarray(oper.where_dealiased, dtype=bool)
+        if not getattr(oper, "_has_to_dealiase", True):
+            where_dealiased = np.zeros_like(where_dealiased)
+
+        self.indices = np.flatnonzero(~where_dealiased)
+        self.nb_modes = self.indices.size
+        self.ratio_modes = self.nb_modes / max(where_dealiased.size, 1)
+
+    def _get_shape_first_dims(self, arr):
+        return arr.shape[: arr.ndim - len(self.shapeK_loc)]
+
+    def create_array(self, nb_keys=None, dtype=np.complex128):
+        """Create a compact array (one variable if `nb_keys` is None)."""
+        if nb_keys is None:
+            shape = (self.nb_modes,)
+        else:
+            shape = (nb_keys, self.nb_modes)
+        return np.empty(shape, dtype)
+
+    def gather(self, arr, out=None):
+        """Gather the retained modes of a spectral array."""
+        shape = self._get_shape_first_dims(arr) + (-1,)
+        arr = np.reshape(arr, shape)
+        return np.take(arr, self.indices, axis=-1, out=out)
+
+    def scatter(self, arr_compact, arr):
+        """Scatter a compact array in a (contiguous) spectral array."""
+        arr_flat = arr.view()
+        # raises an AttributeError if arr cannot be reshaped without copy
+        arr_flat.shape = self._get_shape_first_dims(arr) + (-1,)
+        arr_flat[..., self.indices] = arr_compact
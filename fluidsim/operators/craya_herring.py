@@ -0,0 +1,253 @@
+"""Craya-Herring storage (:mod:`fluidsim.operators.craya_herring`)
+=================================================================
+
+Provides
+
+.. autoclass:: CrayaHerringStorage
+   :members:
+   :private-members:
+
+.. autoclass:: WaveModesStorage
+   :members:
+   :private-members:
+
+"""
+
+import numpy as np
+
+
+class CrayaHerringStorage:
+    r"""Storage of divergence-free velocities with 2 components per mode.
+
+    A spectral array whose first 3 variables are the components of a velocity
+    perpendicular to the wavevector (`vx_fft`, `vy_fft`, `vz_fft`) is stored
+    as an array whose first 2 variables are the toroidal and poloidal
+    components of the velocity in the Craya-Herring basis (`vt_fft` and
+    `vp_fft`). The other variables (for example the buoyancy) are not
+    modified. The unit vectors of the basis are
+
+    .. math::
+
+      \mathbf{e}_t = \frac{\mathbf{k} \times \mathbf{e}_z}{k_h}
+      = \frac{(k_y, -k_x, 0)}{k_h}, \quad
+      \mathbf{e}_p = \frac{\mathbf{k} \times \mathbf{e}_t}{k}
+      = \frac{(k_x k_z, k_y k_z, -k_h^2)}{k_h k},
+
+    and :math:`\mathbf{e}_t = \mathbf{e}_x`, :math:`\mathbf{e}_p =
+    \mathbf{e}_y` for the modes :math:`k_h = 0`.
+
+    Gathering a velocity computes its projection perpendicular to the
+    wavevector. Note that the mean vertical velocity (mode :math:`k = 0`) is
+    not stored (it is set to 0 when the velocity is scattered).
+
+    Parameters
+    ----------
+
+    oper : :class:`fluidsim.operators.operators3d.OperatorsPseudoSpectral3D`
+
+    keys : sequence of str
+
+      Keys of the full spectral state (starting with `vx_fft`, `vy_fft` and
+      `vz_fft`).
+
+    """
+
+    def __init__(self, oper, keys):
+        keys = list(keys)
+        if keys[:3] != ["vx_fft", "vy_fft", "vz_fft"]:
+            raise ValueError(
+                "The first keys of the state have to be the velocity "
+                f"components (keys: {keys})"
+            )
+        self.keys_state_spect = ["vt_fft", "vp_fft"] + keys[3:]
+        self.shapeK_loc = tuple(oper.shapeK_loc)
+
+        Kx, Ky, Kz = np.broadcast_arrays(oper.Kx, oper.Ky, oper.Kz)
+        Kh = np.sqrt(Kx ** 2 + Ky ** 2)
+        K = np.sqrt(Kh ** 2 + Kz ** 2)
+        where_kh_zero = Kh == 0
+        Kh[where_kh_zero] = 1.0
+        K[K == 0] = 1.0
+
+        # cosines and sines of the azimuthal and polar angles of k
+        cos_phi = Kx / Kh
+        sin_phi = Ky / Kh
+        cos_theta = Kz / K
+        sin_theta = Kh / K
+        cos_phi[where_kh_zero] = 0.0
+        sin_phi[where_kh_zero] = 1.0
+        cos_theta[where_kh_zero] = 1.0
+        sin_theta[where_kh_zero] = 0.0
+
+        self.cos_phi, self.sin_phi, self.cos_theta, self.sin_theta = (
+            np.asarray(arr, dtype=oper.dtype_real)
+            for arr in (cos_phi, sin_phi, cos_theta, sin_theta)
+        )
+
+    def create_array(self, nb_keys=None, dtype=np.complex128):
+        """Create an array (one variable if `nb_keys` is None)."""
+        if nb_keys is None:
+            shape = self.shapeK_loc
+        else:
+            shape = (nb_keys,) + self.shapeK_loc
+        return np.empty(shape, dtype)
+
+    def gather(self, arr, out=None):
+        """Compute the Craya-Herring components of a spectral array.
+
+        An array of one variable (for example a dissipation frequency) is
+        returned unchanged.
+
+        """
+        if arr.ndim == len(self.shapeK_loc):
+            return arr
+        if out is None:
+            out = self.create_array(arr.shape[0] - 1, arr.dtype)
+        out[0], out[1] = self.vtvpfft_from_vecfft(arr[0], arr[1], arr[2])
+        out[2:] = arr[3:]
+        return out
+
+    def scatter(self, arr_ch, arr):
+        """Compute the velocity (and other variables) from an array."""
+        self.vecfft_from_vtvpfft(arr_ch[0], arr_ch[1], arr[:3])
+        arr[3:] = arr_ch[2:]
+
+    def vtvpfft_from_vecfft(self, vx_fft, vy_fft, vz_fft):
+        """Compute the toroidal and poloidal components of a vector."""
+        vt_fft = self.sin_phi * vx_fft - self.cos_phi * vy_fft
+        vp_fft = (
+            self.cos_theta * (self.cos_phi * vx_fft + self.sin_phi * vy_fft)
+            - self.sin_theta * vz_fft
+        )
+        return vt_fft, vp_fft
+
+    def vecfft_from_vtvpfft(self, vt_fft, vp_fft, vec_fft):
+        """Compute (inplace) a vector from its Craya-Herring components."""
+        vph_fft = self.cos_theta * vp_fft
+        vec_fft[0] = self.sin_phi * vt_fft + self.cos_phi * vph_fft
+        vec_fft[1] = self.sin_phi * vph_fft - self.cos_phi * vt_fft
+        vec_fft[2] = -self.sin_theta * vp_fft
+
+
+class WaveModesStorage(CrayaHerringStorage):
+    r"""Storage of the vortical and wave modes of rotating stratified flows.
+
+    The linear terms of the Boussinesq equations (buoyancy with the
+    Brunt-Vaisala frequency :math:`N` and Coriolis force with the Coriolis
+    parameter :math:`f`) couple the Craya-Herring components :math:`v_t`,
+    :math:`v_p` and :math:`a = b/N` as
+
+    .. math::
+
+      \partial_t v_t = f_k v_p, \quad
+      \partial_t v_p = - f_k v_t - N_k a, \quad
+      \partial_t a = N_k v_p,
+
+    with :math:`f_k = f k_z/k` and :math:`N_k = N k_h/k`. The stored
+    variables are the vortical mode `q_fft` (:math:`q = s v_t - c a`, which is
+    not modified by the linear terms) and the wave modes `ap_fft` and `am_fft`
+    (:math:`a_\pm = (v_p \pm i (c v_t + s a))/\sqrt{2}`), where
+    :math:`c = f_k/\omega_k`, :math:`s = N_k/\omega_k` and
+    :math:`\omega_k = \sqrt{f_k^2 + N_k^2}`. The wave modes are eigenvectors
+    of the linear operator
+    (:math:`\partial_t a_\pm = \pm i \omega_k a_\pm`), so that the linear
+    waves can be integrated exactly by the time schemes (see
+    :func:`compute_freq_complex`). The transformation is unitary.
+
+    Without buoyancy (`keys` without `b_fft`), only the wave modes are stored
+    (:math:`s = 0`).
+
+    Parameters
+    ----------
+
+    oper : :class:`fluidsim.operators.operators3d.OperatorsPseudoSpectral3D`
+
+    keys : sequence of str
+
+      Keys of the full spectral state (`vx_fft`, `vy_fft`, `vz_fft` and
+      possibly `b_fft`).
+
+    f : float or None
+
+      Coriolis parameter.
+
+    N : float or None
+
+      Brunt-Vaisala frequency (has to be positive if `keys` contains
+      `b_fft`).
+
+    """
+
+    def __init__(self, oper, keys, f=None, N=None):
+        super().__init__(oper, keys)
+        keys_others = self.keys_state_spect[2:]
+        if keys_others not in ([], ["b_fft"]):
+            raise ValueError(f"Unsupported keys for the wave modes: {keys}")
+        self.has_buoyancy = keys_others == ["b_fft"]
+        if self.has_buoyancy:
+            if not N:
+                raise ValueError(
+                    "The wave modes need a positive Brunt-Vaisala frequency"
+                )
+            self.keys_state_spect = ["q_fft", "ap_fft", "am_fft"]
+            N_k = N * self.sin_theta
+        else:
+            self.keys_state_spect = ["ap_fft", "am_fft"]
+            N_k = np.zeros_like(self.sin_theta)
+        self.N = N
+
+        f_k = (f or 0.0) * self.cos_theta
+        omega = np.sqrt(f_k ** 2 + N_k ** 2)
+        where_omega_zero = omega == 0
+        omega_nozero = np.where(where_omega_zero, 1.0, omega)
+        coef_cos = f_k / omega_nozero
+        coef_sin = N_k / omega_nozero
+        # any orthonormal basis is fine for the modes without waves
+        if self.has_buoyancy:
+            coef_sin[where_omega_zero] = 1.0
+        else:
+            coef_cos[where_omega_zero] = 1.0
+        self.omega, self.coef_cos, self.coef_sin = omega, coef_cos, coef_sin
+
+    def compute_freq_complex(self, key):
+        """Compute the linear frequency of a variable."""
+        if key == "q_fft":
+            return np.zeros_like(self.omega)
+        elif key == "ap_fft":
+            return -1j * self.omega
+        elif key == "am_fft":
+            return 1j * self.omega
+        raise ValueError(f"Unknown key {key}")
+
+    def gather(self, arr, out=None):
+        """Compute the vortical and wave modes of a spectral array.
+
+        An array of one variable (for example a dissipation frequency) is
+        returned unchanged.
+
+        """
+        if arr.ndim == len(self.shapeK_loc):
+            return arr
+        if out is None:
+            out = self.create_array(len(self.keys_state_spect), arr.dtype)
+        vt_fft, vp_fft = self.vtvpfft_from_vecfft(arr[0], arr[1], arr[2])
+        p1_fft = self.coef_cos * vt_fft
+        if self.has_buoyancy:
+            a_fft = arr[3] / self.N
+            p1_fft += self.coef_sin * a_fft
+            out[0] = self.coef_sin * vt_fft - self.coef_cos * a_fft
+        out[-2] = (vp_fft + 1j * p1_fft) / np.sqrt(2)
+        out[-1] = (vp_fft - 1j * p1_fft) / np.sqrt(2)
+        return out
+
+    def scatter(self, arr_waves, arr):
+        """Compute the velocity (and the buoyancy) from an array."""
+        ap_fft, am_fft = arr_waves[-2], arr_waves[-1]
+        vp_fft = (ap_fft + am_fft) / np.sqrt(2)
+        p1_fft = -1j * (ap_fft - am_fft) / np.sqrt(2)
+        vt_fft = self.coef_cos * p1_fft
+        if self.has_buoyancy:
+            q_fft = arr_waves[0]
+            vt_fft += self.coef_sin * q_fft
+            arr[3] = self.N * (self.coef_sin * p1_fft - self.coef_cos * q_fft)
+        self.vecfft_from_vtvpfft(vt_fft, vp_fft, arr[:3])
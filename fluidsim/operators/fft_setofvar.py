@@ -0,0 +1,263 @@
+"""FFTs of sets of variables (:mod:`fluidsim.operators.fft_setofvar`)
+=====================================================================
+
+Provides
+
+.. autoclass:: FFTSetOfVar
+   :members:
+   :private-members:
+
+.. autoclass:: MixinFFTSetOfVar
+   :members:
+
+.. note::
+
+  The solvers transform all the fields of a pass with one call to the
+  methods `ifft_setofvar` and `fft_setofvar` of the operators. With the
+  sequential FFT classes using pyfftw, these transforms are computed with
+  multi-field pyfftw plans over the leading axis (one plan per number of
+  fields and per precision), which also work in single precision. For the
+  other FFT classes (in particular with MPI), the fields are transformed one
+  by one with the methods `ifft_as_arg` and `fft_as_arg` of the operator.
+
+"""
+
+import numpy as np
+
+from fluiddyn.calcul.easypyfft import BasePyFFT, nthreads
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+
+def is_aligned(arr, alignment=64):
+    """Check if an array is aligned for the FFT classes.
+
+    Some FFT classes (for example the ones using pyfftw) cannot write their
+    results in arrays less aligned than the arrays used for their plans,
+    which can be the case for the variables of a set of variables.
+
+    """
+    return arr.ctypes.data % alignment == 0
+
+
+def _empty_aligned(shape, dtype):
+    if pyfftw is None:
+        return np.empty(shape, dtype)
+    return pyfftw.empty_aligned(shape, dtype)
+
+
+class FFTSetOfVar:
+    """Multi-field FFTs over the leading axes of arrays.
+
+    Parameters
+    ----------
+
+    oper : operator
+
+      Operator (2d or 3d) providing the single field transforms.
+
+    """
+
+    def __init__(self, oper):
+        self.oper = oper
+        self.shapeX_loc = tuple(oper.shapeX_loc)
+        self.shapeK_loc = tuple(oper.shapeK_loc)
+        self.is_batched = pyfftw is not None and isinstance(
+            getattr(oper, "oper_fft", None), BasePyFFT
+        )
+        if self.is_batched:
+            self._init_normalization()
+        # keys: (number of fields, real dtype)
+        self._plans = {}
+        # aligned buffers used by the loop over the fields
+        self._buffers = {}
+
+    def _init_normalization(self):
+        """Compute the coefficients applied after the unnormalized plans.
+
+        They are taken from the FFT class (transforms of the mode k = 0) so
+        that the results are the same as with `fft_as_arg` and `ifft_as_arg`.
+
+        """
+        oper_fft = self.oper.oper_fft
+        field = np.ones(self.shapeX_loc)
+        field_fft = np.zeros(self.shapeK_loc, np.complex128)
+        oper_fft.fft_as_arg(field, field_fft)
+        self.coef_forward = field_fft.flat[0].real / field.size
+        field_fft[...] = 0.0
+        field_fft.flat[0] = 1.0
+        oper_fft.ifft_as_arg(field_fft, field)
+        self.coef_backward = field.flat[0]
+
+    def _get_plans(self, nb_fields, dtype_real):
+        """Get the forward and backward plans and their arrays.
+
+        The plans are created at the first call with their own aligned
+        arrays, which are also used for the inputs that have to be preserved
+        and instead of the arrays that cannot be used by the plans.
+
+        """
+        key = (nb_fields, np.dtype(dtype_real))
+        try:
+            return self._plans[key]
+        except KeyError:
+            pass
+        dtype_complex = np.result_type(dtype_real, np.complex64)
+        arrX = pyfftw.empty_aligned((nb_fields,) + self.shapeX_loc, dtype_real)
+        arrK = pyfftw.empty_aligned((nb_fields,) + self.shapeK_loc, dtype_complex)
+        axes = tuple(range(1, arrX.ndim))
+        plan_forward = pyfftw.FFTW(
+            arrX, arrK, axes=axes, direction="FFTW_FORWARD", threads=nthreads
+        )
+        plan_backward = pyfftw.FFTW(
+            arrK, arrX, axes=axes, direction="FFTW_BACKWARD", threads=nthreads
+        )
+        plans = self._plans[key] = plan_forward, plan_backward, arrX, arrK
+        return plans
+
+    @staticmethod
+    def _execute(plan, arr_in, arr_out, buffer_in, buffer_out, can_use_input):
+        """Execute a plan (with its own arrays if needed)."""
+
+        def is_usable(arr, buffer, alignment):
+            return (
+                arr.dtype == buffer.dtype
+                and arr.flags.c_contiguous
+                and is_aligned(arr, alignment)
+            )
+
+        if can_use_input and is_usable(arr_in, buffer_in, plan.input_alignment):
+            new_in = arr_in
+        else:
+            buffer_in[...] = arr_in
+            new_in = buffer_in
+
+        if is_usable(arr_out, buffer_out, plan.output_alignment):
+            new_out = arr_out
+        else:
+            new_out = buffer_out
+
+        plan.update_arrays(new_in, new_out)
+        plan.execute()
+        if new_out is not arr_out:
+            arr_out[...] = new_out
+
+    def _get_buffer(self, shape, dtype):
+        key = (shape, np.dtype(dtype))
+        try:
+            return self._buffers[key]
+        except KeyError:
+            buffer = self._buffers[key] = _empty_aligned(shape, dtype)
+            return buffer
+
+    @staticmethod
+    def _as_fields(arr, nb_fields, ndim):
+        """View of an array with only one leading axis."""
+        if arr.ndim == ndim + 1:
+            return arr
+        return arr.reshape((nb_fields,) + arr.shape[arr.ndim - ndim :])
+
+    def ifft(self, arr_fft, arr=None, destroy=False):
+        """Inverse Fourier transforms over the last axes (see ifft_setofvar)."""
+        ndim = len(self.shapeK_loc)
+        shape_lead = arr_fft.shape[: arr_fft.ndim - ndim]
+        if arr is None:
+            dtype_real = np.empty(0, arr_fft.dtype).real.dtype
+            arr = _empty_aligned(shape_lead + self.shapeX_loc, dtype_real)
+        nb_fields = int(np.prod(shape_lead))
+        if nb_fields == 0:
+            return arr
+        fields_fft = self._as_fields(arr_fft, nb_fields, ndim)
+        fields = self._as_fields(arr, nb_fields, ndim)
+
+        if self.is_batched:
+            _, plan, arrX, arrK = self._get_plans(nb_fields, arr.dtype)
+            # the backward transforms destroy their input
+            self._execute(plan, fields_fft, fields, arrK, arrX, destroy)
+            if self.coef_backward != 1.0:
+                fields *= self.coef_backward
+            return arr
+
+        # loop over the fields (MPI and other FFT classes)
+        oper = self.oper
+        if destroy:
+            ifft_as_arg = getattr(oper, "ifft_as_arg_destroy", oper.ifft_as_arg)
+        else:
+            ifft_as_arg = oper.ifft_as_arg
+        for field_fft, field in zip(fields_fft, fields):
+            if is_aligned(field):
+                ifft_as_arg(field_fft, field)
+            else:
+                buffer = self._get_buffer(field.shape, field.dtype)
+                ifft_as_arg(field_fft, buffer)
+                field[...] = buffer
+        return arr
+
+    def fft(self, arr, arr_fft=None):
+        """Fourier transforms over the last axes (see fft_setofvar)."""
+        ndim = len(self.shapeX_loc)
+        shape_lead = arr.shape[: arr.ndim - ndim]
+        if arr_fft is None:
+            dtype_complex = np.result_type(arr.dtype, np.complex64)
+            arr_fft = _empty_aligned(shape_lead + self.shapeK_loc, dtype_complex)
+        nb_fields = int(np.prod(shape_lead))
+        if nb_fields == 0:
+            return arr_fft
+        fields = self._as_fields(arr, nb_fields, ndim)
+        fields_fft = self._as_fields(arr_fft, nb_fields, ndim)
+
+        if self.is_batched:
+            plan, _, arrX, arrK = self._get_plans(nb_fields, arr_fft.real.dtype)
+            self._execute(plan, fields, fields_fft, arrX, arrK, True)
+            fields_fft *= self.coef_forward
+            return arr_fft
+
+        # loop over the fields (MPI and other FFT classes)
+        fft_as_arg = self.oper.fft_as_arg
+        for field, field_fft in zip(fields, fields_fft):
+            if is_aligned(field_fft):
+                fft_as_arg(field, field_fft)
+            else:
+                buffer = self._get_buffer(field_fft.shape, field_fft.dtype)
+                fft_as_arg(field, buffer)
+                field_fft[...] = buffer
+        return arr_fft
+
+
+class MixinFFTSetOfVar:
+    """Methods of the operators for the FFTs of sets of variables."""
+
+    @property
+    def _fft_setofvar(self):
+        try:
+            return self.__dict__["_fft_setofvar_object"]
+        except KeyError:
+            fft_setofvar = self.__dict__["_fft_setofvar_object"] = FFTSetOfVar(
+                self
+            )
+            return fft_setofvar
+
+    def ifft_setofvar(self, arr_fft, arr=None, destroy=False):
+        """Inverse Fourier transforms of a set of variables.
+
+        The variables are stored along the first axis (or the first axes) of
+        `arr_fft` and `arr` (created if None). If `destroy` is True,
+        `arr_fft` can be modified.
+
+        With the sequential FFT classes using pyfftw, all the variables are
+        transformed with one multi-field plan. Otherwise, they are
+        transformed one by one (see :class:`FFTSetOfVar`).
+
+        """
+        return self._fft_setofvar.ifft(arr_fft, arr, destroy)
+
+    def fft_setofvar(self, arr, arr_fft=None):
+        """Fourier transforms of a set of variables (first axis or axes).
+
+        As with `fft_as_arg`, `arr` can be modified by some FFT classes.
+
+        """
+        return self._fft_setofvar.fft(arr, arr_fft)
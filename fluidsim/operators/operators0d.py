@@ -21,7 +21,16 @@ class Operators0D:
     def _complete_params_with_default(params):
         """This static method is used to complete the *params* container.
         """
-        params._set_child("oper")
+        params._set_child("oper", attribs={"nb_members": 1})
+        params.oper._set_doc(
+            """
+nb_members: int (default 1)
+
+    Number of members of an ensemble of simulations. If larger than 1, the
+    variables are arrays of shape `(nb_members,)` and all the members are
+    integrated together (with vectorized time steps).
+"""
+        )
 
     def __init__(self, params=None, SEQUENTIAL=None):
         if mpi.nb_proc > 1:
@@ -29,16 +38,27 @@ class Operators0D:
 
         self.params = params
         self.axes = tuple()
-        self.shapeX_seq = self.shapeX_loc = []
+        if params is None:
+            self.nb_members = 1
+        else:
+            self.nb_members = getattr(params.oper, "nb_members", 1)
+
+        if self.nb_members > 1:
+            self.shapeX_seq = self.shapeX_loc = [self.nb_members]
+        else:
+            self.shapeX_seq = self.shapeX_loc = []
 
     def produce_str_describing_oper(self):
         """Produce a string describing the operator."""
-
+        if self.nb_members > 1:
+            return f"ens{self.nb_members}"
         return ""
 
     def produce_long_str_describing_oper(self):
         """Produce a string describing the operator."""
 
+        if self.nb_members > 1:
+            return f"0d simulation (ensemble of {self.nb_members} members)\n"
         return "0d simulation\n"
 
     def gather_Xspace(self, a):
@@ -13,11 +13,13 @@ from warnings import warn
 
 import numpy as np
 
-from transonic import boost, Array, Transonic
+from transonic import boost, Array, Transonic, Type
 from fluiddyn.util import mpi
 from fluidfft.fft2d.operators import OperatorsPseudoSpectral2D as _Operators
 
 from ..base.setofvariables import SetOfVariables
+from .cache import cached_array, init_cache_arrays
+from .fft_setofvar import MixinFFTSetOfVar
 from .. import _is_testing
 
 ts = Transonic()
@@ -31,8 +33,14 @@ elif ts.is_transpiling:
     _Operators = object
 
 
-Af = Array[np.float64, "2d"]
-Ac = Array[np.complex128, "2d"]
+Af = Array[Type(np.float64, np.float32), "2d"]
+Ac = Array[Type(np.complex128, np.complex64), "2d"]
+Asov = Array[Type(np.complex128, np.complex64), "3d"]
+
+DTYPES_PRECISION = {
+    "double": (np.float64, np.complex128),
+    "single": (np.float32, np.complex64),
+}
 
 
 @boost
@@ -50,6 +58,42 @@ def invlaplacian_fft(a_fft: Ac, Kn_not0: Af, rank: int):
     return invlap_afft
 
 
+@boost
+def rotfft_from_vecfft(vecx_fft: Ac, vecy_fft: Ac, KX: Af, KY: Af):
+    """Return the rotational of a vector in spectral space."""
+    return 1j * (KX * vecy_fft - KY * vecx_fft)
+
+
+@boost
+def divfft_from_vecfft(vecx_fft: Ac, vecy_fft: Ac, KX: Af, KY: Af):
+    """Return the divergence of a vector in spectral space."""
+    return 1j * (KX * vecx_fft + KY * vecy_fft)
+
+
+@boost
+def vecfft_from_rotfft(rot_fft: Ac, KX_over_K2: Af, KY_over_K2: Af):
+    """Return the velocity in spectral space computed from the rotational."""
+    ux_fft = 1j * KY_over_K2 * rot_fft
+    uy_fft = -1j * KX_over_K2 * rot_fft
+    return ux_fft, uy_fft
+
+
+@boost
+def vecfft_from_divfft(div_fft: Ac, KX_over_K2: Af, KY_over_K2: Af):
+    """Return the velocity in spectral space computed from the divergence."""
+    ux_fft = -1j * KX_over_K2 * div_fft
+    uy_fft = -1j * KY_over_K2 * div_fft
+    return ux_fft, uy_fft
+
+
+@boost
+def gradfft_from_fft(f_fft: Ac, KX: Af, KY: Af):
+    """Return the gradient of f_fft in spectral space."""
+    px_f_fft = 1j * KX * f_fft
+    py_f_fft = 1j * KY * f_fft
+    return px_f_fft, py_f_fft
+
+
 @boost
 def compute_increments_dim1(var: Af, irx: int):
     """Compute the increments of var over the dim 1."""
@@ -59,6 +103,312 @@ def compute_increments_dim1(var: Af, irx: int):
     return inc_var
 
 
+def compute_ranges_dealiased(where_dealiased):
+    """Compute the contiguous ranges of dealiased modes in the rows.
+
+    Returns an array of shape `(nb_ranges, ndim + 1)`. Each line contains the
+    indices of a row (over the first `ndim - 1` dimensions) and the first and
+    last (excluded) indices over the last dimension of a range of consecutive
+    dealiased modes. With the 2/3 rule, there is one range per row for most
+    rows.
+
+    """
+    where_dealiased = np.asarray(where_dealiased, dtype=bool)
+    shape_rows = where_dealiased.shape[:-1]
+    rows = where_dealiased.reshape((-1, where_dealiased.shape[-1]))
+    padded = np.zeros((rows.shape[0], rows.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = rows
+    diff = np.diff(padded, axis=1)
+    irows, starts = np.nonzero(diff == 1)
+    _, stops = np.nonzero(diff == -1)
+    indices_rows = np.unravel_index(irows, shape_rows)
+    return np.ascontiguousarray(
+        np.stack(indices_rows + (starts, stops), axis=1), dtype=np.int64
+    )
+
+
+def get_dtypes_precision(params):
+    """Get the real and complex dtypes corresponding to `params.precision`."""
+    precision = getattr(params, "precision", "double")
+    try:
+        return DTYPES_PRECISION[precision]
+    except KeyError:
+        raise ValueError(
+            f"params.precision should be in {tuple(DTYPES_PRECISION)} "
+            f"(not {precision!r})"
+        )
+
+
+def _as_double(obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == np.float32:
+            return obj.astype(np.float64)
+        if obj.dtype == np.complex64:
+            return obj.astype(np.complex128)
+    return obj
+
+
+def _as_single(obj):
+    if isinstance(obj, tuple):
+        return tuple(_as_single(elem) for elem in obj)
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == np.float64:
+            return obj.astype(np.float32)
+        if obj.dtype == np.complex128:
+            return obj.astype(np.complex64)
+    return obj
+
+
+def _make_single_precision(method, kind):
+    def method_single(*args, **kwargs):
+        args_double = [_as_double(arg) for arg in args]
+        result = method(*args_double, **kwargs)
+        if kind == "fields":
+            return _as_single(result)
+        if kind != "reduction":
+            # copy the output arguments in the single precision arrays
+            for index in kind:
+                if args_double[index] is not args[index]:
+                    args[index][...] = args_double[index]
+        return result
+
+    return method_single
+
+
+def _make_method_with_arrays(func, arrays):
+    """Make a method calling a function with arrays as last arguments."""
+
+    def method(*args):
+        return func(*args, *arrays)
+
+    method.__doc__ = func.__doc__
+    return method
+
+
+def _set_fft_single_precision_methods(oper):
+    """Compute the FFTs with the single precision plans of `FFTSetOfVar`.
+
+    Returns the names of the methods replaced.
+
+    """
+    fft_setofvar = oper._fft_setofvar
+    dtype_real = oper.dtype_real
+    dtype_complex = oper.dtype_complex
+
+    def fft(arr):
+        return fft_setofvar.fft(np.asarray(arr, dtype_real))
+
+    def ifft(arr_fft):
+        return fft_setofvar.ifft(np.asarray(arr_fft, dtype_complex))
+
+    def fft_as_arg(arr, arr_fft):
+        fft_setofvar.fft(arr, arr_fft)
+
+    def ifft_as_arg(arr_fft, arr):
+        fft_setofvar.ifft(arr_fft, arr)
+
+    def ifft_as_arg_destroy(arr_fft, arr):
+        fft_setofvar.ifft(arr_fft, arr, destroy=True)
+
+    methods = {
+        "fft": fft,
+        "ifft": ifft,
+        "fft_as_arg": fft_as_arg,
+        "ifft_as_arg": ifft_as_arg,
+        "ifft_as_arg_destroy": ifft_as_arg_destroy,
+    }
+    # aliases (fft2 and ifft2 in 2d, fft3d and ifft3d in 3d)
+    for name in ("fft2", "fft3d"):
+        methods[name] = fft
+        methods["i" + name] = ifft
+
+    names = [name for name in methods if hasattr(oper, name)]
+    for name in names:
+        setattr(oper, name, methods[name])
+    return names
+
+
+def set_single_precision_methods(oper, kinds_methods, arrays_methods):
+    """Adapt the methods of an operator for single precision arrays.
+
+    Some methods are computed in single precision, without conversion of the
+    fields:
+
+    - with the sequential FFT classes using pyfftw, the FFTs are computed with
+      single precision plans (see
+      :class:`fluidsim.operators.fft_setofvar.FFTSetOfVar`);
+
+    - `arrays_methods` is a dictionary giving for some methods a function and
+      the names of the arrays of the operator passed as its last arguments.
+      The float64 arrays (the wavenumbers) are replaced by float32 copies,
+      which are shared by the methods.
+
+    The other methods (the FFTs of the other FFT classes and the compiled
+    methods of fluidfft) only support double precision, so that they store
+    their results in single precision but convert the arrays at each call.
+    `kinds_methods` is a dictionary giving for each of these methods the kind
+    of its results: "fields" (results converted in single precision),
+    "reduction" (double precision results, used for the global sums and the
+    spectra) or a tuple of the indices of the arguments modified in place.
+
+    """
+    kinds_methods = dict(kinds_methods)
+    if oper._fft_setofvar.is_batched:
+        for name in _set_fft_single_precision_methods(oper):
+            kinds_methods.pop(name, None)
+
+    arrays_single = {}
+    for name, (func, names_arrays) in arrays_methods.items():
+        for name_array in names_arrays:
+            if name_array not in arrays_single:
+                arr = getattr(oper, name_array)
+                if arr.dtype == np.float64:
+                    arr = arr.astype(np.float32)
+                arrays_single[name_array] = arr
+        arrays = [arrays_single[name_array] for name_array in names_arrays]
+        setattr(oper, name, _make_method_with_arrays(func, arrays))
+
+    for name, kind in kinds_methods.items():
+        if hasattr(oper, name):
+            setattr(oper, name, _make_single_precision(getattr(oper, name), kind))
+
+
+def _ikc_from_ik(nkc, nk):
+    """Indices of the modes of a coarse dimension (-1 if not present)."""
+    ikcs = np.arange(nkc)
+    iks = np.where(ikcs <= nkc / 2.0, ikcs, ikcs - nkc + nk)
+    ikc_from_ik = np.full(nk, -1)
+    ikc_from_ik[iks] = ikcs
+    return ikc_from_ik
+
+
+def compute_maps_coarse(iks, nks, shapeK_coarse, comm=None):
+    """Compute the indices used to exchange data with a coarse array.
+
+    Used by the methods ``coarse_seq_from_fft_loc`` and
+    ``put_coarse_array_in_array_fft`` of the 2d and 3d operators.
+
+    Parameters
+    ----------
+
+    iks : sequence of arrays
+
+      Integer wavenumbers of the local modes along the axes of the
+      (sequential) coarse array. The wavenumbers along the last axis are
+      non-negative.
+
+    nks : sequence of int
+
+      Numbers of modes of the full arrays along the other axes.
+
+    shapeK_coarse : tuple
+
+    comm : MPI communicator (None without MPI)
+
+    Returns
+    -------
+
+    A tuple `(indices_loc, indices_coarse, counts, displs)`: the flat indices
+    of the local modes present in the coarse array, the flat indices of these
+    modes in the coarse array (on rank 0 with MPI, for the modes of all
+    processes ordered by rank) and the numbers of modes of the processes and
+    their displacements in `indices_coarse` (None without MPI).
+
+    """
+    *iks_signed, ik_last = iks
+    iks_coarse = []
+    is_coarse = ik_last < shapeK_coarse[-1]
+    for ik, nk, nkc in zip(iks_signed, nks, shapeK_coarse):
+        ikc = _ikc_from_ik(nkc, nk)[ik % nk]
+        is_coarse &= ikc >= 0
+        iks_coarse.append(ikc)
+    iks_coarse.append(ik_last)
+
+    indices_loc = np.flatnonzero(is_coarse)
+    indices_coarse = np.ravel_multi_index(
+        tuple(ikc.ravel()[indices_loc] for ikc in iks_coarse), shapeK_coarse
+    )
+
+    counts = displs = None
+    if comm is not None:
+        indices_coarse_ranks = comm.gather(indices_coarse, root=0)
+        if comm.rank == 0:
+            counts = np.array([arr.size for arr in indices_coarse_ranks])
+            displs = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            indices_coarse = np.concatenate(indices_coarse_ranks)
+        else:
+            indices_coarse = None
+
+    return indices_loc, indices_coarse, counts, displs
+
+
+def gather_coarse(f_fft, maps, shapeK_coarse, comm=None):
+    """Gather the coarse modes of a local array in a coarse array.
+
+    With MPI, the values are gathered on rank 0 with one `Gatherv` and the
+    other processes return None.
+
+    """
+    indices_loc, indices_coarse, counts, displs = maps
+    values = np.take(f_fft, indices_loc)
+
+    if comm is not None:
+        if comm.rank == 0:
+            values_all = np.empty(indices_coarse.size, dtype=values.dtype)
+            recvbuf = [values_all, (counts, displs)]
+        else:
+            recvbuf = None
+        comm.Gatherv(values, recvbuf, root=0)
+        if comm.rank != 0:
+            return None
+        values = values_all
+
+    fc_fft = np.zeros(shapeK_coarse, dtype=f_fft.dtype)
+    np.put(fc_fft, indices_coarse, values)
+    return fc_fft
+
+
+def scatter_coarse(arr_coarse, arr, maps, comm=None):
+    """Put the values of a coarse array in the coarse modes of a local array.
+
+    With MPI, the coarse array is only used on rank 0 and its values are sent
+    to the processes with one `Scatterv`.
+
+    """
+    indices_loc, indices_coarse, counts, displs = maps
+
+    if comm is None or comm.rank == 0:
+        values = np.take(arr_coarse, indices_coarse)
+
+    if comm is not None:
+        values_loc = np.empty(indices_loc.size, dtype=arr.dtype)
+        if comm.rank == 0:
+            values = values.astype(arr.dtype, copy=False)
+            sendbuf = [values, (counts, displs)]
+        else:
+            sendbuf = None
+        comm.Scatterv(sendbuf, values_loc, root=0)
+        values = values_loc
+
+    np.put(arr, indices_loc, values)
+
+
+def _check_coarse_array(arr_coarse, ndim, shapeK_loc_coarse):
+    """Check a coarse array (2d or 3d) put in an array of dimension ndim.
+
+    Returns an error message or None.
+
+    """
+    if arr_coarse.ndim != ndim:
+        return f"arr_coarse.ndim != {ndim}"
+    nKyc, nKxc = shapeK_loc_coarse
+    if np.any(arr_coarse[..., nKyc // 2, :] != 0):
+        return "any(arr_coarse[nKyc//2] != 0)"
+    if np.any(arr_coarse[..., nKxc - 1] != 0):
+        return "any(arr_coarse[:, nKxc-1] != 0)"
+    return None
+
+
 if not ts.is_transpiling:
     nb_proc = mpi.nb_proc
     rank = mpi.rank
@@ -72,10 +422,39 @@ if nb_proc > 1:
 
 
 @boost
-class OperatorsPseudoSpectral2D(_Operators):
+class OperatorsPseudoSpectral2D(MixinFFTSetOfVar, _Operators):
 
     _has_to_dealiase: bool
-    where_dealiased: "uint8[:, :]"
+    _ranges_dealiased: "int64[:, :]"
+
+    _kinds_methods_single_precision = {
+        "fft": "fields",
+        "fft2": "fields",
+        "ifft": "fields",
+        "ifft2": "fields",
+        "fft_as_arg": (1,),
+        "ifft_as_arg": (1,),
+        "ifft_as_arg_destroy": (1,),
+        "create_arrayX": "fields",
+        "create_arrayK": "fields",
+        "create_arrayX_random": "fields",
+        "create_arrayK_random": "fields",
+        "sum_wavenumbers": "reduction",
+        "mean_global": "reduction",
+        "compute_energy_from_X": "reduction",
+        "compute_energy_from_K": "reduction",
+        "compute_1dspectra": "reduction",
+        "compute_2dspectrum": "reduction",
+        "compute_spectrum_kykx": "reduction",
+    }
+
+    _arrays_methods_single_precision = {
+        "rotfft_from_vecfft": (rotfft_from_vecfft, ("KX", "KY")),
+        "divfft_from_vecfft": (divfft_from_vecfft, ("KX", "KY")),
+        "vecfft_from_rotfft": (vecfft_from_rotfft, ("KX_over_K2", "KY_over_K2")),
+        "vecfft_from_divfft": (vecfft_from_divfft, ("KX_over_K2", "KY_over_K2")),
+        "gradfft_from_fft": (gradfft_from_fft, ("KX", "KY")),
+    }
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -89,12 +468,59 @@ class OperatorsPseudoSpectral2D(_Operators):
             "Lx": 8,
             "Ly": 8,
             "NO_SHEAR_MODES": False,
+            "max_memory_cache": 100.0,
+            "float32_cache": False,
         }
         params._set_child("oper", attribs=attribs)
+        params.oper._set_doc(
+            """
+
+See the `documentation of fluidfft <http://fluidfft.readthedocs.io>`_ (in
+particular of the `2d operator class
+<http://fluidfft.readthedocs.io/en/latest/generated/fluidfft.fft2d.operators.html>`_).
+
+type_fft: str
+
+    Method for the FFT (as defined by fluidfft).
+
+coef_dealiasing: float
+
+    dealiasing coefficient.
+
+nx: int
+
+    Number of points over the x-axis (last dimension in the physical space).
+
+ny: int
+
+    Number of points over the y-axis (first dimension in the physical space).
+
+Lx and Ly: float
+
+    Length of the edges of the numerical domain.
+
+NO_SHEAR_MODES: bool
+
+    If True, the shear modes (:math:`k_x = 0`) are removed by the dealiasing.
+
+max_memory_cache: float
+
+    Maximum memory (in MB) used by the cache of derived spectral arrays (see
+    :mod:`fluidsim.operators.cache`). The pinned arrays (used at each time
+    step) are not counted in this budget.
+
+float32_cache: bool
+
+    If True, the cached arrays which support it are stored in single
+    precision.
+
+"""
+        )
 
     def __init__(self, params):
 
         self.params = params
+        init_cache_arrays(self, params)
         self.axes = ("y", "x")
         nx = int(params.oper.nx)
         ny = int(params.oper.ny)
@@ -157,6 +583,16 @@ class OperatorsPseudoSpectral2D(_Operators):
                 )
                 self.where_dealiased = np.array(where_dealiased, dtype=np.uint8)
 
+        self._ranges_dealiased = compute_ranges_dealiased(self.where_dealiased)
+
+        self.dtype_real, self.dtype_complex = get_dtypes_precision(params)
+        if self.dtype_real is np.float32:
+            set_single_precision_methods(
+                self,
+                self._kinds_methods_single_precision,
+                self._arrays_methods_single_precision,
+            )
+
     def dealiasing(self, *args):
         if not self._has_to_dealiase:
             return
@@ -164,20 +600,61 @@ class OperatorsPseudoSpectral2D(_Operators):
         for thing in args:
             if isinstance(thing, SetOfVariables):
                 self.dealiasing_setofvar(thing)
+            elif isinstance(thing, np.ndarray) and thing.ndim > 2:
+                # batch of sets of variables (for example for ensembles)
+                self.dealiasing_setofvar(thing.reshape((-1,) + thing.shape[-2:]))
             elif isinstance(thing, np.ndarray):
-                self.dealiasing_variable(thing)
+                self.dealiasing_setofvar(thing[np.newaxis])
+
+    def dealiasing_variable(self, f_fft):
+        """Dealiasing a variable (both precisions, see `dealiasing`)."""
+        self.dealiasing(f_fft)
 
     @boost
-    def dealiasing_setofvar(self, sov: "complex128[][][]"):
-        """Dealiasing of a setofvar arrays."""
+    def dealiasing_setofvar(self, sov: Asov):
+        """Dealiasing of a setofvar arrays.
+
+        Only the precomputed ranges of dealiased modes are set to zero.
+
+        """
         if self._has_to_dealiase:
-            nk, n0, n1 = sov.shape
+            nk = sov.shape[0]
+            ranges = self._ranges_dealiased
+
+            for ir in range(ranges.shape[0]):
+                i0 = ranges[ir, 0]
+                start = ranges[ir, 1]
+                stop = ranges[ir, 2]
+                for ik in range(nk):
+                    sov[ik, i0, start:stop] = 0.0
+
+    # KX2_minus_KY2 and KXKY are used at each time step (pinned in the cache)
+    @cached_array(single_precision=True, pinned=True)
+    def KX2_minus_KY2(self):
+        """Array :math:`k_x^2 - k_y^2`."""
+        return self.KX ** 2 - self.KY ** 2
+
+    @cached_array(single_precision=True, pinned=True)
+    def KXKY(self):
+        """Array :math:`k_x k_y`."""
+        return self.KX * self.KY
+
+    def get_phase_shift(self, shift):
+        r"""Compute the phase shift :math:`e^{i \mathbf{k} \cdot \mathbf{\delta}}`
 
-            for i0 in range(n0):
-                for i1 in range(n1):
-                    if self.where_dealiased[i0, i1]:
-                        for ik in range(nk):
-                            sov[ik, i0, i1] = 0.0
+        The inverse transform of `f_fft * phase_shift` is the field `f`
+        computed on a physical grid shifted by :math:`\mathbf{\delta}`.
+
+        Parameters
+        ----------
+
+        shift : sequence of 2 floats
+
+          Shift of the physical grid over the axes ("y", "x").
+
+        """
+        phase_shift = np.exp(1j * (self.KY * shift[0] + self.KX * shift[1]))
+        return phase_shift.astype(self.dtype_complex, copy=False)
 
     def project_fft_on_realX_seq(self, f_fft):
         """Project the given field in spectral space such as its
@@ -221,117 +698,61 @@ class OperatorsPseudoSpectral2D(_Operators):
     def project_fft_on_realX_slow(self, f_fft):
         return self.fft(self.ifft(f_fft))
 
+    def _get_maps_coarse(self, shapeK_loc_coarse):
+        """Get the indices used to exchange data with a coarse array.
+
+        See :func:`compute_maps_coarse` (computed once per coarse shape).
+
+        """
+        shapeK_loc_coarse = tuple(int(n) for n in shapeK_loc_coarse)
+        try:
+            maps_coarse = self._maps_coarse
+        except AttributeError:
+            maps_coarse = self._maps_coarse = {}
+        try:
+            return maps_coarse[shapeK_loc_coarse]
+        except KeyError:
+            pass
+
+        iky = np.round(self.KY / self.deltaky).astype(int)
+        ikx = np.round(self.KX / self.deltakx).astype(int)
+        maps = maps_coarse[shapeK_loc_coarse] = compute_maps_coarse(
+            (iky, ikx), (self.ny_seq,), shapeK_loc_coarse, self._comm_coarse
+        )
+        return maps
+
+    @property
+    def _comm_coarse(self):
+        return comm if nb_proc > 1 and not self.is_sequential else None
+
     def coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
-        """Return a coarse field in K space."""
-        nkyc = shapeK_loc_coarse[0]
-        nkxc = shapeK_loc_coarse[1]
+        """Return a coarse field in K space.
 
-        if nb_proc > 1:
-            if not self.is_transposed:
-                raise NotImplementedError()
-
-            fc_trans = np.empty([nkxc, nkyc], np.complex128)
-            nky = self.shapeK_seq[1]
-            f1d_temp = np.empty([nkyc], np.complex128)
-
-            for ikxc in range(nkxc):
-                kx = self.deltakx * ikxc
-                rank_ikx, ikxloc, ikyloc = self.where_is_wavenumber(kx, 0.0)
-                if rank == rank_ikx:
-                    # create f1d_temp
-                    for ikyc in range(nkyc):
-                        if ikyc <= nkyc / 2:
-                            iky = ikyc
-                        else:
-                            kynodim = ikyc - nkyc
-                            iky = kynodim + nky
-                        f1d_temp[ikyc] = f_fft[ikxloc, iky]
-
-                if rank_ikx != 0:
-                    # message f1d_temp
-                    if rank == 0:
-                        # print('f1d_temp', f1d_temp, f1d_temp.dtype)
-                        comm.Recv(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX],
-                            source=rank_ikx,
-                            tag=ikxc,
-                        )
-                    elif rank == rank_ikx:
-                        comm.Send(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX], dest=0, tag=ikxc
-                        )
-                if rank == 0:
-                    # copy into fc_trans
-                    fc_trans[ikxc] = f1d_temp.copy()
-            fc_fft = fc_trans.transpose()
+        With MPI, the coarse field is gathered on rank 0 (one `Gatherv`) and
+        the other processes return None.
 
-        else:
-            nky = self.shapeK_seq[0]
-            fc_fft = np.empty([nkyc, nkxc], np.complex128)
-            for ikyc in range(nkyc):
-                if ikyc <= nkyc / 2:
-                    iky = ikyc
-                else:
-                    kynodim = ikyc - nkyc
-                    iky = kynodim + nky
-                for ikxc in range(nkxc):
-                    fc_fft[ikyc, ikxc] = f_fft[iky, ikxc]
-
-        # fc_fft[nkyc//2] *= 2
-
-        # energy_coarse = self.sum_wavenumbers(abs(fc_fft)**2)
-        # energy_global = self.sum_wavenumbers(abs(f_fft)**2)
-        # print('energy_coarse = {}'.format(energy_coarse))
-        # print('energy_global = {}'.format(energy_global))
-
-        # assert energy_global == energy_coarse
-
-        return fc_fft
-
-    # def fft_loc_from_coarse_seq(self, fc_fft, shapeK_loc_coarse):
-    #     """Return a large field in K space."""
-    #     nkyc = shapeK_loc_coarse[0]
-    #     nkxc = shapeK_loc_coarse[1]
-
-    #     if nb_proc > 1:
-    #         nky = self.shapeK_seq[0]
-    #         f_fft = self.create_arrayK(value=0.)
-    #         fc_trans = fc_fft.transpose()
-
-    #         for ikxc in range(nkxc):
-    #             kx = self.deltakx*ikxc
-    #             rank_ikx, ikxloc, ikyloc = self.where_is_wavenumber(kx, 0.)
-    #             fc1D = fc_trans[ikxc]
-    #             if rank_ikx != 0:
-    #                 # message fc1D
-    #                 fc1D = np.ascontiguousarray(fc1D)
-    #                 if rank == 0:
-    #                     comm.Send(fc1D, dest=rank_ikx, tag=ikxc)
-    #                 elif rank == rank_ikx:
-    #                     comm.Recv(fc1D, source=0, tag=ikxc)
-    #             if rank == rank_ikx:
-    #                 # copy
-    #                 for ikyc in range(nkyc):
-    #                     if ikyc <= nkyc/2:
-    #                         iky = ikyc
-    #                     else:
-    #                         kynodim = ikyc - nkyc
-    #                         iky = kynodim + nky
-    #                     f_fft[ikxloc, iky] = fc1D[ikyc]
-
-    #     else:
-    #         nky = self.shapeK_seq[0]
-    #         nkx = self.shapeK_seq[1]
-    #         f_fft = np.zeros([nky, nkx], np.complex128)
-    #         for ikyc in range(nkyc):
-    #             if ikyc <= nkyc/2:
-    #                 iky = ikyc
-    #             else:
-    #                 kynodim = ikyc - nkyc
-    #                 iky = kynodim + nky
-    #             for ikxc in range(nkxc):
-    #                 f_fft[iky, ikxc] = fc_fft[ikyc, ikxc]
-    #     return f_fft
+        """
+        return gather_coarse(
+            f_fft,
+            self._get_maps_coarse(shapeK_loc_coarse),
+            tuple(shapeK_loc_coarse),
+            self._comm_coarse,
+        )
+
+    def fft_loc_from_coarse_seq(self, fc_fft, shapeK_loc_coarse):
+        """Return a large field in K space.
+
+        With MPI, the coarse field is only used on rank 0.
+
+        """
+        f_fft = self.create_arrayK(value=0.0)
+        scatter_coarse(
+            fc_fft,
+            f_fft,
+            self._get_maps_coarse(shapeK_loc_coarse),
+            self._comm_coarse,
+        )
+        return f_fft
 
     def compute_increments_dim1(self, var, irx):
         """Compute the increments of var over the dim 1."""
@@ -497,81 +918,30 @@ class OperatorsPseudoSpectral2D(_Operators):
     ):
         """Put the values contained in a coarse array in an array.
 
-        Both arrays are in Fourier space.
+        Both arrays are in Fourier space. With MPI, the coarse array is only
+        used on rank 0 and its values are sent with one `Scatterv` per
+        variable. The coarse array is checked before the communications and
+        the errors are raised by all processes.
 
         """
-        if arr.ndim == 3:
-            if mpi.rank == 0:
-                if arr_coarse.ndim != 3:
-                    raise ValueError
-
-            for ikey in range(arr.shape[0]):
-                if mpi.rank == 0:
-                    arr2d_coarse = arr_coarse[ikey]
-                else:
-                    arr2d_coarse = None
-                self.put_coarse_array_in_array_fft(
-                    arr2d_coarse, arr[ikey], oper_coarse, shapeK_loc_coarse
-                )
+        comm_coarse = self._comm_coarse
+        is_root = comm_coarse is None or comm_coarse.rank == 0
+        message = None
+        if is_root:
+            message = _check_coarse_array(arr_coarse, arr.ndim, shapeK_loc_coarse)
+        if comm_coarse is not None:
+            message = comm_coarse.bcast(message, root=0)
+        if message is not None:
+            raise ValueError(message)
+
+        maps = self._get_maps_coarse(shapeK_loc_coarse)
+        if arr.ndim == 2:
+            scatter_coarse(arr_coarse, arr, maps, comm_coarse)
             return
 
-        nKyc, nKxc = shapeK_loc_coarse
-
-        if mpi.nb_proc > 1:
-            if not self.is_transposed:
-                raise NotImplementedError()
-
-            nKy = self.shapeK_seq[1]
-
-            if mpi.rank == 0:
-                fck_fft = arr_coarse.transpose()
-
-            for ikxc in range(nKxc):
-                kx = self.deltakx * ikxc
-                rank_ikx, ikxloc, ikyloc = self.where_is_wavenumber(kx, 0.0)
-
-                if mpi.rank == 0:
-                    fc1D = fck_fft[ikxc]
-
-                if rank_ikx != 0:
-                    # message fc1D
-                    if mpi.rank == rank_ikx:
-                        fc1D = np.empty([nKyc], dtype=np.complex128)
-                    if mpi.rank == 0 or mpi.rank == rank_ikx:
-                        fc1D = np.ascontiguousarray(fc1D)
-                    if mpi.rank == 0:
-                        mpi.comm.Send(
-                            [fc1D, mpi.MPI.COMPLEX], dest=rank_ikx, tag=ikxc
-                        )
-                    elif mpi.rank == rank_ikx:
-                        mpi.comm.Recv([fc1D, mpi.MPI.COMPLEX], source=0, tag=ikxc)
-                if mpi.rank == rank_ikx:
-                    # copy
-                    for ikyc in range(nKyc):
-                        if ikyc <= nKyc / 2.0:
-                            iky = ikyc
-                        else:
-                            kynodim = ikyc - nKyc
-                            iky = kynodim + nKy
-                        arr[ikxloc, iky] = fc1D[ikyc]
-        else:
-            nKy = self.shapeK_seq[0]
-
-            if any(arr_coarse[nKyc // 2] != 0):
-                raise ValueError("any(arr_coarse[nKyc//2] != 0)")
-
-            if any(arr_coarse[:, nKxc - 1] != 0):
-                raise ValueError("any(arr_coarse[:, nKxc-1] != 0)")
-
-            for ikyc in range(nKyc):
-                if ikyc <= nKyc / 2.0:
-                    iky = ikyc
-                else:
-                    kynodim = ikyc - nKyc
-                    iky = kynodim + nKy
-
-                for ikxc in range(nKxc):
-                    arr[iky, ikxc] = arr_coarse[ikyc, ikxc]
+        for ikey in range(arr.shape[0]):
+            arr2d_coarse = arr_coarse[ikey] if is_root else None
+            scatter_coarse(arr2d_coarse, arr[ikey], maps, comm_coarse)
 
     def get_grid1d_seq(self, axe="x"):
 
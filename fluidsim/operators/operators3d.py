@@ -14,21 +14,58 @@ from copy import deepcopy
 
 import numpy as np
 
-from transonic import boost, Array, Transonic
-from fluiddyn.util.mpi import nb_proc, rank
+from transonic import boost, Array, Transonic, Type
+from fluiddyn.util.mpi import nb_proc
 from fluidfft.fft3d.operators import OperatorsPseudoSpectral3D as _Operators
 
 from fluidsim.base.setofvariables import SetOfVariables
 
-from .operators2d import OperatorsPseudoSpectral2D as OpPseudoSpectral2D
+from .operators2d import (
+    OperatorsPseudoSpectral2D as OpPseudoSpectral2D,
+    compute_ranges_dealiased,
+    compute_maps_coarse,
+    gather_coarse,
+    scatter_coarse,
+    get_dtypes_precision,
+    set_single_precision_methods,
+)
+from .cache import cached_array, init_cache_arrays
+from .fft_setofvar import MixinFFTSetOfVar
 from .. import _is_testing
 
 ts = Transonic()
 
-Asov = Array[np.complex128, "4d"]
+Asov = Array[Type(np.complex128, np.complex64), "4d"]
 Aui8 = Array[np.uint8, "3d"]
-Ac = Array[np.complex128, "3d"]
-Af = Array[np.float64, "3d"]
+Ac = Array[Type(np.complex128, np.complex64), "3d"]
+Af = Array[Type(np.float64, np.float32), "3d"]
+Ai64 = Array[np.int64, "2d"]
+
+
+@boost
+def vector_product(ax: Af, ay: Af, az: Af, bx: Af, by: Af, bz: Af):
+    """Compute the vector product.
+
+    Warning: the arrays bx, by, bz are overwritten.
+
+    """
+    n0, n1, n2 = ax.shape
+
+    for i0 in range(n0):
+        for i1 in range(n1):
+            for i2 in range(n2):
+                elem_ax = ax[i0, i1, i2]
+                elem_ay = ay[i0, i1, i2]
+                elem_az = az[i0, i1, i2]
+                elem_bx = bx[i0, i1, i2]
+                elem_by = by[i0, i1, i2]
+                elem_bz = bz[i0, i1, i2]
+
+                bx[i0, i1, i2] = elem_ay * elem_bz - elem_az * elem_by
+                by[i0, i1, i2] = elem_az * elem_bx - elem_ax * elem_bz
+                bz[i0, i1, i2] = elem_ax * elem_by - elem_ay * elem_bx
+
+    return bx, by, bz
 
 
 @boost
@@ -67,6 +104,164 @@ def dealiasing_variable(ff_fft: Ac, where_dealiased: Aui8):
                     ff_fft[i0, i1, i2] = 0.0
 
 
+@boost
+def dealiasing_setofvar_ranges(sov: Asov, ranges_dealiased: Ai64):
+    """Dealiasing 3d setofvar object with ranges of dealiased modes.
+
+    Parameters
+    ----------
+
+    sov : 4d ndarray
+        A set of variables array.
+
+    ranges_dealiased : 2d ndarray
+        Lines `(i0, i1, start, stop)` (see
+        :func:`fluidsim.operators.operators2d.compute_ranges_dealiased`).
+
+    """
+    nk = sov.shape[0]
+
+    for ir in range(ranges_dealiased.shape[0]):
+        i0 = ranges_dealiased[ir, 0]
+        i1 = ranges_dealiased[ir, 1]
+        start = ranges_dealiased[ir, 2]
+        stop = ranges_dealiased[ir, 3]
+        for ik in range(nk):
+            sov[ik, i0, i1, start:stop] = 0.0
+
+
+@boost
+def dealiasing_variable_ranges(ff_fft: Ac, ranges_dealiased: Ai64):
+    """Dealiasing 3d array with ranges of dealiased modes"""
+    for ir in range(ranges_dealiased.shape[0]):
+        i0 = ranges_dealiased[ir, 0]
+        i1 = ranges_dealiased[ir, 1]
+        start = ranges_dealiased[ir, 2]
+        stop = ranges_dealiased[ir, 3]
+        ff_fft[i0, i1, start:stop] = 0.0
+
+
+@boost
+def project_perpk3d_dealiasing(
+    vx_fft: Ac,
+    vy_fft: Ac,
+    vz_fft: Ac,
+    Kx: Af,
+    Ky: Af,
+    Kz: Af,
+    inv_K_square_nozero: Af,
+    ranges_dealiased: Ai64,
+):
+    """Project (inplace) a vector perpendicular to k and dealias it.
+
+    The two operations are done in one pass over the spectral arrays: the
+    ranges of dealiased modes of a row (sorted by rows, see
+    :func:`fluidsim.operators.operators2d.compute_ranges_dealiased`) are set
+    to zero just after the projection of the row.
+
+    """
+    n0, n1, n2 = vx_fft.shape
+    nb_ranges = ranges_dealiased.shape[0]
+    ir = 0
+
+    for i0 in range(n0):
+        for i1 in range(n1):
+            for i2 in range(n2):
+                kx = Kx[i0, i1, i2]
+                ky = Ky[i0, i1, i2]
+                kz = Kz[i0, i1, i2]
+                tmp = (
+                    kx * vx_fft[i0, i1, i2]
+                    + ky * vy_fft[i0, i1, i2]
+                    + kz * vz_fft[i0, i1, i2]
+                ) * inv_K_square_nozero[i0, i1, i2]
+                vx_fft[i0, i1, i2] -= kx * tmp
+                vy_fft[i0, i1, i2] -= ky * tmp
+                vz_fft[i0, i1, i2] -= kz * tmp
+            while (
+                ir < nb_ranges
+                and ranges_dealiased[ir, 0] == i0
+                and ranges_dealiased[ir, 1] == i1
+            ):
+                start = ranges_dealiased[ir, 2]
+                stop = ranges_dealiased[ir, 3]
+                vx_fft[i0, i1, start:stop] = 0.0
+                vy_fft[i0, i1, start:stop] = 0.0
+                vz_fft[i0, i1, start:stop] = 0.0
+                ir += 1
+
+
+@boost
+def project_perpk3d(
+    vx_fft: Ac,
+    vy_fft: Ac,
+    vz_fft: Ac,
+    Kx: Af,
+    Ky: Af,
+    Kz: Af,
+    inv_K_square_nozero: Af,
+):
+    """Project (inplace) a vector perpendicular to the wavevector."""
+    tmp = (Kx * vx_fft + Ky * vy_fft + Kz * vz_fft) * inv_K_square_nozero
+    vx_fft -= Kx * tmp
+    vy_fft -= Ky * tmp
+    vz_fft -= Kz * tmp
+
+
+@boost
+def divfft_from_vecfft(
+    vx_fft: Ac,
+    vy_fft: Ac,
+    vz_fft: Ac,
+    Kx: Af,
+    Ky: Af,
+    Kz: Af,
+):
+    """Return the divergence of a vector in spectral space."""
+    return 1j * (Kx * vx_fft + Ky * vy_fft + Kz * vz_fft)
+
+
+@boost
+def rotfft_from_vecfft(
+    vx_fft: Ac,
+    vy_fft: Ac,
+    vz_fft: Ac,
+    Kx: Af,
+    Ky: Af,
+    Kz: Af,
+):
+    """Return the curl of a vector in spectral space."""
+    return (
+        1j * (Ky * vz_fft - Kz * vy_fft),
+        1j * (Kz * vx_fft - Kx * vz_fft),
+        1j * (Kx * vy_fft - Ky * vx_fft),
+    )
+
+
+@boost
+def rotfft_from_vecfft_outin(
+    vx_fft: Ac,
+    vy_fft: Ac,
+    vz_fft: Ac,
+    rotxfft: Ac,
+    rotyfft: Ac,
+    rotzfft: Ac,
+    Kx: Af,
+    Ky: Af,
+    Kz: Af,
+):
+    """Compute the curl of a vector in spectral space (in output arrays)."""
+    rotxfft[:] = 1j * (Ky * vz_fft - Kz * vy_fft)
+    rotyfft[:] = 1j * (Kz * vx_fft - Kx * vz_fft)
+    rotzfft[:] = 1j * (Kx * vy_fft - Ky * vx_fft)
+
+
+@boost
+def rotzfft_from_vxvyfft(vx_fft: Ac, vy_fft: Ac, Kx: Af, Ky: Af):
+    """Compute the z component of the curl in spectral space."""
+    return 1j * (Kx * vy_fft - Ky * vx_fft)
+
+
 def dealiasing_setofvar_numpy(sov: Asov, where_dealiased: Aui8):
     for i in range(sov.shape[0]):
         sov[i][np.nonzero(where_dealiased)] = 0.0
@@ -76,16 +271,40 @@ def dealiasing_variable_numpy(ff_fft: Ac, where_dealiased: Aui8):
     ff_fft[np.nonzero(where_dealiased)] = 0.0
 
 
+def dealiasing_setofvar_ranges_numpy(sov: Asov, ranges_dealiased: Ai64):
+    for i0, i1, start, stop in ranges_dealiased.tolist():
+        sov[:, i0, i1, start:stop] = 0.0
+
+
+def dealiasing_variable_ranges_numpy(ff_fft: Ac, ranges_dealiased: Ai64):
+    for i0, i1, start, stop in ranges_dealiased.tolist():
+        ff_fft[i0, i1, start:stop] = 0.0
+
+
+def project_perpk3d_dealiasing_numpy(
+    vx_fft, vy_fft, vz_fft, Kx, Ky, Kz, inv_K_square_nozero, ranges_dealiased
+):
+    tmp = (Kx * vx_fft + Ky * vy_fft + Kz * vz_fft) * inv_K_square_nozero
+    vx_fft -= Kx * tmp
+    vy_fft -= Ky * tmp
+    vz_fft -= Kz * tmp
+    for v_fft in (vx_fft, vy_fft, vz_fft):
+        dealiasing_variable_ranges_numpy(v_fft, ranges_dealiased)
+
+
 if not ts.is_transpiling and not ts.is_compiled and not _is_testing:
     # for example if Pythran is not available
     dealiasing_variable = dealiasing_variable_numpy
     dealiasing_setofvar = dealiasing_setofvar_numpy
+    dealiasing_variable_ranges = dealiasing_variable_ranges_numpy
+    dealiasing_setofvar_ranges = dealiasing_setofvar_ranges_numpy
+    project_perpk3d_dealiasing = project_perpk3d_dealiasing_numpy
 elif ts.is_transpiling:
     _Operators = object
 
 
 @boost
-class OperatorsPseudoSpectral3D(_Operators):
+class OperatorsPseudoSpectral3D(MixinFFTSetOfVar, _Operators):
     """Provides fast Fourier transform functions and 3D operators.
 
     Uses fft operators that implement the methods:
@@ -105,11 +324,50 @@ class OperatorsPseudoSpectral3D(_Operators):
 
     """
 
-    Kx: Af
-    Ky: Af
-    inv_K_square_nozero: Af
+    Kx: "float64[:, :, :]"
+    Ky: "float64[:, :, :]"
+    inv_K_square_nozero: "float64[:, :, :]"
     inv_Kh_square_nozero: Af
 
+    _kinds_methods_single_precision = {
+        "fft": "fields",
+        "fft3d": "fields",
+        "ifft": "fields",
+        "ifft3d": "fields",
+        "fft_as_arg": (1,),
+        "ifft_as_arg": (1,),
+        "ifft_as_arg_destroy": (1,),
+        "create_arrayX": "fields",
+        "create_arrayK": "fields",
+        "create_arrayX_random": "fields",
+        "create_arrayK_random": "fields",
+        "build_invariant_arrayX_from_2d_indices12X": "fields",
+        "build_invariant_arrayK_from_2d_indices12X": "fields",
+        "sum_wavenumbers": "reduction",
+        "compute_1dspectra": "reduction",
+        "compute_3dspectrum": "reduction",
+        "compute_spectrum_kzkh": "reduction",
+        "compute_spectra_2vars": "reduction",
+    }
+
+    _arrays_methods_single_precision = {
+        "project_perpk3d": (
+            project_perpk3d,
+            ("Kx", "Ky", "Kz", "inv_K_square_nozero"),
+        ),
+        "project_perpk3d_dealiasing": (
+            project_perpk3d_dealiasing,
+            ("Kx", "Ky", "Kz", "inv_K_square_nozero", "_ranges_dealiased"),
+        ),
+        "divfft_from_vecfft": (divfft_from_vecfft, ("Kx", "Ky", "Kz")),
+        "rotfft_from_vecfft": (rotfft_from_vecfft, ("Kx", "Ky", "Kz")),
+        "rotfft_from_vecfft_outin": (
+            rotfft_from_vecfft_outin,
+            ("Kx", "Ky", "Kz"),
+        ),
+        "rotzfft_from_vxvyfft": (rotzfft_from_vxvyfft, ("Kx", "Ky")),
+    }
+
     @staticmethod
     def _complete_params_with_default(params):
         """This static method is used to complete the *params* container.
@@ -124,6 +382,8 @@ class OperatorsPseudoSpectral3D(_Operators):
             "Lx": 2 * pi,
             "Ly": 2 * pi,
             "Lz": 2 * pi,
+            "max_memory_cache": 100.0,
+            "float32_cache": False,
         }
         params._set_child("oper", attribs=attribs)
         params.oper._set_doc(
@@ -161,6 +421,17 @@ Lx, Ly and Lz: float
 
     Length of the edges of the numerical domain.
 
+max_memory_cache: float
+
+    Maximum memory (in MB) used by the cache of derived spectral arrays (see
+    :mod:`fluidsim.operators.cache`). The pinned arrays (used at each time
+    step) are not counted in this budget.
+
+float32_cache: bool
+
+    If True, the cached arrays which support it are stored in single
+    precision.
+
 """
         )
 
@@ -168,6 +439,7 @@ Lx, Ly and Lz: float
 
         self.params = params
         self.axes = ("z", "y", "x")
+        init_cache_arrays(self, params)
 
         params.oper.nx = int(params.oper.nx)
         params.oper.ny = int(params.oper.ny)
@@ -208,6 +480,16 @@ Lx, Ly and Lz: float
         self.ifft2 = self.ifft2d = self.oper2d.ifft2
         self.fft2 = self.fft2d = self.oper2d.fft2
 
+        self._ranges_dealiased = compute_ranges_dealiased(self.where_dealiased)
+
+        self.dtype_real, self.dtype_complex = get_dtypes_precision(params)
+        if self.dtype_real is np.float32:
+            set_single_precision_methods(
+                self,
+                self._kinds_methods_single_precision,
+                self._arrays_methods_single_precision,
+            )
+
     def build_invariant_arrayX_from_2d_indices12X(self, arr2d):
         """Build a 3D array from a 2D array"""
         return self._op_fft.build_invariant_arrayX_from_2d_indices12X(
@@ -224,72 +506,141 @@ Lx, Ly and Lz: float
         """Dealiasing of SetOfVariables or np.ndarray"""
         for thing in args:
             if isinstance(thing, SetOfVariables):
-                dealiasing_setofvar(thing, self.where_dealiased)
+                dealiasing_setofvar_ranges(thing, self._ranges_dealiased)
+            elif isinstance(thing, np.ndarray) and thing.ndim > 3:
+                # batch of sets of variables (for example for ensembles)
+                dealiasing_setofvar_ranges(
+                    thing.reshape((-1,) + thing.shape[-3:]),
+                    self._ranges_dealiased,
+                )
             elif isinstance(thing, np.ndarray):
-                dealiasing_variable(thing, self.where_dealiased)
+                dealiasing_variable_ranges(thing, self._ranges_dealiased)
+
+    def project_perpk3d_dealiasing(self, vx_fft, vy_fft, vz_fft):
+        """Project (inplace) a vector perpendicular to k and dealias it.
+
+        Equivalent to :func:`project_perpk3d` followed by :func:`dealiasing`
+        but with only one pass over the arrays.
+
+        """
+        project_perpk3d_dealiasing(
+            vx_fft,
+            vy_fft,
+            vz_fft,
+            self.Kx,
+            self.Ky,
+            self.Kz,
+            self.inv_K_square_nozero,
+            self._ranges_dealiased,
+        )
+
+    def get_phase_shift(self, shift):
+        r"""Compute the phase shift :math:`e^{i \mathbf{k} \cdot \mathbf{\delta}}`
+
+        Parameters
+        ----------
+
+        shift : sequence of 3 floats
+
+          Shift of the physical grid over the axes ("z", "y", "x").
+
+        """
+        phase_shift = np.exp(
+            1j * (self.Kz * shift[0] + self.Ky * shift[1] + self.Kx * shift[2])
+        )
+        return phase_shift.astype(self.dtype_complex, copy=False)
+
+    def _get_maps_coarse(self, shapeK_loc_coarse):
+        """Get the indices used to exchange data with a coarse array.
+
+        See :func:`fluidsim.operators.operators2d.compute_maps_coarse`
+        (computed once per coarse shape). The modes are identified by their
+        wavenumbers so that the maps do not depend on the layout of the
+        spectral arrays.
+
+        """
+        shapeK_loc_coarse = tuple(int(n) for n in shapeK_loc_coarse)
+        try:
+            maps_coarse = self._maps_coarse
+        except AttributeError:
+            maps_coarse = self._maps_coarse = {}
+        try:
+            return maps_coarse[shapeK_loc_coarse]
+        except KeyError:
+            pass
+
+        ikz = np.round(self.Kz / self.deltakz).astype(int)
+        iky = np.round(self.Ky / self.deltaky).astype(int)
+        ikx = np.round(self.Kx / self.deltakx).astype(int)
+        maps = maps_coarse[shapeK_loc_coarse] = compute_maps_coarse(
+            (ikz, iky, ikx),
+            (self.nz_seq, self.ny_seq),
+            shapeK_loc_coarse,
+            self._comm_coarse,
+        )
+        return maps
+
+    @property
+    def _comm_coarse(self):
+        if nb_proc > 1 and not self.is_sequential:
+            return self.comm
+        return None
 
     def put_coarse_array_in_array_fft(
         self, arr_coarse, arr, oper_coarse, shapeK_loc_coarse
     ):
         """Put the values contained in a coarse array in an array.
 
-        Both arrays are in Fourier space.
+        Both arrays are in Fourier space. With MPI, the coarse array is only
+        used on rank 0 and its values are sent to the processes with one
+        `Scatterv` per variable. The dimension of the coarse array is checked
+        before the communications and the error is raised by all processes.
 
         """
-        if arr.ndim == 4:
-            if rank == 0:
-                if arr_coarse.ndim != 4:
-                    raise ValueError
-
-            for ikey in range(arr.shape[0]):
-                if rank == 0:
-                    arr3d_coarse = arr_coarse[ikey]
-                else:
-                    arr3d_coarse = None
-                self.put_coarse_array_in_array_fft(
-                    arr3d_coarse, arr[ikey], oper_coarse, shapeK_loc_coarse
-                )
+        comm_coarse = self._comm_coarse
+        is_root = comm_coarse is None or comm_coarse.rank == 0
+        is_ok = not is_root or arr_coarse.ndim == arr.ndim
+        if comm_coarse is not None:
+            is_ok = comm_coarse.bcast(is_ok, root=0)
+        if not is_ok:
+            raise ValueError(f"arr_coarse.ndim != {arr.ndim}")
+
+        maps = self._get_maps_coarse(shapeK_loc_coarse)
+        if arr.ndim == 3:
+            scatter_coarse(arr_coarse, arr, maps, comm_coarse)
             return
 
-        nkzc, nkyc, nkxc = shapeK_loc_coarse
+        for ikey in range(arr.shape[0]):
+            arr3d_coarse = arr_coarse[ikey] if is_root else None
+            scatter_coarse(arr3d_coarse, arr[ikey], maps, comm_coarse)
 
-        if nb_proc > 1:
-            raise NotImplementedError
+    def coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
+        """Return a coarse field in K space.
 
-        else:
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        arr[ikz, iky, ikxc] = arr_coarse[ikzc, ikyc, ikxc]
+        With MPI, the values are gathered on rank 0 with one `Gatherv` and
+        the other processes return None.
 
-    def coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
-        """Return a coarse field in K space."""
-        nkzc, nkyc, nkxc = shapeK_loc_coarse
-        if nb_proc > 1:
-            raise NotImplementedError()
+        """
+        return gather_coarse(
+            f_fft,
+            self._get_maps_coarse(shapeK_loc_coarse),
+            tuple(shapeK_loc_coarse),
+            self._comm_coarse,
+        )
 
-        else:
-            fc_fft = np.empty(shapeK_loc_coarse, np.complex128)
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        fc_fft[ikzc, ikyc, ikxc] = f_fft[ikz, iky, ikxc]
-        return fc_fft
+    @cached_array(single_precision=True)
+    def inv_Kh_square_nozero(self):
+        """Inverse of the square of the horizontal wavenumber (not infinite)."""
+        Kh_square_nozero = self.Kx ** 2 + self.Ky ** 2
+        Kh_square_nozero[Kh_square_nozero == 0] = 1e-14
+        return 1 / Kh_square_nozero
 
     @boost
     def urudfft_from_vxvyfft(self, vx_fft: Ac, vy_fft: Ac):
         """Compute toroidal and poloidal horizontal velocities
 
         """
-        inv_Kh_square_nozero = self.Kx ** 2 + self.Ky ** 2
-        inv_Kh_square_nozero[inv_Kh_square_nozero == 0] = 1e-14
-        inv_Kh_square_nozero = 1 / inv_Kh_square_nozero
+        inv_Kh_square_nozero = self.inv_Kh_square_nozero
 
         kdotu_fft = self.Kx * vx_fft + self.Ky * vy_fft
         udx_fft = kdotu_fft * self.Kx * inv_Kh_square_nozero
@@ -318,15 +669,6 @@ Lx, Ly and Lz: float
             return getattr(self, axe + "_seq")
 
 
-def _ik_from_ikc(ikc, nkc, nk):
-    if ikc <= nkc / 2.0:
-        ik = ikc
-    else:
-        knodim = ikc - nkc
-        ik = knodim + nk
-    return ik
-
-
 if __name__ == "__main__":
     n = 4
 
@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+from fluidsim.operators.cache import CacheArrays, cached_array
+from fluidsim.operators.test.test_operators3d import create_oper
+from fluidsim.util.testing import TestCase
+
+
+class OperatorsExample:
+    def __init__(self, max_memory, single_precision=False):
+        self.cache_arrays = CacheArrays(max_memory, single_precision)
+        self.nb_computations = 0
+
+    @cached_array(single_precision=True)
+    def ones(self):
+        self.nb_computations += 1
+        return np.ones(10)
+
+    @cached_array
+    def twos(self):
+        self.nb_computations += 1
+        return 2 * np.ones(10)
+
+    @cached_array(pinned=True)
+    def threes(self):
+        self.nb_computations += 1
+        return 3 * np.ones(10)
+
+
+class TestCacheArrays(TestCase):
+    def test_lru(self):
+        oper = OperatorsExample(max_memory=80)
+        self.assertIs(oper.ones, oper.ones)
+        self.assertEqual(oper.nb_computations, 1)
+        self.assertEqual(oper.cache_arrays.nb_hits, 1)
+        # the budget only allows one array
+        self.assertEqual(oper.twos[0], 2.0)
+        self.assertEqual(len(oper.cache_arrays), 1)
+        self.assertNotIn("ones", oper.cache_arrays)
+        oper.ones
+        self.assertEqual(oper.nb_computations, 3)
+        self.assertEqual(oper.cache_arrays.memory, 80)
+
+    def test_pinned(self):
+        oper = OperatorsExample(max_memory=80)
+        threes = oper.threes
+        # the pinned arrays are not counted in the budget and not removed
+        oper.ones
+        oper.twos
+        self.assertIs(oper.threes, threes)
+        self.assertEqual(oper.nb_computations, 3)
+        self.assertEqual(oper.cache_arrays.memory, 80)
+        self.assertEqual(oper.cache_arrays.memory_pinned, 80)
+
+        cache = oper.cache_arrays
+        arrays = cache.add_pinned("freq", np.zeros(5), version=1.0)
+        self.assertIs(cache.get_pinned("freq", 1.0), arrays)
+        self.assertIsNone(cache.get_pinned("freq", 2.0))
+        # a new version replaces the pinned arrays
+        cache.get_or_compute_pinned("freq", lambda: np.ones(5), version=2.0)
+        self.assertEqual(cache.get_pinned("freq", 2.0)[0], 1.0)
+        self.assertEqual(cache.memory_pinned, 80 + 40)
+
+    def test_max_nb_entries(self):
+        cache = CacheArrays(None, max_nb_entries=2)
+        for key in range(3):
+            cache.add(key, object())
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(0, cache)
+        self.assertEqual(cache.memory, 0)
+
+    def test_single_precision(self):
+        oper = OperatorsExample(max_memory=1000, single_precision=True)
+        self.assertEqual(oper.ones.dtype, np.float32)
+        self.assertEqual(oper.twos.dtype, np.float64)
+        self.assertEqual(oper.cache_arrays.memory, 40 + 80)
+
+    def test_oper3d(self):
+        oper = create_oper()
+        inv_Kh_square_nozero = oper.inv_Kh_square_nozero
+        self.assertIs(oper.inv_Kh_square_nozero, inv_Kh_square_nozero)
+        Kh_square = oper.Kx ** 2 + oper.Ky ** 2
+        where = Kh_square != 0
+        self.assertTrue(
+            np.allclose(inv_Kh_square_nozero[where], 1 / Kh_square[where])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+import numpy as np
+
+import fluiddyn.util.mpi as mpi
+
+from fluidsim.operators.fft_setofvar import FFTSetOfVar
+from fluidsim.operators.test.test_operators2d import (
+    create_oper as create_oper2d,
+)
+from fluidsim.operators.test.test_operators3d import (
+    create_oper as create_oper3d,
+)
+from fluidsim.util.testing import TestCase
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "Multi-field plans only for sequential FFTs")
+class TestFFTSetOfVar(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.opers = [
+            create_oper2d(type_fft="fft2d.with_pyfftw"),
+            create_oper3d(type_fft="fft3d.with_pyfftw"),
+        ]
+
+    def check_transforms(self, oper, fields):
+        """Compare with the single field transforms of the FFT class."""
+        shape_lead = fields.shape[: fields.ndim - len(oper.shapeX_loc)]
+        fields_fft_ref = np.array(
+            [
+                oper.fft(field.copy())
+                for field in fields.reshape(-1, *oper.shapeX_loc)
+            ]
+        )
+        fields_back_ref = np.array([oper.ifft(arr) for arr in fields_fft_ref])
+        fields_fft_ref = fields_fft_ref.reshape(
+            shape_lead + tuple(oper.shapeK_loc)
+        )
+        fields_back_ref = fields_back_ref.reshape(fields.shape)
+
+        fields_fft = oper.fft_setofvar(fields.copy())
+        np.testing.assert_allclose(fields_fft, fields_fft_ref, atol=1e-14)
+
+        fields_back = oper.ifft_setofvar(fields_fft)
+        # the input is preserved
+        np.testing.assert_allclose(fields_fft, fields_fft_ref, atol=1e-14)
+        np.testing.assert_allclose(fields_back, fields_back_ref, atol=1e-14)
+
+        fields_back[:] = 0.0
+        oper.ifft_setofvar(fields_fft, fields_back, destroy=True)
+        np.testing.assert_allclose(fields_back, fields_back_ref, atol=1e-14)
+
+    def test_batched(self):
+        for oper in self.opers:
+            self.assertTrue(oper._fft_setofvar.is_batched)
+            fields = np.array([oper.create_arrayX_random() for _ in range(3)])
+
+            def fail(*args):
+                raise AssertionError("single field transform used")
+
+            # the single field transforms are not used
+            methods = {
+                name: getattr(oper, name)
+                for name in ("fft_as_arg", "ifft_as_arg", "ifft_as_arg_destroy")
+                if hasattr(oper, name)
+            }
+            for name in methods:
+                setattr(oper, name, fail)
+            try:
+                fields_fft = oper.fft_setofvar(fields.copy())
+                oper.ifft_setofvar(fields_fft)
+                oper.ifft_setofvar(fields_fft, destroy=True)
+            finally:
+                for name, method in methods.items():
+                    setattr(oper, name, method)
+
+            self.check_transforms(oper, fields)
+            # leading axes (for example for ensembles)
+            self.check_transforms(oper, np.array([fields, 2 * fields]))
+            # not aligned arrays (views in larger arrays)
+            fields_large = np.empty((fields.size + 1,))
+            fields_view = fields_large[1:].reshape(fields.shape)
+            fields_view[:] = fields
+            self.check_transforms(oper, fields_view)
+
+            nb_plans = len(oper._fft_setofvar._plans)
+            self.check_transforms(oper, fields)
+            self.assertEqual(len(oper._fft_setofvar._plans), nb_plans)
+
+    def test_single_precision(self):
+        for oper in self.opers:
+            fields = np.array([oper.create_arrayX_random() for _ in range(2)])
+            fields_fft = oper.fft_setofvar(fields.copy())
+            fields_fft32 = oper.fft_setofvar(fields.astype(np.float32))
+            self.assertEqual(fields_fft32.dtype, np.complex64)
+            scale = abs(fields_fft).max()
+            np.testing.assert_allclose(
+                fields_fft32, fields_fft, atol=1e-6 * scale
+            )
+
+            fields_back = oper.ifft_setofvar(fields_fft)
+            fields_back32 = oper.ifft_setofvar(fields_fft32)
+            self.assertEqual(fields_back32.dtype, np.float32)
+            scale = abs(fields_back).max()
+            np.testing.assert_allclose(
+                fields_back32, fields_back, atol=1e-6 * scale
+            )
+
+    def test_loop_fallback(self):
+        for oper in self.opers:
+            fft_setofvar = FFTSetOfVar(oper)
+            fft_setofvar.is_batched = False
+            fields = np.array([oper.create_arrayX_random() for _ in range(3)])
+            fields_fft = fft_setofvar.fft(fields.copy())
+            np.testing.assert_allclose(
+                fields_fft, oper.fft_setofvar(fields.copy()), atol=1e-14
+            )
+            np.testing.assert_allclose(
+                fft_setofvar.ifft(fields_fft),
+                oper.ifft_setofvar(fields_fft),
+                atol=1e-14,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
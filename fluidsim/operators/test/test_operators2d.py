@@ -24,6 +24,7 @@ def create_oper(type_fft=None, coef_dealiasing=2.0 / 3, **kwargs):
     params._set_attrib("f", 0)
     params._set_attrib("c2", 100)
     params._set_attrib("kd2", 0)
+    params._set_attrib("precision", kwargs.get("precision", "double"))
 
     OperatorsPseudoSpectral2D._complete_params_with_default(params)
 
@@ -106,6 +107,27 @@ class TestOperators(TestCase):
             ff_fft / oper.K2_not0, invlap_fft, self.rtol, self.atol
         )
 
+    def test_phase_shift(self):
+        """Test the phase shift factors"""
+        oper = self.oper
+        field_fft = oper.fft(oper.create_arrayX_random())
+        field = oper.ifft(field_fft)
+
+        # shift of one grid step over the x axis
+        phase_shift = oper.get_phase_shift((0.0, oper.deltax))
+        field_shifted = oper.ifft(field_fft * phase_shift)
+
+        if mpi.nb_proc == 1:
+            np.testing.assert_allclose(
+                field_shifted, np.roll(field, -1, axis=1), self.rtol, self.atol
+            )
+        np.testing.assert_allclose(
+            oper.fft(field_shifted),
+            oper.fft(field) * phase_shift,
+            self.rtol,
+            self.atol,
+        )
+
     def test_compute_increments_dim1(self):
         """Test computing increments of var over the dim 1."""
         oper = self.oper
@@ -120,6 +142,200 @@ class TestOperators(TestCase):
         for irx in [n1, n1 // 2, 0]:
             assert_increments_equal(irx)
 
+    def test_dealiasing_ranges(self):
+        """Test the dealiasing with the ranges of dealiased modes."""
+        from fluidsim.operators.operators2d import compute_ranges_dealiased
+
+        where_dealiased = np.zeros((3, 7), dtype=np.uint8)
+        where_dealiased[0, 4:] = 1
+        where_dealiased[1, :2] = where_dealiased[1, 5:] = 1
+        where_dealiased[2] = 1
+        self.assertEqual(
+            compute_ranges_dealiased(where_dealiased).tolist(),
+            [[0, 4, 7], [1, 0, 2], [1, 5, 7], [2, 0, 7]],
+        )
+
+        oper = self.oper
+        var_fft = oper.fft(oper.create_arrayX_random())
+        sov = np.array([var_fft, 2 * var_fft])
+        expected = var_fft.copy()
+        expected[oper.where_dealiased.astype(bool)] = 0.0
+        oper.dealiasing(var_fft, sov)
+        self.assertTrue(np.array_equal(var_fft, expected))
+        self.assertTrue(np.array_equal(sov[1], 2 * expected))
+
+    def test_coarse(self):
+        """Test the transfers between coarse and local arrays."""
+        oper = self.oper
+        shapeK_loc_coarse = (4, 3)
+        f_fft = oper.fft(oper.create_arrayX_random())
+        fc_fft = oper.coarse_seq_from_fft_loc(f_fft, shapeK_loc_coarse)
+        if mpi.nb_proc == 1:
+            ny = oper.ny_seq
+            for ikyc, iky in ((0, 0), (2, 2), (3, ny - 1)):
+                self.assertTrue(np.array_equal(fc_fft[ikyc], f_fft[iky, :3]))
+
+        f_fft_back = oper.fft_loc_from_coarse_seq(fc_fft, shapeK_loc_coarse)
+        self.assertEqual(f_fft_back.shape, f_fft.shape)
+        fc_fft_back = oper.coarse_seq_from_fft_loc(
+            f_fft_back, shapeK_loc_coarse
+        )
+        if mpi.rank == 0:
+            self.assertTrue(np.array_equal(fc_fft_back, fc_fft))
+        if mpi.nb_proc == 1:
+            self.assertEqual(
+                np.count_nonzero(f_fft_back), np.count_nonzero(fc_fft)
+            )
+
+    def test_put_coarse_array_check(self):
+        """Test that the errors are raised by all processes."""
+        oper = self.oper
+        shapeK_loc_coarse = (4, 3)
+        arr_coarse = np.zeros(shapeK_loc_coarse, dtype=np.complex128)
+        # non-zero Nyquist mode
+        arr_coarse[2, 0] = 1.0
+        arr = oper.create_arrayK(value=0.0)
+        with self.assertRaises(ValueError):
+            oper.put_coarse_array_in_array_fft(
+                arr_coarse, arr, None, shapeK_loc_coarse
+            )
+        with self.assertRaises(ValueError):
+            oper.put_coarse_array_in_array_fft(
+                arr_coarse[np.newaxis], arr, None, shapeK_loc_coarse
+            )
+
+        arr_coarse[2, 0] = 0.0
+        arr_coarse[1, 1] = 1.0
+        arrays = np.array([arr, arr])
+        oper.put_coarse_array_in_array_fft(
+            np.array([arr_coarse, 2 * arr_coarse]),
+            arrays,
+            None,
+            shapeK_loc_coarse,
+        )
+        self.assertTrue(np.array_equal(arrays[1], 2 * arrays[0]))
+        if mpi.nb_proc == 1:
+            self.assertEqual(arrays[0, 1, 1], 1.0)
+
+    def test_setofvar(self):
+        """Test the transforms of sets of variables."""
+        oper = self.oper
+        fields = np.array([oper.create_arrayX_random() for _ in range(3)])
+        fields_fft_ref = [oper.fft(field.copy()) for field in fields]
+        fields_fft = oper.fft_setofvar(fields)
+        self.assertEqual(fields_fft.shape, (3,) + tuple(oper.shapeK_loc))
+        for field_fft, field_fft_ref in zip(fields_fft, fields_fft_ref):
+            self.assertTrue(np.allclose(field_fft, field_fft_ref))
+
+        fields_back = oper.ifft_setofvar(fields_fft)
+        for field_fft, field_back in zip(fields_fft, fields_back):
+            self.assertTrue(np.allclose(field_back, oper.ifft(field_fft)))
+
+        fields_back2 = np.empty_like(fields_back)
+        oper.ifft_setofvar(fields_fft.copy(), fields_back2, destroy=True)
+        self.assertTrue(np.allclose(fields_back2, fields_back))
+
+
+class TestOperatorsSinglePrecision(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper(precision="single")
+
+    def test_dtypes(self):
+        oper = self.oper
+        field = oper.create_arrayX_random()
+        self.assertEqual(field.dtype, np.float32)
+        field_fft = oper.fft(field)
+        self.assertEqual(field_fft.dtype, np.complex64)
+        self.assertEqual(oper.ifft(field_fft).dtype, np.float32)
+
+        field_fft2 = oper.create_arrayK(0.0)
+        self.assertEqual(field_fft2.dtype, np.complex64)
+        oper.fft_as_arg(field, field_fft2)
+        np.testing.assert_allclose(field_fft2, field_fft, 1e-6, 1e-6)
+
+        # reductions in double precision
+        energy = oper.sum_wavenumbers(abs(field_fft) ** 2)
+        self.assertEqual(energy.dtype, np.float64)
+
+    def test_curl(self):
+        oper = self.oper
+        rot_fft = oper.fft2(oper.create_arrayX_random())
+        if mpi.rank == 0:
+            rot_fft[0, 0] = 0.0
+
+        ux_fft, uy_fft = oper.vecfft_from_rotfft(rot_fft)
+        self.assertEqual(ux_fft.dtype, np.complex64)
+        rot2_fft = oper.rotfft_from_vecfft(ux_fft, uy_fft)
+        np.testing.assert_allclose(rot2_fft, rot_fft, 1e-5, 1e-6)
+
+        oper.dealiasing(rot_fft)
+        self.assertEqual(rot_fft.dtype, np.complex64)
+
+    def test_native_single_precision(self):
+        oper = self.oper
+        if not oper._fft_setofvar.is_batched:
+            raise unittest.SkipTest("FFTs in single precision only with pyfftw")
+
+        def fail(*args):
+            raise AssertionError("double precision transform used")
+
+        # the FFTs do not use the double precision FFT class
+        methods = {
+            name: getattr(oper.oper_fft, name)
+            for name in ("fft", "ifft", "fft_as_arg", "ifft_as_arg")
+        }
+        for name in methods:
+            setattr(oper.oper_fft, name, fail)
+        try:
+            field = oper.create_arrayX_random()
+            field_fft = oper.fft(field.copy())
+            field_fft2 = oper.create_arrayK()
+            oper.fft_as_arg(field.copy(), field_fft2)
+            field_back = oper.ifft(field_fft)
+            field_back2 = oper.create_arrayX()
+            oper.ifft_as_arg(field_fft2, field_back2)
+        finally:
+            for name, method in methods.items():
+                setattr(oper.oper_fft, name, method)
+
+        self.assertEqual(field_fft.dtype, np.complex64)
+        self.assertEqual(field_back.dtype, np.float32)
+        np.testing.assert_array_equal(field_fft2, field_fft)
+        np.testing.assert_array_equal(field_back2, field_back)
+
+        oper_double = create_oper()
+        field_fft_double = oper_double.fft(field.astype(np.float64))
+        scale = abs(field_fft_double).max()
+        np.testing.assert_allclose(field_fft, field_fft_double, atol=1e-6 * scale)
+        field_back_double = oper_double.ifft(field_fft_double)
+        scale = abs(field_back_double).max()
+        np.testing.assert_allclose(
+            field_back, field_back_double, atol=1e-6 * scale
+        )
+
+        # operators computed with single precision wavenumbers
+        for name, nb_args in (
+            ("rotfft_from_vecfft", 2),
+            ("divfft_from_vecfft", 2),
+            ("vecfft_from_rotfft", 1),
+            ("vecfft_from_divfft", 1),
+            ("gradfft_from_fft", 1),
+        ):
+            args = [field_fft] * nb_args
+            result = getattr(oper, name)(*args)
+            result_double = getattr(oper_double, name)(
+                *[field_fft_double] * nb_args
+            )
+            if nb_args == 1:
+                result = np.array(result)
+                result_double = np.array(result_double)
+            self.assertEqual(result.dtype, np.complex64)
+            scale = abs(result_double).max()
+            np.testing.assert_allclose(
+                result, result_double, atol=1e-5 * scale
+            )
+
 
 class TestOperatorCoarse(TestCase):
     @classmethod
@@ -159,5 +375,27 @@ class TestOperatorsDealiasing(TestCase):
         self.assertEqual(sum_var, sum_var_dealiased)
 
 
+class TestCompactStorage(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper(nh=16)
+
+    def test_gather_scatter(self):
+        from fluidsim.operators.compact import CompactSpectralStorage
+
+        oper = self.oper
+        storage = CompactSpectralStorage(oper)
+        self.assertEqual(storage.nb_modes, (oper.where_dealiased == 0).sum())
+
+        field_fft = oper.fft(np.random.rand(*oper.shapeX_loc))
+        oper.dealiasing(field_fft)
+        field_compact = storage.gather(field_fft)
+        self.assertEqual(field_compact.shape, (storage.nb_modes,))
+
+        field_fft_back = np.zeros_like(field_fft)
+        storage.scatter(field_compact, field_fft_back)
+        self.assertTrue(np.allclose(field_fft_back, field_fft))
+
+
 if __name__ == "__main__":
     unittest.main()
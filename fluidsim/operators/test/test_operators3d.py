@@ -0,0 +1,290 @@
+import unittest
+
+import numpy as np
+
+import fluidfft
+import fluiddyn.util.mpi as mpi
+from fluiddyn.util.paramcontainer import ParamContainer
+
+from fluidsim.operators.craya_herring import (
+    CrayaHerringStorage,
+    WaveModesStorage,
+)
+from fluidsim.operators.operators3d import (
+    OperatorsPseudoSpectral3D,
+    project_perpk3d_dealiasing_numpy,
+)
+from fluidsim.util.testing import TestCase
+
+
+def create_oper(nx=12, ny=8, nz=6, type_fft=None, precision="double"):
+
+    params = ParamContainer(tag="params")
+    params._set_attrib("ONLY_COARSE_OPER", False)
+    params._set_attrib("precision", precision)
+    OperatorsPseudoSpectral3D._complete_params_with_default(params)
+
+    params.oper.nx = nx
+    params.oper.ny = ny
+    params.oper.nz = nz
+    params.oper.Lx = params.oper.Ly = params.oper.Lz = 2 * np.pi
+    if type_fft is not None:
+        params.oper.type_fft = type_fft
+
+    return OperatorsPseudoSpectral3D(params=params)
+
+
+class TestOperatorsCoarse(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper()
+        cls.shapeK_loc_coarse = (4, 4, 3)
+
+    def test_coarse_seq_from_fft_loc(self):
+        oper = self.oper
+        f_fft = oper.create_arrayK_random()
+        fc_fft = oper.coarse_seq_from_fft_loc(f_fft, self.shapeK_loc_coarse)
+        if mpi.rank != 0:
+            self.assertIsNone(fc_fft)
+            return
+
+        self.assertEqual(fc_fft.shape, self.shapeK_loc_coarse)
+        if mpi.nb_proc == 1:
+            nz = oper.nz_seq
+            # indices of the coarse modes in the fine array
+            for ikzc, ikz in ((0, 0), (2, 2), (3, nz - 1)):
+                self.assertTrue(
+                    np.array_equal(fc_fft[ikzc, 0, :], f_fft[ikz, 0, :3])
+                )
+            self.assertEqual(fc_fft[1, 3, 2], f_fft[1, oper.ny_seq - 1, 2])
+
+    def test_put_coarse_array_in_array_fft(self):
+        oper = self.oper
+        shapeK_loc_coarse = self.shapeK_loc_coarse
+        arr = oper.create_arrayK(value=0.0)
+        arr_full = np.array([arr, arr])
+        if mpi.rank == 0:
+            arr_coarse = np.random.rand(*shapeK_loc_coarse) + 1j
+            arrs_coarse = np.array([arr_coarse, 2 * arr_coarse])
+        else:
+            arr_coarse = arrs_coarse = None
+
+        oper.put_coarse_array_in_array_fft(
+            arr_coarse, arr, None, shapeK_loc_coarse
+        )
+        oper.put_coarse_array_in_array_fft(
+            arrs_coarse, arr_full, None, shapeK_loc_coarse
+        )
+        self.assertEqual(np.count_nonzero(arr), np.count_nonzero(arr_full[0]))
+
+        arr_back = oper.coarse_seq_from_fft_loc(arr, shapeK_loc_coarse)
+        arr_back1 = oper.coarse_seq_from_fft_loc(arr_full[1], shapeK_loc_coarse)
+        if mpi.rank == 0:
+            self.assertTrue(np.array_equal(arr_back, arr_coarse))
+            self.assertTrue(np.array_equal(arr_back1, 2 * arr_coarse))
+
+
+def create_arrayK_from_wavenumbers(oper):
+    """Create a spectral array whose values depend only on the wavenumbers."""
+    return (
+        oper.Kx
+        + 10 * oper.Ky
+        + 100 * oper.Kz
+        + 1j * (oper.Kx * oper.Ky - oper.Kz)
+    ).astype(np.complex128)
+
+
+@unittest.skipIf(
+    mpi.nb_proc == 1 or not fluidfft.get_methods(ndim=3, sequential=False),
+    "Needs MPI and a MPI FFT class",
+)
+class TestOperatorsCoarseMPI(TestCase):
+    """Compare the coarse transfers of a MPI operator with a sequential one."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper()
+        cls.oper_seq = create_oper(type_fft="fft3d.with_pyfftw")
+        cls.shapeK_loc_coarse = (4, 4, 3)
+
+    def test_round_trip(self):
+        oper, oper_seq = self.oper, self.oper_seq
+        self.assertFalse(oper.is_sequential)
+        shapeK_loc_coarse = self.shapeK_loc_coarse
+
+        arr_coarse = oper.coarse_seq_from_fft_loc(
+            create_arrayK_from_wavenumbers(oper), shapeK_loc_coarse
+        )
+        arr_coarse_seq = oper_seq.coarse_seq_from_fft_loc(
+            create_arrayK_from_wavenumbers(oper_seq), shapeK_loc_coarse
+        )
+        if mpi.rank == 0:
+            self.assertTrue(np.array_equal(arr_coarse, arr_coarse_seq))
+
+        arr = oper.create_arrayK(value=0.0)
+        oper.put_coarse_array_in_array_fft(
+            arr_coarse, arr, None, shapeK_loc_coarse
+        )
+        arr_seq = oper_seq.create_arrayK(value=0.0)
+        oper_seq.put_coarse_array_in_array_fft(
+            arr_coarse_seq, arr_seq, None, shapeK_loc_coarse
+        )
+        # local part of the sequential array (identified by the wavenumbers)
+        ikz = np.round(oper.Kz / oper.deltakz).astype(int) % oper.nz_seq
+        iky = np.round(oper.Ky / oper.deltaky).astype(int) % oper.ny_seq
+        ikx = np.round(oper.Kx / oper.deltakx).astype(int)
+        self.assertTrue(np.array_equal(arr, arr_seq[ikz, iky, ikx]))
+        nb_nonzero = mpi.comm.allreduce(np.count_nonzero(arr))
+        self.assertEqual(nb_nonzero, np.count_nonzero(arr_seq))
+
+
+class TestOperators(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper()
+
+    def test_setofvar(self):
+        oper = self.oper
+        fields = np.array([oper.create_arrayX_random() for _ in range(2)])
+        fields_fft_ref = [oper.fft(field.copy()) for field in fields]
+        fields_fft = oper.fft_setofvar(fields)
+        for field_fft, field_fft_ref in zip(fields_fft, fields_fft_ref):
+            self.assertTrue(np.allclose(field_fft, field_fft_ref))
+
+        fields_back = np.empty_like(fields)
+        oper.ifft_setofvar(fields_fft.copy(), fields_back, destroy=True)
+        for field_fft, field_back in zip(fields_fft, fields_back):
+            self.assertTrue(np.allclose(field_back, oper.ifft(field_fft)))
+
+    def test_project_perpk3d_dealiasing(self):
+        oper = self.oper
+        vec_fft = np.array([oper.create_arrayK_random() for _ in range(3)])
+        vec_fft_ref = vec_fft.copy()
+        oper.project_perpk3d(*vec_fft_ref)
+        oper.dealiasing(*vec_fft_ref)
+
+        vec_fft_numpy = vec_fft.copy()
+        oper.project_perpk3d_dealiasing(*vec_fft)
+        self.assertTrue(np.allclose(vec_fft, vec_fft_ref))
+
+        project_perpk3d_dealiasing_numpy(
+            *vec_fft_numpy,
+            oper.Kx,
+            oper.Ky,
+            oper.Kz,
+            oper.inv_K_square_nozero,
+            oper._ranges_dealiased,
+        )
+        self.assertTrue(np.allclose(vec_fft_numpy, vec_fft_ref))
+
+    def test_craya_herring(self):
+        oper = self.oper
+        keys = ["vx_fft", "vy_fft", "vz_fft", "b_fft"]
+        storage = CrayaHerringStorage(oper, keys)
+        self.assertEqual(storage.keys_state_spect, ["vt_fft", "vp_fft", "b_fft"])
+
+        arr = np.array([oper.create_arrayK_random() for _ in keys])
+        arr_ch = storage.gather(arr)
+        self.assertEqual(arr_ch.shape, (3,) + tuple(oper.shapeK_loc))
+
+        # the gathered velocity is perpendicular to the wavevector
+        arr_back = np.empty_like(arr)
+        storage.scatter(arr_ch, arr_back)
+        oper.project_perpk3d(*arr[:3])
+        if mpi.rank == 0:
+            # the mean vertical velocity is not stored
+            arr[2, 0, 0, 0] = 0.0
+        self.assertTrue(np.allclose(arr_back, arr))
+
+        # the frequencies are the same for all components
+        freq = oper.K2
+        self.assertIs(storage.gather(freq), freq)
+
+        with self.assertRaises(ValueError):
+            CrayaHerringStorage(oper, ["b_fft"] + keys[:3])
+
+    def test_wave_modes(self):
+        oper = self.oper
+        f, N = 2.0, 3.0
+        keys = ["vx_fft", "vy_fft", "vz_fft", "b_fft"]
+        storage = WaveModesStorage(oper, keys, f=f, N=N)
+        self.assertEqual(storage.keys_state_spect, ["q_fft", "ap_fft", "am_fft"])
+
+        arr = np.array([oper.create_arrayK_random() for _ in keys])
+        oper.project_perpk3d(*arr[:3])
+        if mpi.rank == 0:
+            arr[2, 0, 0, 0] = 0.0
+        arr_waves = storage.gather(arr)
+        arr_back = np.empty_like(arr)
+        storage.scatter(arr_waves, arr_back)
+        self.assertTrue(np.allclose(arr_back, arr))
+
+        # linear terms (buoyancy and Coriolis force)
+        vx_fft, vy_fft, vz_fft, b_fft = arr
+        lin = np.array([f * vy_fft, -f * vx_fft, b_fft, -(N ** 2) * vz_fft])
+        oper.project_perpk3d(*lin[:3])
+        if mpi.rank == 0:
+            # the mean vertical velocity is not stored
+            lin[2, 0, 0, 0] = 0.0
+        lin_waves = storage.gather(lin)
+        for index, key in enumerate(storage.keys_state_spect):
+            freq = storage.compute_freq_complex(key)
+            self.assertTrue(
+                np.allclose(lin_waves[index], -freq * arr_waves[index])
+            )
+
+        storage = WaveModesStorage(oper, keys[:3], f=f)
+        self.assertEqual(storage.keys_state_spect, ["ap_fft", "am_fft"])
+        with self.assertRaises(ValueError):
+            WaveModesStorage(oper, keys, f=f)
+
+
+class TestOperatorsSinglePrecision(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.oper = create_oper(precision="single")
+        cls.oper_double = create_oper()
+
+    def assert_close(self, result, result_double):
+        self.assertEqual(result.dtype, np.complex64)
+        scale = abs(result_double).max()
+        np.testing.assert_allclose(result, result_double, atol=1e-5 * scale)
+
+    def test_operators(self):
+        oper = self.oper
+        oper_double = self.oper_double
+        vec_fft = [oper.create_arrayK_random() for _ in range(3)]
+        vec_fft_double = [v_fft.astype(np.complex128) for v_fft in vec_fft]
+
+        field_fft = oper.fft(oper.create_arrayX_random())
+        self.assertEqual(field_fft.dtype, np.complex64)
+
+        for name in ("divfft_from_vecfft", "rotfft_from_vecfft"):
+            self.assert_close(
+                np.array(getattr(oper, name)(*vec_fft)),
+                np.array(getattr(oper_double, name)(*vec_fft_double)),
+            )
+
+        self.assert_close(
+            oper.rotzfft_from_vxvyfft(*vec_fft[:2]),
+            oper_double.rotzfft_from_vxvyfft(*vec_fft_double[:2]),
+        )
+
+        rot_fft = [oper.create_arrayK() for _ in range(3)]
+        rot_fft_double = [oper_double.create_arrayK() for _ in range(3)]
+        oper.rotfft_from_vecfft_outin(*vec_fft, *rot_fft)
+        oper_double.rotfft_from_vecfft_outin(*vec_fft_double, *rot_fft_double)
+        self.assert_close(np.array(rot_fft), np.array(rot_fft_double))
+
+        for name in ("project_perpk3d", "project_perpk3d_dealiasing"):
+            vec_fft_projected = [v_fft.copy() for v_fft in vec_fft]
+            vec_fft_projected_double = [v_fft.copy() for v_fft in vec_fft_double]
+            getattr(oper, name)(*vec_fft_projected)
+            getattr(oper_double, name)(*vec_fft_projected_double)
+            self.assert_close(
+                np.array(vec_fft_projected), np.array(vec_fft_projected_double)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import warnings
 
+import numpy as np
+
 try:
     import scipy.sparse
 
@@ -104,6 +106,25 @@ class TestInitAD1D(TestSimul):
     def test_init(self):
         """Only test the initialization"""
 
+    @unittest.skipIf(
+        mpi.nb_proc > 1, "MPI not implemented, for eg. sim.oper.gather_Xspace"
+    )
+    def test_factorization(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        dt = time_stepping.deltat
+        state_phys = sim.state.state_phys
+        rhs = time_stepping.right_hand_side(
+            state_phys, sim.tendencies_nonlin(), dt
+        )
+        matrix = scipy.sparse.identity(state_phys.size) - dt / 2 * time_stepping.L
+        state_ref = time_stepping.invert_to_get_solution(matrix.tocsc(), rhs)
+
+        time_stepping._time_step_RK2()
+        np.testing.assert_allclose(sim.state.state_phys, state_ref)
+        time_stepping._time_step_RK2()
+        self.assertEqual(time_stepping.nb_factorizations, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
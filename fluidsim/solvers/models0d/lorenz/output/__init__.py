@@ -34,6 +34,14 @@ class Output(OutputBase):
         classes.PrintStdOut.module_name = package + ".print_stdout"
         classes.PrintStdOut.class_name = "PrintStdOutLorenz"
 
+        classes._set_child(
+            "EnsembleStats",
+            attribs={
+                "module_name": "fluidsim.base.output.ensemble_stats",
+                "class_name": "EnsembleStats",
+            },
+        )
+
     @staticmethod
     def _complete_params_with_default(params, info_solver):
         """Complete the `params` container (static method)."""
@@ -20,7 +20,8 @@ class PrintStdOutLorenz(PrintStdOutBase):
     """Simple text output.
 
     Used to print in both the stdout and the stdout.txt file, and also
-    to print simple info on the current state of the simulation.
+    to print simple info on the current state of the simulation. For an
+    ensemble of simulations, the means over the members are printed.
 
     """
 
@@ -37,12 +38,13 @@ class PrintStdOutLorenz(PrintStdOutBase):
         to_print = super()._make_str_info()
 
         if mpi.rank == 0:
+            state_phys = self.sim.state.state_phys
             to_print += (
                 (" " * 14) + "X = {:9.3e} ; Y = {:+9.3e} ; Z = {:+9.3e}\n" + "\n"
             ).format(
-                float(self.sim.state.state_phys.get_var("X")),
-                float(self.sim.state.state_phys.get_var("Y")),
-                float(self.sim.state.state_phys.get_var("Z")),
+                np.mean(state_phys.get_var("X")),
+                np.mean(state_phys.get_var("Y")),
+                np.mean(state_phys.get_var("Z")),
             )
 
             duration_left = self._evaluate_duration_left()
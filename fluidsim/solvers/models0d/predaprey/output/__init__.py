@@ -16,7 +16,7 @@ and the main output class for this solver:
 
 """
 
-from math import log
+import numpy as np
 
 from fluidsim.base.output import OutputBase
 
@@ -36,6 +36,14 @@ class Output(OutputBase):
         classes.PrintStdOut.module_name = package + ".print_stdout"
         classes.PrintStdOut.class_name = "PrintStdOutPredaPrey"
 
+        classes._set_child(
+            "EnsembleStats",
+            attribs={
+                "module_name": "fluidsim.base.output.ensemble_stats",
+                "class_name": "EnsembleStats",
+            },
+        )
+
     @staticmethod
     def _complete_params_with_default(params, info_solver):
         """Complete the `params` container (static method)."""
@@ -44,9 +52,9 @@ class Output(OutputBase):
         params.output.phys_fields.field_to_plot = "X"
 
     def compute_potential(self):
-        """Compute energy(k)"""
+        """Compute the potential (one value per member for an ensemble)."""
 
         p = self.sim.params
         X = self.sim.state.state_phys.get_var("X")
         Y = self.sim.state.state_phys.get_var("Y")
-        return p.C * log(X) - p.D * X + p.A * log(Y) - p.B * Y
+        return p.C * np.log(X) - p.D * X + p.A * np.log(Y) - p.B * Y
@@ -18,13 +18,14 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
     """Simple text output.
 
     Used to print in both the stdout and the stdout.txt file, and also
-    to print simple info on the current state of the simulation.
+    to print simple info on the current state of the simulation. For an
+    ensemble of simulations, the means over the members are printed.
 
     """
 
     def complete_init_with_state(self):
 
-        self.potential0 = self.output.compute_potential()
+        self.potential0 = np.mean(self.output.compute_potential())
 
         if self.period_print == 0:
             return
@@ -37,8 +38,9 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
     def _make_str_info(self):
         to_print = super()._make_str_info()
 
-        potential = self.output.compute_potential()
+        potential = np.mean(self.output.compute_potential())
         if mpi.rank == 0:
+            state_phys = self.sim.state.state_phys
             to_print += (
                 (" " * 14)
                 + "X = {:9.3e} ; Y = {:+9.3e}\n"
@@ -46,8 +48,8 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
                 + "potential = {:9.3e} ; Delta pot = {:+9.3e}"
                 "\n"
             ).format(
-                float(self.sim.state.state_phys.get_var("X")),
-                float(self.sim.state.state_phys.get_var("Y")),
+                np.mean(state_phys.get_var("X")),
+                np.mean(state_phys.get_var("Y")),
                 potential,
                 potential - self.potential_tmp,
             )
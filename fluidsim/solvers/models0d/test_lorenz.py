@@ -1,6 +1,10 @@
 import unittest
+from copy import deepcopy
+
+import numpy as np
 
 import fluiddyn.util.mpi as mpi
+from fluiddyn.io import stdout_redirected
 
 from .lorenz.solver import Simul
 
@@ -39,5 +43,59 @@ class TestLorenz(TestSimul):
         sim.output.print_stdout.plot_XY_vs_time()
 
 
+@unittest.skipIf(mpi.nb_proc > 1, "Operators0D not implemented with MPI")
+class TestLorenzEnsemble(TestSimul):
+    Simul = Simul
+
+    @classmethod
+    def init_params(cls):
+        params = cls.params = cls.Simul.create_default_params()
+        params.short_name_type_run = "test_ensemble"
+        params.output.sub_directory = "unittests"
+
+        params.oper.nb_members = 1000
+        params.time_stepping.deltat0 = 0.02
+        params.time_stepping.t_end = 0.1
+        params.output.periods_print.print_stdout = 0.05
+        params.output.periods_save.ensemble_stats = 0.04
+
+    def test_ensemble(self):
+        sim = self.sim
+        nb_members = self.params.oper.nb_members
+        state_phys = sim.state.state_phys
+        self.assertEqual(state_phys.shape, (3, nb_members))
+
+        X0 = sim.Xs0 + np.linspace(-1, 1, nb_members)
+        state_phys.set_var("X", X0)
+        state_phys.set_var("Y", sim.Ys0)
+        state_phys.set_var("Z", sim.Zs0)
+        sim.time_stepping.start()
+
+        # compare one member with a single simulation
+        params = deepcopy(self.params)
+        params.oper.nb_members = 1
+        params.output.HAS_TO_SAVE = False
+        with stdout_redirected():
+            sim_single = Simul(params)
+        sim_single.state.state_phys.set_var("X", X0[10])
+        sim_single.state.state_phys.set_var("Y", sim.Ys0)
+        sim_single.state.state_phys.set_var("Z", sim.Zs0)
+        with stdout_redirected():
+            sim_single.time_stepping.start()
+        np.testing.assert_allclose(
+            sim.state.state_phys[:, 10], sim_single.state.state_phys
+        )
+
+        X = sim.state.state_phys.get_var("X")
+        dict_results = sim.output.ensemble_stats.compute()
+        self.assertAlmostEqual(dict_results["mean_X"], np.mean(X))
+        self.assertAlmostEqual(dict_results["var_X"], np.var(X))
+
+        dict_results = sim.output.ensemble_stats.load()
+        self.assertEqual(len(dict_results["times"]), 3)
+        self.assertEqual(dict_results["hist_X"][-1].sum(), nb_members)
+        sim.output.ensemble_stats.plot()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,10 @@
 import unittest
+from copy import deepcopy
+
+import numpy as np
 
 import fluiddyn.util.mpi as mpi
+from fluiddyn.io import stdout_redirected
 
 from .predaprey.solver import Simul
 
@@ -34,5 +38,62 @@ class TestLorenz(TestSimul):
         sim.output.print_stdout.plot_potential()
 
 
+@unittest.skipIf(mpi.nb_proc > 1, "Operators0D not implemented with MPI")
+class TestPredaPreyEnsemble(TestSimul):
+    Simul = Simul
+
+    @classmethod
+    def init_params(cls):
+        params = cls.params = cls.Simul.create_default_params()
+        params.short_name_type_run = "test_ensemble"
+        params.output.sub_directory = "unittests"
+
+        params.oper.nb_members = 100
+        params.time_stepping.deltat0 = 0.02
+        params.time_stepping.t_end = 0.1
+        params.output.periods_print.print_stdout = 0.05
+        params.output.periods_save.ensemble_stats = 0.04
+
+    def test_ensemble(self):
+        sim = self.sim
+        nb_members = self.params.oper.nb_members
+        state_phys = sim.state.state_phys
+        self.assertEqual(state_phys.shape, (2, nb_members))
+
+        X0 = sim.Xs + np.linspace(0, 2, nb_members)
+        state_phys.set_var("X", X0)
+        state_phys.set_var("Y", sim.Ys + 1.0)
+        potential0 = sim.output.compute_potential()
+        self.assertEqual(potential0.shape, (nb_members,))
+        sim.time_stepping.start()
+
+        # compare one member with a single simulation
+        params = deepcopy(self.params)
+        params.oper.nb_members = 1
+        params.output.HAS_TO_SAVE = False
+        with stdout_redirected():
+            sim_single = Simul(params)
+        sim_single.state.state_phys.set_var("X", X0[10])
+        sim_single.state.state_phys.set_var("Y", sim.Ys + 1.0)
+        with stdout_redirected():
+            sim_single.time_stepping.start()
+        np.testing.assert_allclose(
+            sim.state.state_phys[:, 10], sim_single.state.state_phys
+        )
+
+        # the potential is an invariant of the Lotka-Volterra equations
+        potential = sim.output.compute_potential()
+        self.assertEqual(potential.shape, (nb_members,))
+        np.testing.assert_allclose(potential, potential0, rtol=1e-6)
+        np.testing.assert_allclose(
+            potential[10], sim_single.output.compute_potential()
+        )
+
+        dict_results = sim.output.ensemble_stats.load()
+        self.assertEqual(len(dict_results["times"]), 3)
+        self.assertEqual(dict_results["hist_Y"][-1].sum(), nb_members)
+        sim.output.ensemble_stats.plot()
+
+
 if __name__ == "__main__":
     unittest.main()
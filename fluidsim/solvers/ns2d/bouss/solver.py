@@ -63,6 +63,7 @@ class Simul(SimulNS2D):
     """
 
     InfoSolver = InfoSolverNS2DBouss
+    _key_scalar_advected = "b"
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -114,6 +115,9 @@ class Simul(SimulNS2D):
         \mathbf{\nabla}\wedge b\mathbf{e_z} = - \mathbf{u}\cdot \mathbf{\nabla}
         \zeta + \p_x b` and :math:`\hat N(b) = - \mathbf{u}\cdot
         \mathbf{\nabla} b`.  """
+        if self._uses_divergence_form():
+            return self.tendencies_nonlin_divergence(state_spect, old)
+
         oper = self.oper
         fft_as_arg = oper.fft_as_arg
         ifft_as_arg = oper.ifft_as_arg
@@ -182,6 +186,19 @@ class Simul(SimulNS2D):
 
         return tendencies_fft
 
+    def _add_linear_tendencies_divergence(
+        self, tendencies_fft, state_spect, uy_fft=None
+    ):
+        r"""Add the linear term :math:`\p_x b`.
+
+        Used by
+        :func:`fluidsim.solvers.ns2d.solver.Simul.tendencies_nonlin_divergence`
+        (if `params.nonlinear_form == "divergence"`).
+
+        """
+        b_fft = state_spect.get_var("b_fft")
+        tendencies_fft.get_var("rot_fft")[:] += 1j * self.oper.KX * b_fft
+
 
 # def check_energy_conservation(self, rot_fft, b_fft, N_rot, N_b):
 #     """ Check energy conservation for the inviscid case. """
@@ -24,6 +24,8 @@ class StateNS2DBouss(StateNS2D):
 
     """
 
+    _nb_fields_tmp = 6
+
     @staticmethod
     def _complete_info_solver(info_solver):
         """Update `info_solver` container with the stratification terms."""
@@ -38,13 +40,6 @@ class StateNS2DBouss(StateNS2D):
             }
         )
 
-    def __init__(self, sim, oper=None):
-
-        super().__init__(sim, oper)
-
-        self.field_tmp4 = np.empty_like(self.state_phys[0])
-        self.field_tmp5 = np.empty_like(self.state_phys[0])
-
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         """Compute and return a variable"""
         it = self.sim.time_stepping.it
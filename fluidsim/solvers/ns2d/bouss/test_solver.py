@@ -14,6 +14,23 @@ class TestSimulBase(Base):
     Simul = Simul
 
 
+class TestTendencyDivergence(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+
+    def test_tendency_divergence_form(self):
+        sim = self.sim
+        # buoyancy different from 0 (init_fields = noise only gives rot)
+        b_fft = sim.oper.fft(sim.oper.create_arrayX_random())
+        sim.oper.dealiasing(b_fft)
+        sim.state.state_spect.set_var("b_fft", b_fft)
+        sim.state.statephys_from_statespect()
+        px_b_fft = 1j * sim.oper.KX * b_fft
+        self.check_tendency_divergence_form([px_b_fft, 0 * b_fft])
+
+
 class TestForcingOutput(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -100,14 +100,39 @@ class Simul(SimulBasePseudoSpectral):
     """
 
     InfoSolver = InfoSolverNS2D
+    # advected scalar (advection computed by tendencies_nonlin_divergence)
+    _key_scalar_advected = None
 
     @staticmethod
     def _complete_params_with_default(params):
         """Complete the `params` container (static method)."""
         SimulBasePseudoSpectral._complete_params_with_default(params)
-        attribs = {"beta": 0.0}
+        attribs = {"beta": 0.0, "nonlinear_form": "advective"}
         params._set_attribs(attribs)
 
+        params._set_doc(
+            params._doc
+            + """
+nonlinear_form: str (default "advective")
+
+    Formulation of the nonlinear terms: "advective" (advection computed
+    with the gradients of the advected fields) or "divergence" (fluxes in
+    divergence form, which needs fewer Fourier transforms, see the method
+    `tendencies_nonlin_divergence`).
+
+"""
+        )
+
+    def _uses_divergence_form(self):
+        """Check the parameter `nonlinear_form`."""
+        nonlinear_form = getattr(self.params, "nonlinear_form", "advective")
+        if nonlinear_form not in ("advective", "divergence"):
+            raise ValueError(
+                'params.nonlinear_form should be "advective" or "divergence" '
+                f"(not {nonlinear_form!r})"
+            )
+        return nonlinear_form == "divergence"
+
     def tendencies_nonlin(self, state_spect=None, old=None):
         r"""Compute the nonlinear tendencies.
 
@@ -144,31 +169,39 @@ class Simul(SimulBasePseudoSpectral):
         :math:`N(\zeta) = - \mathbf{u}\cdot \mathbf{\nabla} \zeta`.
 
         """
+        if self._uses_divergence_form():
+            return self.tendencies_nonlin_divergence(state_spect, old)
+
         # the operator and the fast Fourier transform
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
+        fields_tmp = self.state.fields_tmp
+        fields_spect_tmp = self.state.fields_spect_tmp
 
         # get or compute rot_fft, ux and uy
         if state_spect is None:
             rot_fft = self.state.state_spect.get_var("rot_fft")
             ux = self.state.state_phys.get_var("ux")
             uy = self.state.state_phys.get_var("uy")
+            istart = 2
         else:
             rot_fft = state_spect.get_var("rot_fft")
             ux_fft, uy_fft = oper.vecfft_from_rotfft(rot_fft)
+            fields_spect_tmp[0], fields_spect_tmp[1] = ux_fft, uy_fft
             ux = self.state.field_tmp0
             uy = self.state.field_tmp1
-            ifft_as_arg(ux_fft, ux)
-            ifft_as_arg(uy_fft, uy)
+            istart = 0
 
         # "px" like $\partial_x$
         px_rot_fft, py_rot_fft = oper.gradfft_from_fft(rot_fft)
+        fields_spect_tmp[2], fields_spect_tmp[3] = px_rot_fft, py_rot_fft
 
         px_rot = self.state.field_tmp2
         py_rot = self.state.field_tmp3
 
-        ifft_as_arg(px_rot_fft, px_rot)
-        ifft_as_arg(py_rot_fft, py_rot)
+        # (velocity and) gradient of the vorticity transformed together
+        oper.ifft_setofvar(
+            fields_spect_tmp[istart:], fields_tmp[istart:], destroy=True
+        )
 
         Frot = compute_Frot(ux, uy, px_rot, py_rot, self.params.beta)
 
@@ -193,6 +226,112 @@ class Simul(SimulBasePseudoSpectral):
 
         return tendencies_fft
 
+    def tendencies_nonlin_divergence(self, state_spect=None, old=None):
+        r"""Compute the nonlinear tendencies with fluxes in divergence form.
+
+        Used if `params.nonlinear_form == "divergence"` (same parameters and
+        results as :func:`tendencies_nonlin`).
+
+        Notes
+        -----
+
+        .. |p| mathmacro:: \partial
+
+        Since the velocity :math:`\mathbf{u} = (u_x, u_y)` is divergence
+        free, the advection term can be written as (Basdevant, 1983)
+
+        .. math:: \mathbf{u}\cdot \mathbf{\nabla} \zeta = (\p_x^2 - \p_y^2)
+           (u_x u_y) + \p_x \p_y (u_y^2 - u_x^2),
+
+        and the advection of a scalar (for example the buoyancy of the
+        solvers ns2d.strat and ns2d.bouss, see the class attribute
+        `_key_scalar_advected`) as :math:`\mathbf{u}\cdot \mathbf{\nabla} b
+        = \mathbf{\nabla}\cdot (\mathbf{u} b)`.
+
+        Only the velocity (and the scalar) are computed in physical space
+        (they are taken from `self.state.state_phys` if `state_spect` is
+        None) and the products are transformed together. For ns2d, this
+        gives two inverse and two forward transforms, instead of four inverse
+        and one forward transforms. The linear terms are added by the method
+        :func:`_add_linear_tendencies_divergence`.
+
+        """
+        oper = self.oper
+        fields_tmp = self.state.fields_tmp
+        fields_spect_tmp = self.state.fields_spect_tmp
+        key_scalar = self._key_scalar_advected
+        nb_fields = 2 if key_scalar is None else 3
+
+        if state_spect is None:
+            state_spect = self.state.state_spect
+            fields = [
+                self.state.state_phys.get_var(key)
+                for key in ("ux", "uy", key_scalar)[:nb_fields]
+            ]
+            uy_fft = None
+        else:
+            rot_fft = state_spect.get_var("rot_fft")
+            ux_fft, uy_fft = oper.vecfft_from_rotfft(rot_fft)
+            fields_spect_tmp[0], fields_spect_tmp[1] = ux_fft, uy_fft
+            if key_scalar is not None:
+                fields_spect_tmp[2] = state_spect.get_var(key_scalar + "_fft")
+            fields = oper.ifft_setofvar(
+                fields_spect_tmp[:nb_fields], fields_tmp[:nb_fields], destroy=True
+            )
+        ux, uy = fields[:2]
+
+        # products transformed together: uy^2 - ux^2, (ux s, uy s,) ux uy
+        # (the scalar s stored in fields_tmp[2] is not used after its products)
+        nb_products = 2 * nb_fields - 2
+        if key_scalar is not None:
+            np.multiply(ux, fields[2], out=fields_tmp[3])
+            np.multiply(uy, fields[2], out=fields_tmp[4])
+        np.multiply(ux, uy, out=fields_tmp[nb_products + 1])
+        np.subtract(uy * uy, ux * ux, out=fields_tmp[2])
+        products_fft = oper.fft_setofvar(
+            fields_tmp[2 : 2 + nb_products],
+            fields_spect_tmp[2 : 2 + nb_products],
+        )
+        uy2_ux2_fft = products_fft[0]
+        uxuy_fft = products_fft[-1]
+
+        if old is None:
+            tendencies_fft = SetOfVariables(like=self.state.state_spect)
+        else:
+            tendencies_fft = old
+
+        Frot_fft = tendencies_fft.get_var("rot_fft")
+        Frot_fft[:] = oper.KX2_minus_KY2 * uxuy_fft + oper.KXKY * uy2_ux2_fft
+        if key_scalar is not None:
+            Fs_fft = tendencies_fft.get_var(key_scalar + "_fft")
+            Fs_fft[:] = -oper.divfft_from_vecfft(products_fft[1], products_fft[2])
+
+        self._add_linear_tendencies_divergence(
+            tendencies_fft, state_spect, uy_fft
+        )
+
+        oper.dealiasing(tendencies_fft)
+
+        if self.params.forcing.enable:
+            tendencies_fft += self.forcing.get_forcing()
+
+        return tendencies_fft
+
+    def _add_linear_tendencies_divergence(
+        self, tendencies_fft, state_spect, uy_fft=None
+    ):
+        """Add the linear terms (used by `tendencies_nonlin_divergence`).
+
+        `uy_fft` is None when it has not been computed from `state_spect`.
+
+        """
+        if self.params.beta == 0:
+            return
+        if uy_fft is None:
+            rot_fft = state_spect.get_var("rot_fft")
+            uy_fft = self.oper.vecfft_from_rotfft(rot_fft)[1]
+        tendencies_fft.get_var("rot_fft")[:] -= self.params.beta * uy_fft
+
 
 if "sphinx" in sys.modules:
     params = Simul.create_default_params()
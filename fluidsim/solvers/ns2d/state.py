@@ -24,6 +24,8 @@ class StateNS2D(StatePseudoSpectral):
 
     """
 
+    _nb_fields_tmp = 4
+
     @staticmethod
     def _complete_info_solver(info_solver):
         """Complete the `info_solver` container (static method)."""
@@ -41,10 +43,18 @@ class StateNS2D(StatePseudoSpectral):
 
         super().__init__(sim, oper)
 
-        self.field_tmp0 = np.empty_like(self.state_phys[0])
-        self.field_tmp1 = np.empty_like(self.state_phys[0])
-        self.field_tmp2 = np.empty_like(self.state_phys[0])
-        self.field_tmp3 = np.empty_like(self.state_phys[0])
+        # buffers for the transforms of the tendencies (sets of variables
+        # transformed together)
+        self.fields_tmp = np.empty(
+            (self._nb_fields_tmp,) + self.state_phys.shape[1:],
+            self.state_phys.dtype,
+        )
+        self.fields_spect_tmp = np.empty(
+            (self._nb_fields_tmp,) + self.state_spect.shape[1:],
+            self.state_spect.dtype,
+        )
+        for index, field_tmp in enumerate(self.fields_tmp):
+            setattr(self, f"field_tmp{index}", field_tmp)
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         """Compute and return a variable"""
@@ -63,6 +63,7 @@ class Simul(SimulNS2D):
     """
 
     InfoSolver = InfoSolverNS2DStrat
+    _key_scalar_advected = "b"
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -114,6 +115,9 @@ class Simul(SimulNS2D):
         \mathbf{\nabla}\wedge b\mathbf{e_z} = - \mathbf{u}\cdot \mathbf{\nabla}
         \zeta + \p_x b` and :math:`N(b) = - \mathbf{u}\cdot \mathbf{\nabla} b +
         N^2u_y`.  """
+        if self._uses_divergence_form():
+            return self.tendencies_nonlin_divergence(state_spect, old)
+
         oper = self.oper
         fft_as_arg = oper.fft_as_arg
         ifft_as_arg = oper.ifft_as_arg
@@ -184,6 +188,24 @@ class Simul(SimulNS2D):
 
         return tendencies_fft
 
+    def _add_linear_tendencies_divergence(
+        self, tendencies_fft, state_spect, uy_fft=None
+    ):
+        r"""Add the linear terms :math:`\p_x b` and :math:`N^2 u_y`.
+
+        Used by
+        :func:`fluidsim.solvers.ns2d.solver.Simul.tendencies_nonlin_divergence`
+        (if `params.nonlinear_form == "divergence"`).
+
+        """
+        oper = self.oper
+        rot_fft = state_spect.get_var("rot_fft")
+        b_fft = state_spect.get_var("b_fft")
+        if uy_fft is None:
+            uy_fft = oper.vecfft_from_rotfft(rot_fft)[1]
+        tendencies_fft.get_var("rot_fft")[:] += 1j * oper.KX * b_fft
+        tendencies_fft.get_var("b_fft")[:] -= self.params.N ** 2 * uy_fft
+
     def check_energy_conservation(self, rot_fft, b_fft, f_rot_fft, f_b_fft):
         """ Check energy conservation for the inviscid case. """
         oper = self.oper
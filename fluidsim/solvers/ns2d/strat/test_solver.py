@@ -63,6 +63,26 @@ class TestSolverNS2DTendency(TestSimulBase):
         assert sim.check_energy_conservation(rot_fft, b_fft, Frot_fft, Fb_fft)
 
 
+class TestTendencyDivergence(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+        params.N = 2.0
+
+    def test_tendency_divergence_form(self):
+        sim = self.sim
+        # buoyancy different from 0 (init_fields = noise only gives rot)
+        b_fft = sim.oper.fft(sim.oper.create_arrayX_random())
+        sim.oper.dealiasing(b_fft)
+        sim.state.state_spect.set_var("b_fft", b_fft)
+        sim.state.statephys_from_statespect()
+        rot_fft = sim.state.get_var("rot_fft")
+        uy_fft = sim.oper.vecfft_from_rotfft(rot_fft)[1]
+        Fb_linear_fft = -sim.params.N ** 2 * uy_fft
+        self.check_tendency_divergence_form([0 * rot_fft, Fb_linear_fft])
+
+
 class TestForcingLinearMode(TestSimulBase):
     @classmethod
     def init_params(self):
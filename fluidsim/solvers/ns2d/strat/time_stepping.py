@@ -10,9 +10,10 @@ Provides:
 
 """
 
+from math import pi
+
 import numpy as np
 
-from math import pi
 from fluiddyn.util import mpi
 from fluidsim.base.time_stepping.pseudo_spect import TimeSteppingPseudoSpectral
 
@@ -142,57 +143,52 @@ class TimeSteppingPseudoSpectralStrat(TimeSteppingPseudoSpectral):
         Compute time increment with the CFL condition solver ns2d.strat.
         """
         # Compute deltat_CFL at each time step.
-        ux = self.sim.state.get_var("ux")
-        uy = self.sim.state.get_var("uy")
-
-        max_ux = abs(ux).max()
-        max_uy = abs(uy).max()
+        (max_ux, max_uy), is_global = self._get_max_abs_phys("ux", "uy")
         freq_CFL = max_ux / self.sim.oper.deltax + max_uy / self.sim.oper.deltay
 
-        if mpi.nb_proc > 1:
-            freq_CFL = mpi.comm.allreduce(freq_CFL, op=mpi.MPI.MAX)
-
-        if freq_CFL > 0:
-            deltat_CFL = self.CFL / freq_CFL
-        else:
-            deltat_CFL = self.deltat_max
-
         # Removed phase velocity (considered not relevant)
         if not self.coef_group:
-            maybe_new_dt = min(
-                deltat_CFL, self.deltat_dispersion_relation, self.deltat_max
-            )
+            deltat_other = self.deltat_dispersion_relation
         else:
-            maybe_new_dt = min(
-                deltat_CFL,
-                self.deltat_dispersion_relation,
-                self.deltat_group_vel,
-                self.deltat_max,
+            deltat_other = min(
+                self.deltat_dispersion_relation, self.deltat_group_vel
             )
 
         if self.params.forcing.enable:
-            maybe_new_dt = min(maybe_new_dt, self.deltat_f)
+            deltat_other = min(deltat_other, self.deltat_f)
+
+        self._compute_time_increment_CLF_from_tmp(
+            freq_CFL, deltat_other, is_global=is_global
+        )
 
-        normalize_diff = abs(self.deltat - maybe_new_dt) / maybe_new_dt
-        if normalize_diff > 0.02:
-            self.deltat = maybe_new_dt
+    def _get_shear_modes_compact(self):
+        """Get the indices of the shear modes in the compact arrays."""
+        try:
+            return self._shear_modes_compact
+        except AttributeError:
+            pass
+        is_shear_mode = np.zeros(self.sim.oper.shapeK_loc, dtype=bool)
+        is_shear_mode[0, :] = True
+        self._shear_modes_compact = np.flatnonzero(
+            self.storage_compact.gather(is_shear_mode)
+        )
+        return self._shear_modes_compact
 
     def one_time_step_computation(self):
         """One time step"""
         # WARNING: if the function _time_step_RK comes from an extension, its
         # execution time seems to be attributed to the function
         # one_time_step_computation by cProfile
+        self._gather_state_spect()
         self._time_step_RK()
         self.sim.oper.dealiasing(self.sim.state.state_spect)
 
         # If no shear modes in the flow.
-        if self.sim.params.NO_SHEAR_MODES:
-            for ikey, key_name in enumerate(self.sim.state.state_spect.keys):
-                key_fft = self.sim.state.state_spect.get_var(key_name)
-                key_fft[0, :] = 0
-                self.sim.state.state_spect.set_var(key_name, key_fft)
+        if self.sim.params.NO_SHEAR_MODES and self.storage_compact is not None:
+            self.sim.state.state_spect[:, self._get_shear_modes_compact()] = 0
+        elif self.sim.params.NO_SHEAR_MODES:
+            # one strided operation for all variables
+            self.sim.state.state_spect[:, 0, :] = 0
 
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(self.sim.state.state_spect[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_health()
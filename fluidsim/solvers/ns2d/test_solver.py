@@ -37,6 +37,39 @@ class TestSimulBase(TestSimul):
 
         return params
 
+    def check_tendency_divergence_form(self, linear_terms_phys=None):
+        """Compare the tendencies computed with the two nonlinear forms.
+
+        `linear_terms_phys` contains the linear terms that the advective form
+        computes in physical space, so that their round trip ifft/fft (which
+        can differ from the identity for some FFT classes) is taken into
+        account.
+
+        """
+        sim = self.sim
+        oper = sim.oper
+        state_spect = sim.state.state_spect
+        delta = np.zeros_like(state_spect)
+        if linear_terms_phys is not None:
+            for ivar, term_fft in enumerate(linear_terms_phys):
+                delta[ivar] = term_fft - oper.fft(oper.ifft(term_fft))
+            oper.dealiasing(delta)
+        tend = sim.tendencies_nonlin(state_spect=state_spect) + delta
+        tend0 = sim.tendencies_nonlin() + delta
+
+        sim.params.nonlinear_form = "divergence"
+        try:
+            tend_div = sim.tendencies_nonlin(state_spect=state_spect)
+            tend0_div = sim.tendencies_nonlin()
+        finally:
+            sim.params.nonlinear_form = "advective"
+
+        atol = 1e-14 * abs(tend).max()
+        np.testing.assert_allclose(tend_div, tend, atol=atol)
+        np.testing.assert_allclose(tend0_div, tend0, atol=atol)
+        # the state is not modified
+        self.assertIs(sim.state.state_spect, state_spect)
+
 
 class TestSolverNS2DTendency(TestSimulBase):
     @classmethod
@@ -60,6 +93,22 @@ class TestSolverNS2DTendency(TestSimulBase):
 
         self.assertGreater(1e-15, abs(ratio))
 
+    def test_tendency_divergence_form(self):
+        self.check_tendency_divergence_form()
+
+
+class TestSolverNS2DTendencyBeta(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+        params.beta = 2.0
+
+    def test_tendency_divergence_form(self):
+        sim = self.sim
+        uy_fft = sim.oper.vecfft_from_rotfft(sim.state.get_var("rot_fft"))[1]
+        self.check_tendency_divergence_form([-sim.params.beta * uy_fft])
+
 
 class TestForcingProportional(TestSimulBase):
     @classmethod
@@ -51,9 +51,9 @@ class Output(OutputBasePseudoSpectral):
         params.output.phys_fields.field_to_plot = "rotz"
 
     def compute_energies_fft(self):
-        vx_fft = self.sim.state.state_spect.get_var("vx_fft")
-        vy_fft = self.sim.state.state_spect.get_var("vy_fft")
-        vz_fft = self.sim.state.state_spect.get_var("vz_fft")
+        vx_fft = self.sim.state.get_var("vx_fft")
+        vy_fft = self.sim.state.get_var("vy_fft")
+        vz_fft = self.sim.state.get_var("vz_fft")
         return (
             0.5 * np.abs(vx_fft) ** 2,
             0.5 * np.abs(vy_fft) ** 2,
@@ -40,9 +40,9 @@ class SpatialMeansNS3D(SpatialMeansBase):
             fy_fft = forcing_fft.get_var("vy_fft")
             fz_fft = forcing_fft.get_var("vz_fft")
 
-            vx_fft = self.sim.state.state_spect.get_var("vx_fft")
-            vy_fft = self.sim.state.state_spect.get_var("vy_fft")
-            vz_fft = self.sim.state.state_spect.get_var("vz_fft")
+            vx_fft = self.sim.state.get_var("vx_fft")
+            vy_fft = self.sim.state.get_var("vy_fft")
+            vz_fft = self.sim.state.get_var("vz_fft")
 
             PK1_fft = np.ascontiguousarray(
                 np.real(
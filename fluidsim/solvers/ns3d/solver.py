@@ -14,9 +14,8 @@ import sys
 
 from fluiddyn.util.mpi import rank
 
-from fluidfft.fft3d.operators import vector_product
-
 from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.operators.operators3d import vector_product
 
 from fluidsim.base.solvers.pseudo_spect import (
     SimulBasePseudoSpectral,
@@ -118,14 +117,23 @@ f: float (default None)
         if rank == 0:
             omegaz_fft[0, 0, 0] += self.params.f
 
+    def _has_exact_waves(self):
+        """Check if the linear waves are integrated exactly.
+
+        In this case, the linear terms (Coriolis force and buoyancy) are not
+        included in the tendencies (see
+        :mod:`fluidsim.solvers.ns3d.time_stepping`).
+
+        """
+        return getattr(self.params.time_stepping, "exact_waves", False)
+
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
-        ifft_as_arg_destroy = oper.ifft_as_arg_destroy
-        fft_as_arg = oper.fft_as_arg
+        fields_tmp = self.state.fields_tmp
+        fields_spect_tmp = self.state.fields_spect_tmp
 
         if state_spect is None:
-            spect_get_var = self.state.state_spect.get_var
+            spect_get_var = self.state.get_var
         else:
             spect_get_var = state_spect.get_var
 
@@ -133,38 +141,30 @@ f: float (default None)
         vy_fft = spect_get_var("vy_fft")
         vz_fft = spect_get_var("vz_fft")
 
-        omegax_fft = self.state.fields_spect_tmp[0]
-        omegay_fft = self.state.fields_spect_tmp[1]
-        omegaz_fft = self.state.fields_spect_tmp[2]
+        omegax_fft, omegay_fft, omegaz_fft = omega_fft = fields_spect_tmp[3:6]
 
         oper.rotfft_from_vecfft_outin(
             vx_fft, vy_fft, vz_fft, omegax_fft, omegay_fft, omegaz_fft
         )
 
-        if self.params.f is not None:
+        if self.params.f is not None and not self._has_exact_waves():
             self._modif_omegafft_with_f(omegax_fft, omegay_fft, omegaz_fft)
 
-        omegax = self.state.fields_tmp[3]
-        omegay = self.state.fields_tmp[4]
-        omegaz = self.state.fields_tmp[5]
-
-        ifft_as_arg_destroy(omegax_fft, omegax)
-        ifft_as_arg_destroy(omegay_fft, omegay)
-        ifft_as_arg_destroy(omegaz_fft, omegaz)
+        omegax, omegay, omegaz = omega = fields_tmp[3:6]
 
         if state_spect is None:
             vx = self.state.state_phys.get_var("vx")
             vy = self.state.state_phys.get_var("vy")
             vz = self.state.state_phys.get_var("vz")
+            oper.ifft_setofvar(omega_fft, omega, destroy=True)
         else:
-            vx = self.state.fields_tmp[0]
-            vy = self.state.fields_tmp[1]
-            vz = self.state.fields_tmp[2]
-            ifft_as_arg(vx_fft, vx)
-            ifft_as_arg(vy_fft, vy)
-            ifft_as_arg(vz_fft, vz)
+            # velocity and vorticity transformed together
+            fields_spect_tmp[0:3] = state_spect[0:3]
+            oper.ifft_setofvar(fields_spect_tmp, fields_tmp, destroy=True)
+            vx, vy, vz = fields_tmp[0:3]
 
-        fx, fy, fz = vector_product(vx, vy, vz, omegax, omegay, omegaz)
+        # the vorticity is overwritten by the vector product
+        vector_product(vx, vy, vz, omegax, omegay, omegaz)
 
         if old is None:
             tendencies_fft = SetOfVariables(
@@ -173,15 +173,13 @@ f: float (default None)
         else:
             tendencies_fft = old
 
+        oper.fft_setofvar(omega, tendencies_fft[0:3])
+
         fx_fft = tendencies_fft.get_var("vx_fft")
         fy_fft = tendencies_fft.get_var("vy_fft")
         fz_fft = tendencies_fft.get_var("vz_fft")
 
-        fft_as_arg(fx, fx_fft)
-        fft_as_arg(fy, fy_fft)
-        fft_as_arg(fz, fz_fft)
-
-        oper.project_perpk3d(fx_fft, fy_fft, fz_fft)
+        oper.project_perpk3d_dealiasing(fx_fft, fy_fft, fz_fft)
 
         if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
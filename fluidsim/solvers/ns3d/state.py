@@ -1,10 +1,22 @@
 """State for the NS3D solver (:mod:`fluidsim.solvers.ns3d.state`)
 =======================================================================
+
+.. note::
+
+  With `params.time_stepping.craya_herring` or
+  `params.time_stepping.exact_waves`, the spectral state `state_spect`
+  contains the variables of the storage used by the time stepping (see
+  :mod:`fluidsim.operators.craya_herring`), for example the toroidal and
+  poloidal components of the velocity, and not the velocity (see
+  :func:`StateNS3D.use_storage`). The variables of the solver (`vx_fft`,
+  `vy_fft`, `vz_fft`, ...) are still obtained with the method `get_var`.
+
 """
 
 import numpy as np
 
 
+from fluidsim.base.setofvariables import SetOfVariables
 from fluidsim.base.state import StatePseudoSpectral
 
 from fluiddyn.util import mpi
@@ -38,13 +50,118 @@ class StateNS3D(StatePseudoSpectral):
 
         super().__init__(sim, oper)
 
-        self.fields_tmp = tuple(
-            np.empty_like(self.state_phys[0]) for n in range(6)
+        # Buffers for the transforms of the tendencies (sets of variables
+        # transformed together). In physical space: the state, the vorticity
+        # (overwritten by the vector product) and the products of the
+        # velocity and the scalar variables. In spectral space: the state and
+        # the vorticity.
+        nb_keys = len(self.keys_state_spect)
+        nb_scalars = nb_keys - 3
+        self.fields_tmp = np.empty(
+            (nb_keys + 3 + 3 * nb_scalars,) + self.state_phys.shape[1:],
+            self.state_phys.dtype,
+        )
+        self.fields_spect_tmp = np.empty(
+            (nb_keys + 3,) + self.state_spect.shape[1:], self.state_spect.dtype
         )
+        self.storage = None
+        self._state_spect_full = None
 
-        self.fields_spect_tmp = tuple(
-            np.empty_like(self.state_spect[0]) for n in range(3)
+    def use_storage(self, storage):
+        """Store the state with the variables of a storage.
+
+        The spectral state `state_spect` is replaced by a smaller array
+        containing the variables of the storage (for example
+        :class:`fluidsim.operators.craya_herring.CrayaHerringStorage`). The
+        variables of the solver are computed from `state_spect` only when
+        they are needed (see :func:`get_state_spect_full`).
+
+        """
+        state_spect_full = self.state_spect
+        self.state_spect = SetOfVariables(
+            input_array=storage.create_array(
+                len(storage.keys_state_spect), state_spect_full.dtype
+            ),
+            keys=storage.keys_state_spect,
+            info="state_spect",
         )
+        storage.gather(state_spect_full, out=self.state_spect)
+        self.storage = storage
+        self._state_spect_full = None
+        # the physical state contains the variables of the solver
+        self.statespect_from_statephys = self._statespect_from_statephys_full
+        self.statephys_from_statespect = self._statephys_from_statespect_full
+
+    def create_state_spect_full(self):
+        """Create an array for the spectral variables of the solver."""
+        return SetOfVariables(
+            keys=self.keys_state_spect,
+            shape_variable=self.state_spect.shape[1:],
+            dtype=self.state_spect.dtype,
+            info="state_spect_full",
+        )
+
+    def get_state_spect_full(self):
+        """Get the spectral state with the variables of the solver.
+
+        With a storage, the array is computed from `state_spect` at the first
+        call and kept until :func:`clear_state_spect_full` is called (when
+        `state_spect` is modified).
+
+        """
+        if self.storage is None:
+            return self.state_spect
+        if self._state_spect_full is None:
+            state_spect_full = self.create_state_spect_full()
+            self.storage.scatter(self.state_spect, state_spect_full)
+            self._state_spect_full = state_spect_full
+        return self._state_spect_full
+
+    def clear_state_spect_full(self):
+        """Forget the array computed by :func:`get_state_spect_full`."""
+        if self.storage is not None:
+            self._state_spect_full = None
+
+    def get_var(self, key):
+        if self.storage is not None and key in self.keys_state_spect:
+            return self.get_state_spect_full().get_var(key)
+        return super().get_var(key)
+
+    def __setitem__(self, key, value):
+        if self.storage is not None and key in self.keys_state_spect:
+            state_spect_full = self.get_state_spect_full()
+            state_spect_full.set_var(key, value)
+            self.storage.gather(state_spect_full, out=self.state_spect)
+        else:
+            super().__setitem__(key, value)
+
+    def init_statespect_from(self, **kwargs):
+        if self.storage is None:
+            return super().init_statespect_from(**kwargs)
+        state_spect = self.state_spect
+        self.state_spect = state_spect_full = self.create_state_spect_full()
+        try:
+            super().init_statespect_from(**kwargs)
+        finally:
+            self.state_spect = state_spect
+        self.storage.gather(state_spect_full, out=self.state_spect)
+        self._state_spect_full = state_spect_full
+
+    def _statespect_from_statephys_full(self):
+        state_spect_full = self.create_state_spect_full()
+        for ik in range(state_spect_full.nvar):
+            self.oper.fft_as_arg(self.state_phys[ik], state_spect_full[ik])
+        self.storage.gather(state_spect_full, out=self.state_spect)
+        self._state_spect_full = state_spect_full
+
+    def _statephys_from_statespect_full(self):
+        state_spect_full = self.create_state_spect_full()
+        self.storage.scatter(self.state_spect, state_spect_full)
+        for ik in range(state_spect_full.nvar):
+            self.oper.ifft_as_arg(state_spect_full[ik], self.state_phys[ik])
+        # state_spect can have been modified and the array is not kept (to
+        # save memory during the time steps)
+        self._state_spect_full = None
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
@@ -78,17 +195,13 @@ class StateNS3D(StatePseudoSpectral):
         return result
 
     def init_from_vxvyfft(self, vx_fft, vy_fft):
-        self.state_spect.set_var("vx_fft", vx_fft)
-        self.state_spect.set_var("vy_fft", vy_fft)
-        self.state_spect.set_var("vz_fft", np.zeros_like(vx_fft))
+        self.init_statespect_from(vx_fft=vx_fft, vy_fft=vy_fft)
 
         self.statephys_from_statespect()
         self.statespect_from_statephys()
 
     def init_from_vxvyvzfft(self, vx_fft, vy_fft, vz_fft):
-        self.state_spect.set_var("vx_fft", vx_fft)
-        self.state_spect.set_var("vy_fft", vy_fft)
-        self.state_spect.set_var("vz_fft", vz_fft)
+        self.init_statespect_from(vx_fft=vx_fft, vy_fft=vy_fft, vz_fft=vz_fft)
 
         self.statephys_from_statespect()
         self.statespect_from_statephys()
@@ -19,7 +19,7 @@ class Output(OutputNS3D):
         classes.Spectra.class_name = "SpectraNS3DStrat"
 
     def compute_energies_fft(self):
-        get_var = self.sim.state.state_spect.get_var
+        get_var = self.sim.state.get_var
         b_fft = get_var("b_fft")
         vx_fft = get_var("vx_fft")
         vy_fft = get_var("vy_fft")
@@ -36,7 +36,7 @@ class Output(OutputNS3D):
         return nrj_A, nrj_Kz, nrj_Khr, nrj_Khd
 
     def compute_energy_fft(self):
-        get_var = self.sim.state.state_spect.get_var
+        get_var = self.sim.state.get_var
         b_fft = get_var("b_fft")
         vx_fft = get_var("vx_fft")
         vy_fft = get_var("vy_fft")
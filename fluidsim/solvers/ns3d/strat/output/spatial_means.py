@@ -50,7 +50,7 @@ class SpatialMeansNS3DStrat(SpatialMeansBase):
             fz_fft = forcing_fft.get_var("vz_fft")
             fb_fft = forcing_fft.get_var("b_fft")
 
-            get_var = self.sim.state.state_spect.get_var
+            get_var = self.sim.state.get_var
             vx_fft = get_var("vx_fft")
             vy_fft = get_var("vy_fft")
             vz_fft = get_var("vz_fft")
@@ -9,7 +9,7 @@ class SpectraNS3DStrat(SpectraNS3D):
     def compute(self):
         """compute the values at one time."""
 
-        get_var = self.sim.state.state_spect.get_var
+        get_var = self.sim.state.get_var
         b_fft = get_var("b_fft")
         vx_fft = get_var("vx_fft")
         vy_fft = get_var("vy_fft")
@@ -13,9 +13,10 @@
 
 """
 
-from fluidfft.fft3d.operators import vector_product
+import numpy as np
 
 from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.operators.operators3d import vector_product
 
 from ..solver import InfoSolverNS3D, Simul as SimulNS3D
 
@@ -106,12 +107,11 @@ class Simul(SimulNS3D):
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
-        ifft_as_arg_destroy = oper.ifft_as_arg_destroy
-        fft_as_arg = oper.fft_as_arg
+        fields_tmp = self.state.fields_tmp
+        fields_spect_tmp = self.state.fields_spect_tmp
 
         if state_spect is None:
-            spect_get_var = self.state.state_spect.get_var
+            spect_get_var = self.state.get_var
         else:
             spect_get_var = state_spect.get_var
 
@@ -120,34 +120,41 @@ class Simul(SimulNS3D):
         vz_fft = spect_get_var("vz_fft")
         b_fft = spect_get_var("b_fft")
 
-        omegax_fft, omegay_fft, omegaz_fft = oper.rotfft_from_vecfft(
-            vx_fft, vy_fft, vz_fft
+        omegax_fft, omegay_fft, omegaz_fft = omega_fft = fields_spect_tmp[4:7]
+
+        oper.rotfft_from_vecfft_outin(
+            vx_fft, vy_fft, vz_fft, omegax_fft, omegay_fft, omegaz_fft
         )
 
-        if self.params.f is not None:
+        has_exact_waves = self._has_exact_waves()
+        if self.params.f is not None and not has_exact_waves:
             self._modif_omegafft_with_f(omegax_fft, omegay_fft, omegaz_fft)
 
-        omegax = self.state.fields_tmp[3]
-        omegay = self.state.fields_tmp[4]
-        omegaz = self.state.fields_tmp[5]
-
-        ifft_as_arg_destroy(omegax_fft, omegax)
-        ifft_as_arg_destroy(omegay_fft, omegay)
-        ifft_as_arg_destroy(omegaz_fft, omegaz)
+        omegax, omegay, omegaz = omega = fields_tmp[4:7]
 
         if state_spect is None:
             vx = self.state.state_phys.get_var("vx")
             vy = self.state.state_phys.get_var("vy")
             vz = self.state.state_phys.get_var("vz")
+            b = self.state.state_phys.get_var("b")
+            oper.ifft_setofvar(omega_fft, omega, destroy=True)
         else:
-            vx = self.state.fields_tmp[0]
-            vy = self.state.fields_tmp[1]
-            vz = self.state.fields_tmp[2]
-            ifft_as_arg(vx_fft, vx)
-            ifft_as_arg(vy_fft, vy)
-            ifft_as_arg(vz_fft, vz)
+            # state and vorticity transformed together
+            fields_spect_tmp[0:4] = state_spect
+            oper.ifft_setofvar(fields_spect_tmp, fields_tmp[0:7], destroy=True)
+            vx, vy, vz, b = fields_tmp[0:4]
+
+        # the vorticity is overwritten by the vector product
+        vector_product(vx, vy, vz, omegax, omegay, omegaz)
 
-        fx, fy, fz = vector_product(vx, vy, vz, omegax, omegay, omegaz)
+        vxb, vyb, vzb = fields_tmp[7:10]
+        np.multiply(vx, b, out=vxb)
+        np.multiply(vy, b, out=vyb)
+        np.multiply(vz, b, out=vzb)
+
+        # vector product and fluxes of buoyancy transformed together
+        oper.fft_setofvar(fields_tmp[4:10], fields_spect_tmp[1:7])
+        vxb_fft, vyb_fft, vzb_fft = fields_spect_tmp[4:7]
 
         if old is None:
             tendencies_fft = SetOfVariables(
@@ -156,28 +163,23 @@ class Simul(SimulNS3D):
         else:
             tendencies_fft = old
 
+        # the state is used before being overwritten (`old` can be the array
+        # `state_spect`, see fluidsim.solvers.ns3d.time_stepping)
+        fb_fft = -oper.divfft_from_vecfft(vxb_fft, vyb_fft, vzb_fft)
+        if not has_exact_waves:
+            fb_fft -= self.params.N ** 2 * vz_fft
+
+        tendencies_fft[0:3] = fields_spect_tmp[1:4]
+
         fx_fft = tendencies_fft.get_var("vx_fft")
         fy_fft = tendencies_fft.get_var("vy_fft")
         fz_fft = tendencies_fft.get_var("vz_fft")
 
-        fft_as_arg(fx, fx_fft)
-        fft_as_arg(fy, fy_fft)
-        fft_as_arg(fz, fz_fft)
-
-        fz_fft += b_fft
+        if not has_exact_waves:
+            fz_fft += b_fft
 
         oper.project_perpk3d(fx_fft, fy_fft, fz_fft)
 
-        if state_spect is None:
-            b = self.state.state_phys.get_var("b")
-        else:
-            b = self.state.fields_tmp[3]
-            ifft_as_arg(b_fft, b)
-
-        fb_fft = (
-            -oper.div_vb_fft_from_vb(vx, vy, vz, b) - self.params.N ** 2 * vz_fft
-        )
-
         tendencies_fft.set_var("b_fft", fb_fft)
 
         if self.is_forcing_enabled:
@@ -1,9 +1,14 @@
 import unittest
+import shutil
+import tracemalloc
+from copy import deepcopy
 
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.linalg import expm
 
 import fluiddyn.util.mpi as mpi
+from fluiddyn.io import stdout_redirected
 
 import fluidsim as fls
 
@@ -130,6 +135,181 @@ class TestOutput(TestSimulBase):
         plt.close("all")
 
 
+class TestCrayaHerring(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.init_fields.type = "noise"
+        params.output.HAS_TO_SAVE = False
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.USE_T_END = False
+        params.time_stepping.it_end = 4
+        params.time_stepping.deltat0 = 0.01
+        params.time_stepping.craya_herring = True
+
+    def test_craya_herring(self):
+        sim = self.sim
+        params = deepcopy(sim.params)
+        params.short_name_type_run = "test_ref"
+        params.time_stepping.craya_herring = False
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim_ref = Simul(params)
+
+        sim.oper.dealiasing(sim.state.state_spect)
+        sim.state.statephys_from_statespect()
+        sim_ref.state.state_spect[:] = sim.state.get_state_spect_full()
+        sim_ref.state.statephys_from_statespect()
+
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim.time_stepping.start()
+            sim_ref.time_stepping.start()
+        if mpi.rank == 0:
+            shutil.rmtree(sim_ref.output.path_run, ignore_errors=True)
+
+        # the state of the simulation contains the Craya-Herring components
+        state_spect_ch = sim.state.state_spect
+        self.assertEqual(state_spect_ch.shape[0], 3)
+        self.assertEqual(state_spect_ch.keys, ("vt_fft", "vp_fft", "b_fft"))
+        self.assertTrue(
+            np.allclose(
+                sim.state.get_state_spect_full(),
+                sim_ref.state.state_spect,
+                rtol=1e-10,
+                atol=1e-14,
+            )
+        )
+        for key in ("vx_fft", "vz_fft", "b_fft"):
+            self.assertTrue(
+                np.allclose(
+                    sim.state.get_var(key),
+                    sim_ref.state.get_var(key),
+                    rtol=1e-10,
+                    atol=1e-14,
+                )
+            )
+        self.assertTrue(
+            np.allclose(
+                sim.output.compute_energy(), sim_ref.output.compute_energy()
+            )
+        )
+
+    def test_memory(self):
+        def measure_memory(craya_herring):
+            """Memory used by a simulation and during one time step"""
+            params = deepcopy(self.sim.params)
+            params.short_name_type_run = f"test_memory{int(craya_herring)}"
+            params.time_stepping.craya_herring = craya_herring
+            tracemalloc.start()
+            with stdout_redirected(self.has_to_redirect_stdout):
+                sim = Simul(params)
+                # the plans of the FFTs are created during the first time step
+                sim.time_stepping.one_time_step()
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            tracemalloc.start()
+            with stdout_redirected(self.has_to_redirect_stdout):
+                sim.time_stepping.one_time_step()
+            memory_peak = memory + tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if mpi.rank == 0:
+                shutil.rmtree(sim.output.path_run, ignore_errors=True)
+            return memory, memory_peak
+
+        memory_ref, memory_peak_ref = measure_memory(False)
+        memory, memory_peak = measure_memory(True)
+        self.assertLess(memory, memory_ref)
+        self.assertLess(memory_peak, memory_peak_ref)
+
+
+class TestExactWaves(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.init_fields.type = "noise"
+        params.init_fields.noise.velo_max = 0.01
+        params.output.HAS_TO_SAVE = False
+        params.N = 50.0
+        params.f = 5.0
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.USE_T_END = False
+        params.time_stepping.it_end = 2
+        # much larger than the stability limit of RK4 for the waves
+        params.time_stepping.deltat0 = 0.2
+        params.time_stepping.exact_waves = True
+
+    def test_exact_waves(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        self.assertEqual(
+            sim.state.state_spect.keys, ("q_fft", "ap_fft", "am_fft")
+        )
+        freq_max = abs(time_stepping.freq_lin.imag).max()
+        self.assertGreater(freq_max * time_stepping.deltat, 2 * np.sqrt(2))
+
+        energy = sim.output.compute_energy()
+        with stdout_redirected(self.has_to_redirect_stdout):
+            time_stepping.start()
+        self.assertLess(sim.output.compute_energy(), energy)
+
+    def test_linear_wave(self):
+        """A plane wave is an exact solution of the inviscid equations."""
+        params = deepcopy(self.sim.params)
+        params.short_name_type_run = "test_wave"
+        params.oper.nx = params.oper.ny = params.oper.nz = 16
+        params.nu_8 = 0.0
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim = Simul(params)
+
+        oper = sim.oper
+        kx = 2 * np.pi / params.oper.Lx
+        kz = 2 * np.pi / params.oper.Lz
+        where = (
+            np.isclose(oper.Kx, kx)
+            & np.isclose(oper.Ky, 0)
+            & np.isclose(oper.Kz, kz)
+        )
+        # velocity perpendicular to the wavevector and buoyancy of the mode
+        values0 = 0.01 * np.array([kz, 1j, -kx, 0.5 + 0.5j])
+        variables = {}
+        for key, value in zip(sim.state.keys_state_spect, values0):
+            variables[key] = oper.create_arrayK(value=0.0)
+            variables[key][where] = value
+        sim.state.init_statespect_from(**variables)
+        sim.state.statephys_from_statespect()
+
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim.time_stepping.start()
+        if mpi.rank == 0:
+            shutil.rmtree(sim.output.path_run, ignore_errors=True)
+
+        # linear operator for (vx, vy, vz, b): Coriolis force, buoyancy and
+        # projection perpendicular to the wavevector
+        wavevector = np.array([kx, 0.0, kz])
+        projection = np.eye(3) - np.outer(wavevector, wavevector) / (
+            wavevector @ wavevector
+        )
+        linear_operator = np.zeros((4, 4))
+        linear_operator[:3, :3] = projection @ np.array(
+            [[0.0, params.f, 0.0], [-params.f, 0.0, 0.0], [0.0, 0.0, 0.0]]
+        )
+        linear_operator[:3, 3] = projection[:, 2]
+        linear_operator[3, 2] = -params.N ** 2
+        time = sim.time_stepping.t
+        values = expm(linear_operator * time) @ values0
+
+        omega_max = np.abs(np.linalg.eigvals(linear_operator)).max()
+        # much larger than the stability limit of RK4
+        self.assertGreater(omega_max * sim.time_stepping.deltat, 4)
+
+        for key, value in zip(sim.state.keys_state_spect, values):
+            var_fft = sim.state.get_var(key)
+            self.assertTrue(
+                np.allclose(var_fft[where], value, rtol=1e-10, atol=0)
+            )
+            var_fft[where] = 0.0
+            self.assertTrue(np.allclose(var_fft, 0.0, atol=1e-14))
+
+
 class TestInitInScript(TestSimulBase):
     @classmethod
     def init_params(self):
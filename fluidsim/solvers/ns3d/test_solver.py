@@ -1,5 +1,7 @@
 import unittest
+import shutil
 import sys
+from copy import deepcopy
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,6 +9,7 @@ import matplotlib.pyplot as plt
 import fluidsim as fls
 
 import fluiddyn.util.mpi as mpi
+from fluiddyn.io import stdout_redirected
 
 from fluidsim.solvers.ns3d.solver import Simul
 
@@ -71,6 +74,83 @@ class TestTendency(TestSimulBase):
         self.assertGreater(1e-15, abs(ratio))
 
 
+class TestPhaseShift(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.init_fields.type = "noise"
+        params.output.HAS_TO_SAVE = False
+        params.time_stepping.type_time_scheme = "RK2_phaseshift"
+        params.time_stepping.phaseshift_random_seed = 1
+
+    def test_tendencies_phase_shifted(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        state_spect = sim.state.state_spect
+        tendencies = sim.tendencies_nonlin(state_spect)
+
+        phase_shift = time_stepping._get_phase_shift_random()
+        tendencies_shifted = time_stepping._compute_tendencies_phase_shifted(
+            phase_shift, state_spect, old=None
+        )
+        # no aliasing with the 2/3 rule: the tendencies do not depend on the
+        # shift of the grid
+        np.testing.assert_allclose(
+            tendencies_shifted, tendencies, atol=1e-12 * abs(tendencies).max()
+        )
+
+        sim.time_stepping.start()
+        self.assertTrue(np.isfinite(sim.state.state_spect).all())
+
+
+class TestCompactStorage(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.oper.nx = 16
+        params.oper.ny = 12
+        params.oper.nz = 8
+        params.init_fields.type = "noise"
+        params.output.HAS_TO_SAVE = False
+        params.time_stepping.compact_storage = True
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.05
+
+    def test_compact_storage(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        storage = time_stepping.storage_compact
+        state_spect_init = sim.state.state_spect.copy()
+        sim.time_stepping.start()
+
+        # the arrays of the time scheme are compact
+        for name in ("_state_spect_tmp", "_state_spect_tmp1"):
+            arr = getattr(time_stepping, name)
+            self.assertEqual(arr.shape[-1], storage.nb_modes)
+
+        params = deepcopy(self.params)
+        params.short_name_type_run = "test_ref"
+        params.time_stepping.compact_storage = False
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim_ref = Simul(params)
+        if mpi.rank == 0:
+            self.addCleanup(
+                shutil.rmtree, sim_ref.output.path_run, ignore_errors=True
+            )
+        sim_ref.state.state_spect[:] = state_spect_init
+        sim_ref.oper.dealiasing(sim_ref.state.state_spect)
+        sim_ref.state.statephys_from_statespect()
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim_ref.time_stepping.start()
+
+        state_spect_ref = sim_ref.state.state_spect
+        np.testing.assert_allclose(
+            sim.state.state_spect,
+            state_spect_ref,
+            atol=1e-12 * abs(state_spect_ref).max(),
+        )
+
+
 class TestOutput(TestSimulBase):
     @classmethod
     def init_params(self):
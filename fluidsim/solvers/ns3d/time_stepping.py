@@ -1,22 +1,177 @@
+"""Time stepping (:mod:`fluidsim.solvers.ns3d.time_stepping`)
+=============================================================
+
+Provides:
+
+.. autoclass:: TimeSteppingPseudoSpectralNS3D
+   :members:
+   :private-members:
+
+.. note::
+
+  If `params.time_stepping.craya_herring` is True, the spectral state of the
+  simulation contains the toroidal and poloidal components of the velocity
+  in the Craya-Herring basis (see
+  :class:`fluidsim.operators.craya_herring.CrayaHerringStorage` and
+  :func:`fluidsim.solvers.ns3d.state.StateNS3D.use_storage`) instead of the 3
+  components of the velocity. The state, the temporary arrays of the time
+  schemes and the copies for the rollbacks are smaller (2 instead of 3 arrays
+  for the velocity) and the velocity stays divergence-free without
+  projection. The velocity is computed only when it is needed (for the
+  nonlinear terms, at the end of each time step and for the outputs), in
+  temporary arrays (the array used for the nonlinear terms also contains
+  the full nonlinear tendencies).
+
+.. note::
+
+  If `params.time_stepping.exact_waves` is True, the time schemes work on
+  the vortical and wave modes of the linear operator associated with the
+  buoyancy (ns3d.strat) and the Coriolis force (`params.f`) (see
+  :class:`fluidsim.operators.craya_herring.WaveModesStorage`). These linear
+  terms are not included in the nonlinear tendencies and the linear waves are
+  integrated exactly by the integrating factor (as the dissipation) so that
+  the time step is not limited by :math:`N` or :math:`f` but only by the CFL
+  condition and `params.time_stepping.deltat_max`.
+
+"""
+
 import numpy as np
 
 from fluidsim.base.time_stepping.pseudo_spect import TimeSteppingPseudoSpectral
+from fluidsim.operators.craya_herring import (
+    CrayaHerringStorage,
+    WaveModesStorage,
+)
+
+
+class _SimulCrayaHerring:
+    """Simulation seen by the time stepping with the Craya-Herring storage.
+
+    The state of the simulation contains the Craya-Herring components. The
+    nonlinear tendencies are computed with a temporary array containing the
+    variables of the solver, used both for the state of the stages of the
+    time schemes and for the full tendencies (the methods `tendencies_nonlin`
+    of the ns3d solvers support `old=state_spect`).
+
+    """
+
+    def __init__(self, sim, storage):
+        self._sim = sim
+        self._storage = storage
+
+    def __getattr__(self, name):
+        return getattr(self._sim, name)
+
+    def tendencies_nonlin(self, state_spect=None, old=None):
+        """Compute the nonlinear tendencies (Craya-Herring components)."""
+        state = self._sim.state
+        if state_spect is None:
+            # the physical state is used by the solver
+            state_spect_full = state.get_state_spect_full()
+        else:
+            state_spect_full = state.create_state_spect_full()
+            self._storage.scatter(state_spect, state_spect_full)
+            state_spect = state_spect_full
+        # the array is overwritten by the tendencies
+        state.clear_state_spect_full()
+        tendencies = self._sim.tendencies_nonlin(
+            state_spect, old=state_spect_full
+        )
+        if old is None:
+            old = np.empty_like(state.state_spect)
+        return self._storage.gather(tendencies, out=old)
+
+
+class _SimulWaveModes(_SimulCrayaHerring):
+    """Simulation seen by the time stepping with the wave modes storage."""
+
+    def compute_freq_complex(self, key):
+        return self._storage.compute_freq_complex(key)
 
 
 class TimeSteppingPseudoSpectralNS3D(TimeSteppingPseudoSpectral):
+    @staticmethod
+    def _complete_params_with_default(params):
+        """This static method is used to complete the *params* container.
+        """
+        TimeSteppingPseudoSpectral._complete_params_with_default(params)
+        params.time_stepping._set_attrib("craya_herring", False)
+        params.time_stepping._set_attrib("exact_waves", False)
+        params.time_stepping._set_doc(
+            params.time_stepping._doc
+            + """
+craya_herring: bool (default False)
+
+    If True, the time schemes work on the toroidal and poloidal components of
+    the velocity (see
+    :class:`fluidsim.operators.craya_herring.CrayaHerringStorage`). Cannot be
+    used with `compact_storage`.
+
+exact_waves: bool (default False)
+
+    If True, the time schemes work on the vortical and wave modes (see
+    :class:`fluidsim.operators.craya_herring.WaveModesStorage`) and the linear
+    terms associated with the buoyancy and the Coriolis force are integrated
+    exactly. Cannot be used with `compact_storage` (and not implemented for
+    ns3d.bouss).
+"""
+        )
+
+    def _init_storage(self):
+        super()._init_storage()
+        self.storage_craya_herring = None
+        if self.sim._has_exact_waves():
+            self._init_wave_modes_storage()
+        elif getattr(self.params.time_stepping, "craya_herring", False):
+            self._init_craya_herring_storage()
+
+    def _check_no_compact_storage(self, name_param):
+        if self.storage_compact is not None:
+            raise ValueError(
+                f"params.time_stepping.{name_param} cannot be used with "
+                "params.time_stepping.compact_storage"
+            )
+
+    def _init_craya_herring_storage(self):
+        """Use the Craya-Herring components of the velocity."""
+        self._check_no_compact_storage("craya_herring")
+        self.storage_craya_herring = CrayaHerringStorage(
+            self.sim.oper, self.sim.state.state_spect.keys
+        )
+        self.sim.state.use_storage(self.storage_craya_herring)
+        self.sim = _SimulCrayaHerring(self.sim, self.storage_craya_herring)
+
+    def _init_wave_modes_storage(self):
+        """Use the vortical and wave modes (exact linear waves)."""
+        self._check_no_compact_storage("exact_waves")
+        params = self.params
+        self.storage_craya_herring = WaveModesStorage(
+            self.sim.oper,
+            self.sim.state.state_spect.keys,
+            f=params.f,
+            N=getattr(params, "N", None),
+        )
+        self.sim.state.use_storage(self.storage_craya_herring)
+        self.sim = _SimulWaveModes(self.sim, self.storage_craya_herring)
+
     def one_time_step_computation(self):
         """One time step"""
         state_spect = self.sim.state.state_spect
         # WARNING: if the function _time_step_RK comes from an extension, its
         # execution time seems to be attributed to the function
         # one_time_step_computation by cProfile
+        self._gather_state_spect()
         self._time_step_RK()
-        self.sim.oper.dealiasing(state_spect)
-        vx_fft = state_spect.get_var("vx_fft")
-        vy_fft = state_spect.get_var("vy_fft")
-        vz_fft = state_spect.get_var("vz_fft")
-        self.sim.oper.project_perpk3d(vx_fft, vy_fft, vz_fft)
+        if self.storage_craya_herring is not None:
+            # the velocity is perpendicular to the wavevector by construction
+            self.sim.oper.dealiasing(state_spect)
+        else:
+            vx_fft = state_spect.get_var("vx_fft")
+            vy_fft = state_spect.get_var("vy_fft")
+            vz_fft = state_spect.get_var("vz_fft")
+            self.sim.oper.project_perpk3d_dealiasing(vx_fft, vy_fft, vz_fft)
+            if state_spect.shape[0] > 3:
+                # other variables (for example the buoyancy)
+                self.sim.oper.dealiasing(state_spect[3:])
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(state_spect[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_health()
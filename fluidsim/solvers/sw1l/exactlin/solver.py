@@ -43,11 +43,11 @@ class Simul(SimulSW1L):
 
     InfoSolver = InfoSolverSW1LExactLin
 
-    def __init__(self, params):
+    def __init__(self, params, **kwargs):
         if params.beta != 0:
             raise NotImplementedError("Do not use this solver for beta-plane!")
 
-        super().__init__(params)
+        super().__init__(params, **kwargs)
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
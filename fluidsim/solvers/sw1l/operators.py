@@ -10,10 +10,10 @@ Provides
 """
 
 import numpy as np
-from fluiddyn.util.compat import cached_property
 
 from transonic import boost, jit, Array
 
+from fluidsim.operators.cache import cached_array
 from fluidsim.operators.operators2d import (
     OperatorsPseudoSpectral2D,
     rank,
@@ -115,11 +115,12 @@ class OperatorsPseudoSpectralSW1L(OperatorsPseudoSpectral2D):
     nK1_loc: int
     rank: int
 
-    @cached_property
+    # used at each time step (pinned in the cache)
+    @cached_array(single_precision=True, pinned=True)
     def Kappa2_not0(self):
         return self.K2_not0 + self.params.kd2
 
-    @cached_property
+    @cached_array(pinned=True)
     def Kappa_over_ic(self):
         Kappa2 = self.K2 + self.params.kd2
         return -1.0j * np.sqrt(Kappa2 / self.params.c2)
@@ -17,6 +17,8 @@ variables, i.e. the horizontal velocities and surface dispacement.
 
 """
 
+import numpy as np
+
 from transonic import jit, Array
 from fluiddyn.util import mpi
 
@@ -139,7 +141,7 @@ class Simul(SimulBasePseudoSpectral):
         attribs = {"f": 0, "c2": 20, "kd2": 0, "beta": 0}
         params._set_attribs(attribs)
 
-    def __init__(self, params):
+    def __init__(self, params, **kwargs):
         # Parameter(s) specific to this solver
 
         params.f = float(params.f)
@@ -152,7 +154,7 @@ class Simul(SimulBasePseudoSpectral):
                 "Equations are non-periodic in this formulation."
             )
 
-        super().__init__(params)
+        super().__init__(params, **kwargs)
 
         if mpi.rank == 0:
             self.output.print_stdout(
@@ -223,22 +225,29 @@ class Simul(SimulBasePseudoSpectral):
         else:
             tendencies_fft = old
 
-        F1x, F1y = compute_Frot(rot, ux, uy, self.params.f)
-        gradx_fft, grady_fft = oper.gradfft_from_fft(
-            oper.fft2(compute_pressure(self.params.c2, eta, ux, uy))
+        # the physical fields transformed together
+        fields = np.empty((5,) + ux.shape, ux.dtype)
+        fields[0], fields[1] = compute_Frot(rot, ux, uy, self.params.f)
+        fields[2] = compute_pressure(self.params.c2, eta, ux, uy)
+        h = eta + 1
+        np.multiply(h, ux, out=fields[3])
+        np.multiply(h, uy, out=fields[4])
+
+        F1x_fft, F1y_fft, pressure_fft, Jx_fft, Jy_fft = oper.fft_setofvar(
+            fields
         )
+
+        gradx_fft, grady_fft = oper.gradfft_from_fft(pressure_fft)
         oper.dealiasing(gradx_fft, grady_fft)
 
         Fx_fft = tendencies_fft.get_var("ux_fft")
         Fy_fft = tendencies_fft.get_var("uy_fft")
         Feta_fft = tendencies_fft.get_var("eta_fft")
 
-        Fx_fft[:] = oper.fft2(F1x) - gradx_fft
-        Fy_fft[:] = oper.fft2(F1y) - grady_fft
+        Fx_fft[:] = F1x_fft - gradx_fft
+        Fy_fft[:] = F1y_fft - grady_fft
 
-        Feta_fft[:] = -oper.divfft_from_vecfft(
-            oper.fft2((eta + 1) * ux), oper.fft2((eta + 1) * uy)
-        )
+        Feta_fft[:] = -oper.divfft_from_vecfft(Jx_fft, Jy_fft)
 
         oper.dealiasing(tendencies_fft)
 
@@ -134,7 +134,6 @@ class StateSW1L(StatePseudoSpectral):
 
     def statephys_from_statespect(self, state_spect=None, state_phys=None):
         """Compute the state in physical space."""
-        ifft_as_arg = self.oper.ifft_as_arg
         if state_spect is None:
             state_spect = self.state_spect
 
@@ -144,17 +143,13 @@ class StateSW1L(StatePseudoSpectral):
         ux_fft = state_spect.get_var("ux_fft")
         uy_fft = state_spect.get_var("uy_fft")
         eta_fft = state_spect.get_var("eta_fft")
-        rot_fft = self.oper.rotfft_from_vecfft(ux_fft, uy_fft)
 
-        ux = state_phys.get_var("ux")
-        uy = state_phys.get_var("uy")
-        eta = state_phys.get_var("eta")
-        rot = state_phys.get_var("rot")
+        # the fields (ordered as in state_phys) transformed together
+        fields_fft = np.empty((4,) + ux_fft.shape, ux_fft.dtype)
+        fields_fft[0], fields_fft[1], fields_fft[2] = ux_fft, uy_fft, eta_fft
+        fields_fft[3] = self.oper.rotfft_from_vecfft(ux_fft, uy_fft)
 
-        ifft_as_arg(ux_fft, ux)
-        ifft_as_arg(uy_fft, uy)
-        ifft_as_arg(eta_fft, eta)
-        ifft_as_arg(rot_fft, rot)
+        self.oper.ifft_setofvar(fields_fft, state_phys, destroy=True)
 
     def return_statephys_from_statespect(self, state_spect=None):
         """Return the state in physical space as a new object separate from
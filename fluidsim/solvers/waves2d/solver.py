@@ -114,9 +114,9 @@ class Simul(SimulBasePseudoSpectral):
     def create_default_params(cls):
         return create_params(info_solver)
 
-    def __init__(self, params):
+    def __init__(self, params, **kwargs):
         self.info_solver = info_solver
-        super().__init__(params)
+        super().__init__(params, **kwargs)
 
     def tendencies_nonlin(self, state_spect=None, old=None):
 
@@ -95,6 +95,7 @@ def transonize():
     from transonic.dist import make_backend_files
 
     paths = [
+        "fluidsim/base/time_stepping/base.py",
         "fluidsim/base/time_stepping/pseudo_spect.py",
         "fluidsim/base/output/increments.py",
         "fluidsim/operators/operators2d.py",